@@ -0,0 +1,10 @@
+"""
+Benchmarks for the VM 3 memory service.
+
+    python -m benchmarks.datagen --atoms 1m                 # build (and cache) a synthetic store
+    python -m benchmarks.micro --atoms 10k --out micro.json  # MemoryDB / engines / hashing
+    python -m benchmarks.grpc_load --atoms 10k --duration 30 --out load.json
+    python -m benchmarks.compare base.json new.json          # flag regressions between runs
+
+Every tool writes one JSON document (see benchmarks/results.py) so runs can be diffed.
+"""
@@ -0,0 +1,54 @@
+"""
+Compares two benchmark JSON files from the same suite and flags regressions:
+a p50/p99 latency increase or a throughput drop beyond --threshold percent.
+Exits 1 if anything regressed.
+"""
+import argparse
+import json
+
+# metric -> True if bigger is better
+METRICS = {"p50_ms": False, "p99_ms": False, "ops_per_sec": True, "throughput_rps": True}
+
+
+def compare(base, new, threshold):
+    rows = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        before, after = base["results"].get(name), new["results"].get(name)
+        if before is None or after is None:
+            rows.append((name, "-", None, None, None, "added" if before is None else "removed"))
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in before or metric not in after or not before[metric]:
+                continue
+            change = (after[metric] - before[metric]) / before[metric] * 100.0
+            worse = -change if higher_is_better else change
+            status = "REGRESSED" if worse > threshold else ("improved" if worse < -threshold else "")
+            rows.append((name, metric, before[metric], after[metric], change, status))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as significant")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base.get("suite") != new.get("suite"):
+        raise SystemExit(f"Cannot compare suite '{base.get('suite')}' with '{new.get('suite')}'")
+    if base.get("params") != new.get("params"):
+        print("Warning: runs used different parameters.")
+
+    regressions = 0
+    for name, metric, before, after, change, status in compare(base, new, args.threshold):
+        if change is None:
+            print(f"{name:52s} {status}")
+            continue
+        print(f"{name:52s} {metric:15s} {before:12.3f} -> {after:12.3f} ({change:+6.1f}%) {status}")
+        regressions += status == "REGRESSED"
+    print(f"{regressions} regression(s) beyond {args.threshold}%.")
+    raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,220 @@
+"""
+Synthetic memory store generator.
+
+Entities get a log-normal number of atoms (a few heavy users, a long tail of light
+ones), dimensions and context hashes are Zipf-distributed so a handful dominate, and
+every atom respects the default per-(entity, dimension) cap. Context hashes come from
+generate_context_hash over realistic mode/location/metadata combinations.
+"""
+import argparse
+import bisect
+import io
+import math
+import os
+import random
+import sqlite3
+import time
+from contextlib import redirect_stdout
+
+from common.utils.hashing import generate_context_hash
+from memory.db import migrations
+from memory.db.memory_db import MemoryDB, DEFAULT_MAX_ATOMS
+from memory.db.sql_functions import atom_expiry
+from benchmarks.results import parse_count
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+DIMENSION_ROOTS = [
+    "humor", "formality", "verbosity", "curiosity", "patience", "optimism", "trust", "urgency",
+    "technicality", "warmth", "sarcasm", "caution", "focus", "energy", "privacy", "novelty",
+    "routine", "detail", "directness", "empathy",
+]
+MODES = ["work", "night", "away", "focus", "casual", "travel"]
+LOCATIONS = ["home", "office", "car", "gym", "cafe", "airport", None]
+DEVICES = ["desktop", "phone", "watch", "speaker"]
+ACTIVITIES = ["coding", "reading", "commuting", "cooking", "meeting", "gaming", "idle"]
+
+
+class Zipf:
+    """ Samples indexes 0..n-1 with P(i) proportional to 1 / (i + 1)^s. """
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        total = 0.0
+        self.cumulative = []
+        for i in range(n):
+            total += 1.0 / (i + 1) ** s
+            self.cumulative.append(total)
+        self.total = total
+
+    def __call__(self):
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.total)
+
+
+def dimension_names(count):
+    names = list(DIMENSION_ROOTS[:count])
+    i = 0
+    while len(names) < count:
+        names.append(f"{DIMENSION_ROOTS[i % len(DIMENSION_ROOTS)]}_{i // len(DIMENSION_ROOTS) + 1}")
+        i += 1
+    return names
+
+
+def context_hashes(count, rng):
+    hashes = []
+    seen = set()
+    while len(hashes) < count:
+        metadata = {"device": rng.choice(DEVICES), "activity": rng.choice(ACTIVITIES)}
+        if rng.random() < 0.3:
+            metadata["slot"] = str(rng.randrange(24))
+        h = generate_context_hash(rng.choice(MODES), rng.choice(LOCATIONS), metadata)
+        if h not in seen:
+            seen.add(h)
+            hashes.append(h)
+    return hashes
+
+
+def generate(db_path, atoms, seed=0, dimensions=200, contexts=DEFAULT_MAX_ATOMS, mean_atoms_per_entity=100,
+             max_age_hours=24.0, preferences=1000, relations_per_entity=4, batch_size=50_000):
+    """
+    Writes `atoms` atoms (plus preferences and relation edges) into a fresh store at
+    db_path, created through MemoryDB so the schema and triggers match production.
+    Returns {"atoms", "entities", "relations", "elapsed_sec"}.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    with redirect_stdout(io.StringIO()):
+        MemoryDB(db_path).close()
+
+    dims = dimension_names(dimensions)
+    hashes = context_hashes(contexts, rng)
+    pick_dim = Zipf(len(dims), 1.05, rng)
+    pick_hash = Zipf(len(hashes), 1.2, rng)
+    max_per_entity = len(dims) * len(hashes)
+    sigma = 1.0
+    mu = math.log(mean_atoms_per_entity) - sigma ** 2 / 2
+    now = time.time()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    # Bulk load without the per-row stats triggers, then recreate them and rebuild
+    # the aggregates they maintain in one pass each.
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'memory_atoms'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    rows = []
+    written = entities = 0
+
+    def flush():
+        conn.executemany("""
+            INSERT INTO memory_atoms (entity_id, dimension, magnitude, context_hash, confidence,
+                                      decay_rate, last_updated, expires_at, written_at)
+            VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?7)
+        """, rows)
+        conn.commit()
+        rows.clear()
+
+    while written < atoms:
+        entity_id = f"ent{entities}"
+        entities += 1
+        target = min(atoms - written, max_per_entity, max(1, int(rng.lognormvariate(mu, sigma))))
+        seen = set()
+        attempts = 0
+        while len(seen) < target and attempts < target * 20:
+            attempts += 1
+            key = (pick_dim(), pick_hash())
+            if key in seen:
+                continue
+            seen.add(key)
+            dimension, context_hash = dims[key[0]], hashes[key[1]]
+            magnitude = max(-1.0, min(1.0, rng.gauss(0.0, 0.35)))
+            anchor = now - rng.random() * max_age_hours * 3600.0
+            rows.append((entity_id, dimension, magnitude, context_hash, rng.betavariate(5, 3), 0.05, anchor,
+                         atom_expiry(magnitude, 0.05, anchor)))
+        written += len(seen)
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+    for _, sql in triggers:
+        conn.execute(sql)
+    migrations.rebuild_dimension_stats(conn)
+    migrations.rebuild_atom_counts(conn)
+
+    conn.executemany("INSERT INTO preferences (key, value, confidence, updated_at) VALUES (?, ?, ?, ?)", [
+        (f"pref_{i}", rng.uniform(-1, 1), rng.uniform(0.5, 1.0), now) for i in range(preferences)
+    ])
+    pick_entity = Zipf(entities, 0.8, rng)
+    edges = {}
+    for i in range(entities):
+        for _ in range(relations_per_entity):
+            target = pick_entity()
+            if target != i:
+                edges[(f"ent{i}", rng.choice(("knows", "likes", "works_with", "mentions")), f"ent{target}")] = rng.random()
+    conn.executemany("""
+        INSERT OR IGNORE INTO entity_relations (from_entity, relation, to_entity, weight, last_updated)
+        VALUES (?, ?, ?, ?, ?)
+    """, [key + (weight, now) for key, weight in edges.items()])
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return {"atoms": written, "entities": entities, "relations": len(edges),
+            "elapsed_sec": time.perf_counter() - started}
+
+
+def dataset(atoms, seed=0, data_dir=DATA_DIR):
+    """ Path to a cached dataset of the given size (per schema version), generating it on first use. """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"atoms-{atoms}-seed{seed}-v{migrations.MIGRATIONS[-1][0]}.db")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        info = generate(tmp_path, atoms, seed=seed)
+        os.replace(tmp_path, path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+        print(f"Generated {info['atoms']} atoms for {info['entities']} entities in {info['elapsed_sec']:.1f}s: {path}")
+    return path
+
+
+def copy_dataset(source, dest):
+    """ Consistent copy of a dataset (backup API, so WAL content is included). """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(dest + suffix):
+            os.remove(dest + suffix)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(dest)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+    return dest
+
+
+def sample_entities(db_path, count, seed=0):
+    conn = sqlite3.connect(db_path)
+    try:
+        entities = [row[0] for row in conn.execute("SELECT DISTINCT entity_id FROM atom_counts")]
+    finally:
+        conn.close()
+    rng = random.Random(seed)
+    return rng.sample(entities, min(count, len(entities)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic memory store.")
+    parser.add_argument("--atoms", default="10k", help="10k, 1m, 10m or an exact count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write here instead of the benchmarks/.data cache")
+    args = parser.parse_args()
+
+    count = parse_count(args.atoms)
+    if args.out:
+        info = generate(args.out, count, seed=args.seed)
+        print(f"Generated {info['atoms']} atoms for {info['entities']} entities "
+              f"and {info['relations']} relations in {info['elapsed_sec']:.1f}s: {args.out}")
+    else:
+        dataset(count, seed=args.seed)
@@ -0,0 +1,224 @@
+"""
+End-to-end gRPC load generator for MemoryService.
+
+Starts `python -m memory.serve` on a copy of a synthetic dataset (or targets an
+already running server with --target), drives a weighted RPC mix from concurrent
+client threads for a fixed duration, and reports throughput and p50/p90/p99 latency
+per RPC. Calls made during --warmup are not recorded.
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import grpc
+
+from common.proto import kuro_pb2
+from common.proto import kuro_pb2_grpc
+from benchmarks import datagen
+from benchmarks.results import parse_count, summarize, write
+from memory.db.reshard import reshard
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "GetContext=70,ProposeMemory=20,ProposeMemoryBatch=5,UpdatePreference=5"
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(RPCS)
+    if unknown:
+        raise SystemExit(f"Unknown RPCs in --mix: {sorted(unknown)}; choose from {sorted(RPCS)}")
+    return mix
+
+
+def _get_context(stub, rng, entities):
+    return stub.GetContext(kuro_pb2.ContextRequest(
+        entities=rng.sample(entities, 3), top_k=5, format=kuro_pb2.ContextRequest.SUMMARIES_AND_ATOMS))
+
+
+def _proposal(rng, entities):
+    return kuro_pb2.MemoryProposal(
+        entity_id=rng.choice(entities), dimension=rng.choice(datagen.DIMENSION_ROOTS),
+        delta=rng.uniform(-0.2, 0.2), context_hash=f"{rng.randrange(64):08x}", confidence=rng.random())
+
+
+def _propose_memory(stub, rng, entities):
+    return stub.ProposeMemory(_proposal(rng, entities))
+
+
+def _propose_memory_batch(stub, rng, entities):
+    return stub.ProposeMemoryBatch(kuro_pb2.MemoryProposalBatch(
+        proposals=[_proposal(rng, entities) for _ in range(50)]))
+
+
+def _update_preference(stub, rng, entities):
+    return stub.UpdatePreference(kuro_pb2.PreferenceUpdate(key=f"pref_{rng.randrange(1000)}", value=rng.random()))
+
+
+def _get_neighborhood(stub, rng, entities):
+    return stub.GetNeighborhood(kuro_pb2.NeighborhoodRequest(entities=[rng.choice(entities)], max_hops=2, limit=20))
+
+
+def _stream_context(stub, rng, entities):
+    return list(stub.StreamContext(kuro_pb2.ContextRequest(entities=rng.sample(entities, 3), chunk_size=64)))
+
+
+def _query_atoms(stub, rng, entities):
+    # Drain the stream: the RPC's cost includes every page.
+    return list(stub.QueryAtoms(kuro_pb2.AtomQuery(
+        order=rng.choice((kuro_pb2.AtomQuery.RECENT, kuro_pb2.AtomQuery.STRONGEST)), limit=200, page_size=100)))
+
+
+RPCS = {
+    "GetContext": _get_context,
+    "ProposeMemory": _propose_memory,
+    "ProposeMemoryBatch": _propose_memory_batch,
+    "UpdatePreference": _update_preference,
+    "GetNeighborhood": _get_neighborhood,
+    "QueryAtoms": _query_atoms,
+    "StreamContext": _stream_context,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, server_mode, extra_env=()):
+    env = dict(os.environ, KURO_MEMORY_DB=db_path, KURO_MEMORY_PORT=str(port), KURO_MEMORY_SERVER_MODE=server_mode)
+    env.update(extra_env)
+    log = tempfile.NamedTemporaryFile(prefix="kuro-memory-", suffix=".log", delete=False)
+    process = subprocess.Popen([sys.executable, "-m", "memory.serve"], cwd=REPO_ROOT, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, log.name
+
+
+def run_load(target, entities, mix, concurrency, duration, warmup, seed=0):
+    channel = grpc.insecure_channel(target)
+    grpc.channel_ready_future(channel).result(timeout=60)
+    stub = kuro_pb2_grpc.MemoryServiceStub(channel)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    started = time.perf_counter()
+    record_from = started + warmup
+    stop_at = record_from + duration
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            try:
+                RPCS[name](stub, rng, entities)
+                ok = True
+            except grpc.RpcError:
+                ok = False
+            finished = time.perf_counter()
+            if now >= record_from:
+                if ok:
+                    local[name].append(finished - now)
+                else:
+                    local_errors[name] += 1
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    channel.close()
+
+    results = {}
+    total = 0
+    for name in names:
+        summary = summarize(samples[name])
+        summary["errors"] = errors[name]
+        summary["throughput_rps"] = len(samples[name]) / duration
+        # ops_per_sec from summarize() is per-connection; throughput_rps is what the server sustained.
+        summary.pop("ops_per_sec", None)
+        results[name] = summary
+        total += len(samples[name])
+    all_samples = [s for name in names for s in samples[name]]
+    overall = summarize(all_samples)
+    overall.pop("ops_per_sec", None)
+    overall["errors"] = sum(errors.values())
+    overall["throughput_rps"] = total / duration
+    results["overall"] = overall
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="gRPC load generator for the memory service.")
+    parser.add_argument("--atoms", default="10k", help="dataset size for the spawned server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", help="host:port of a running server (skips spawning one)")
+    parser.add_argument("--server-mode", choices=["threaded", "aio"], default="threaded")
+    parser.add_argument("--hot-tier", action="store_true", help="spawn the server with KURO_MEMORY_HOT_TIER=1")
+    parser.add_argument("--shards", type=int, default=1, help="reshard the dataset copy and serve it with this many shards")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="RPC=weight,... from: " + ", ".join(RPCS))
+    parser.add_argument("--out", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    atoms = parse_count(args.atoms)
+    dataset = datagen.dataset(atoms, seed=args.seed)
+    entities = datagen.sample_entities(dataset, 1000, seed=args.seed)
+
+    process = workdir = None
+    target = args.target
+    if not target:
+        workdir = tempfile.mkdtemp(prefix="kuro-load-")
+        db_path = datagen.copy_dataset(dataset, os.path.join(workdir, "kuro_memory.db"))
+        extra_env = {"KURO_MEMORY_HOT_TIER": "1"} if args.hot_tier else {}
+        if args.shards > 1:
+            reshard(db_path, db_path, args.shards)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            extra_env["KURO_MEMORY_SHARDS"] = str(args.shards)
+        port = free_port()
+        process, log_path = start_server(db_path, port, args.server_mode, extra_env)
+        target = f"127.0.0.1:{port}"
+        print(f"Started memory server (pid {process.pid}, {args.server_mode}) on {target}, log {log_path}")
+    try:
+        results = run_load(target, entities, mix, args.concurrency, args.duration, args.warmup, seed=args.seed)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, summary in results.items():
+        if summary["count"]:
+            print(f"{name:20s} {summary['throughput_rps']:9.1f} rps  p50 {summary['p50_ms']:8.2f} ms  "
+                  f"p99 {summary['p99_ms']:8.2f} ms  errors {summary['errors']}")
+    params = {"atoms": atoms, "seed": args.seed, "target": args.target, "server_mode": args.server_mode,
+              "hot_tier": args.hot_tier, "shards": args.shards, "concurrency": args.concurrency, "duration": args.duration,
+              "warmup": args.warmup, "mix": mix}
+    write(args.out, "grpc_load", params, results)
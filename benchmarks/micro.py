@@ -0,0 +1,171 @@
+"""
+Micro-benchmarks for MemoryDB, DecayEngine, DimensionManager and generate_context_hash.
+
+Read-only benches share one working copy of the dataset; anything that rewrites the
+store (decay, pruning, collapse) gets a fresh copy so every run starts from the same data.
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from common.utils.hashing import generate_context_hash
+from memory.db.memory_db import MemoryDB
+from memory.decay_engine import DecayEngine
+from memory.dimension_manager import DimensionManager, np
+from benchmarks import datagen
+from benchmarks.results import parse_count, summarize, write
+
+
+def measure(fn, iterations, warmup=3):
+    """ Calls fn() warmup + iterations times; summarizes the timed calls. """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def measure_once(fn):
+    """ Single timed call for passes that consume their input; keeps fn's report if it returns a dict. """
+    started = time.perf_counter()
+    report = fn()
+    result = summarize([time.perf_counter() - started])
+    if isinstance(report, dict):
+        result["report"] = {k: v for k, v in report.items() if isinstance(v, (int, float, bool))}
+    return result
+
+
+class MicroBench:
+    def __init__(self, dataset, workdir, iterations=200, seed=0):
+        self.dataset = dataset
+        self.workdir = workdir
+        self.iterations = iterations
+        self.rng = random.Random(seed)
+        self.entities = datagen.sample_entities(dataset, 1000, seed=seed)
+        self._copies = 0
+
+    def fresh_db(self, **kwargs):
+        self._copies += 1
+        path = datagen.copy_dataset(self.dataset, os.path.join(self.workdir, f"bench-{self._copies}.db"))
+        with redirect_stdout(io.StringIO()):
+            return MemoryDB(path, **kwargs)
+
+    def run(self, only=None):
+        benches = [
+            ("hashing.generate_context_hash", self.bench_context_hash),
+            ("memory_db.update_atom", self.bench_update_atom),
+            ("memory_db.update_atoms[100]", self.bench_update_atoms),
+            ("memory_db.fetch_atoms[10,top5]", self.bench_fetch_atoms),
+            ("memory_db.get_memory_summaries[1]", self.bench_summaries),
+            ("memory_db.get_preferences", self.bench_preferences),
+            ("memory_db.get_neighborhood[2hop]", self.bench_neighborhood),
+            ("decay_engine.apply_decay[eager]", lambda: self.bench_decay("eager")),
+            ("decay_engine.apply_decay[lazy]", lambda: self.bench_decay("lazy")),
+            ("dimension_manager.prune_weak_atoms", self.bench_prune),
+            ("dimension_manager.get_dimension_report", self.bench_dimension_report),
+            ("dimension_manager.collapse_redundant_dimensions", self.bench_collapse),
+        ]
+        with redirect_stdout(io.StringIO()):
+            self.shared = MemoryDB(datagen.copy_dataset(self.dataset, os.path.join(self.workdir, "shared.db")))
+        results = {}
+        for name, bench in benches:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            result = bench()
+            if result is None:
+                continue
+            results[name] = result
+            print(f"{name:52s} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+                  f"{result['ops_per_sec']:10.1f} ops/s")
+        self.shared.close()
+        return results
+
+    def bench_context_hash(self):
+        metadata = {"device": "phone", "activity": "commuting", "slot": "8"}
+        return measure(lambda: generate_context_hash("work", "office", metadata), self.iterations * 50)
+
+    def _proposal(self):
+        rng = self.rng
+        return (rng.choice(self.entities), rng.choice(datagen.DIMENSION_ROOTS), rng.uniform(-0.2, 0.2),
+                f"{rng.randrange(64):08x}", rng.random())
+
+    def bench_update_atom(self):
+        db = self.shared
+        with redirect_stdout(io.StringIO()):
+            return measure(lambda: db.update_atom(*self._proposal()), self.iterations)
+
+    def bench_update_atoms(self):
+        db = self.shared
+        with redirect_stdout(io.StringIO()):
+            return measure(lambda: db.update_atoms([self._proposal() for _ in range(100)]),
+                           max(10, self.iterations // 10))
+
+    def bench_fetch_atoms(self):
+        return measure(lambda: self.shared.fetch_atoms(self.rng.sample(self.entities, 10), top_k=5, detail=True),
+                       self.iterations)
+
+    def bench_summaries(self):
+        return measure(lambda: self.shared.get_memory_summaries([self.rng.choice(self.entities)]), self.iterations)
+
+    def bench_preferences(self):
+        return measure(self.shared.get_preferences, self.iterations)
+
+    def bench_neighborhood(self):
+        return measure(lambda: self.shared.get_neighborhood([self.rng.choice(self.entities)], max_hops=2),
+                       self.iterations)
+
+    def bench_decay(self, mode):
+        db = self.fresh_db(decay_mode=mode)
+        engine = DecayEngine(db)
+        with redirect_stdout(io.StringIO()):
+            result = measure_once(engine.apply_decay)
+        db.close()
+        return result
+
+    def bench_prune(self):
+        db = self.fresh_db()
+        with redirect_stdout(io.StringIO()):
+            result = measure_once(DimensionManager(db).prune_weak_atoms)
+        db.close()
+        return result
+
+    def bench_dimension_report(self):
+        manager = DimensionManager(self.shared)
+        return measure(manager.get_dimension_report, max(10, self.iterations // 10))
+
+    def bench_collapse(self):
+        if np is None:
+            print("dimension_manager.collapse_redundant_dimensions skipped (NumPy not installed)")
+            return None
+        db = self.fresh_db()
+        with redirect_stdout(io.StringIO()):
+            result = measure_once(DimensionManager(db).collapse_redundant_dimensions)
+        db.close()
+        return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the memory substrate.")
+    parser.add_argument("--atoms", default="10k", help="dataset size: 10k, 1m, 10m or an exact count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", action="append", help="run benches whose name contains this (repeatable)")
+    parser.add_argument("--out", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args()
+
+    atoms = parse_count(args.atoms)
+    dataset = datagen.dataset(atoms, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="kuro-bench-")
+    try:
+        results = MicroBench(dataset, workdir, iterations=args.iterations, seed=args.seed).run(args.only)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    write(args.out, "micro", {"atoms": atoms, "seed": args.seed, "iterations": args.iterations}, results)
@@ -0,0 +1,76 @@
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_count(value):
+    """ "10k" -> 10000, "1m" -> 1000000, "2500" -> 2500. """
+    value = str(value).strip().lower().replace("_", "")
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def summarize(samples_sec):
+    """ Latency summary in milliseconds for a list of per-call durations in seconds. """
+    if not samples_sec:
+        return {"count": 0}
+    ordered = sorted(samples_sec)
+    n = len(ordered)
+
+    def pick(q):
+        return ordered[min(n - 1, int(q * n))] * 1000.0
+
+    total = sum(ordered)
+    return {
+        "count": n,
+        "mean_ms": total / n * 1000.0,
+        "min_ms": ordered[0] * 1000.0,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000.0,
+        "ops_per_sec": n / total if total > 0 else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git_rev": git_revision(),
+    }
+
+
+def write(path, suite, params, results):
+    document = {
+        "suite": suite,
+        "started_at": datetime.datetime.now().isoformat(),
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if path and path != "-":
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {suite} results to {path}")
+    else:
+        print(text)
+    return document
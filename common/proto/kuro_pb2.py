@@ -26,7 +26,7 @@ from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x17\x63ommon/proto/kuro.proto\x12\x04kuro\x1a\x1fgoogle/protobuf/timestamp.proto\x1a\x1cgoogle/protobuf/struct.proto\"O\n\x0bUserMessage\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x1e\n\x07\x63ontext\x18\x03 \x01(\x0b\x32\r.kuro.Context\"\\\n\rBrainResponse\x12\x0c\n\x04text\x18\x01 \x01(\t\x12)\n\raction_intent\x18\x02 \x01(\x0b\x32\x12.kuro.ActionIntent\x12\x12\n\nis_partial\x18\x03 \x01(\x08\"\xb8\x01\n\x07\x43ontext\x12-\n\ttimestamp\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0c\n\x04mode\x18\x02 \x01(\t\x12\x10\n\x08location\x18\x03 \x01(\t\x12-\n\x08metadata\x18\x04 \x03(\x0b\x32\x1b.kuro.Context.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xa3\x01\n\x0c\x41\x63tionIntent\x12\x11\n\taction_id\x18\x01 \x01(\t\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x1d\n\x15requires_confirmation\x18\x03 \x01(\x08\x12\x12\n\ndepends_on\x18\x04 \x03(\t\x12\x16\n\tcondition\x18\x05 \x01(\tH\x00\x88\x01\x01\x42\x0c\n\n_condition\"W\n\x0bPlannerStep\x12\x0f\n\x07step_id\x18\x01 \x01(\t\x12\"\n\x06intent\x18\x02 \x01(\x0b\x32\x12.kuro.ActionIntent\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"<\n\nPlannerDAG\x12 \n\x05steps\x18\x01 \x03(\x0b\x32\x11.kuro.PlannerStep\x12\x0c\n\x04goal\x18\x02 \x01(\t\"o\n\x0eMemoryProposal\x12\x11\n\tentity_id\x18\x01 \x01(\t\x12\x11\n\tdimension\x18\x02 \x01(\t\x12\r\n\x05\x64\x65lta\x18\x03 \x01(\x02\x12\x14\n\x0c\x63ontext_hash\x18\x04 \x01(\t\x12\x12\n\nconfidence\x18\x05 \x01(\x02\"0\n\x0cMemoryStatus\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"6\n\x0e\x43ontextRequest\x12\x12\n\nsession_id\x18\x01 \x01(\t\x12\x10\n\x08\x65ntities\x18\x02 \x03(\t\"\x9c\x01\n\x0f\x43ontextResponse\x12\x18\n\x10memory_summaries\x18\x01 \x03(\t\x12;\n\x0bpreferences\x18\x02 \x03(\x0b\x32&.kuro.ContextResponse.PreferencesEntry\x1a\x32\n\x10PreferencesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"-\n\rSearchRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\r\n\x05top_k\x18\x02 \x01(\x05\"6\n\x0eSearchResponse\x12$\n\x06\x63hunks\x18\x01 \x03(\x0b\x32\x14.kuro.KnowledgeChunk\"=\n\x0eKnowledgeChunk\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x0e\n\x06source\x18\x03 \x01(\t\"K\n\rActionRequest\x12\x11\n\taction_id\x18\x01 \x01(\t\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\"@\n\x0e\x41\x63tionResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0e\n\x06output\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"8\n\x13\x43onfirmationRequest\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x10\n\x08severity\x18\x02 \x01(\t\"(\n\x14\x43onfirmationResponse\x12\x10\n\x08\x61pproved\x18\x01 \x01(\x08\".\n\x10PreferenceUpdate\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02\"%\n\x12HealthCheckRequest\x12\x0f\n\x07service\x18\x01 \x01(\t\"^\n\x0bNodeMetrics\x12\x13\n\x0b\x63pu_percent\x18\x01 \x01(\x02\x12\x13\n\x0bmem_percent\x18\x02 \x01(\x02\x12\x11\n\trss_bytes\x18\x03 \x01(\x04\x12\x12\n\nuptime_sec\x18\x04 \x01(\x04\"\x94\x01\n\nNodeHealth\x12\x11\n\tnode_name\x18\x01 \x01(\t\x12\x37\n\x06status\x18\x02 \x01(\x0e\x32\'.kuro.HealthCheckResponse.ServingStatus\x12\"\n\x07metrics\x18\x03 \x01(\x0b\x32\x11.kuro.NodeMetrics\x12\x16\n\x0elast_seen_unix\x18\x04 \x01(\x04\"0\n\rClusterHealth\x12\x1f\n\x05nodes\x18\x01 \x03(\x0b\x32\x10.kuro.NodeHealth\"\x9c\x02\n\x13HealthCheckResponse\x12\x37\n\x06status\x18\x01 \x01(\x0e\x32\'.kuro.HealthCheckResponse.ServingStatus\x12\x37\n\x07metrics\x18\x02 \x03(\x0b\x32&.kuro.HealthCheckResponse.MetricsEntry\x12\'\n\x0cnode_metrics\x18\x03 \x01(\x0b\x32\x11.kuro.NodeMetrics\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\":\n\rServingStatus\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0b\n\x07SERVING\x10\x01\x12\x0f\n\x0bNOT_SERVING\x10\x02*R\n\nIntentType\x12\x0c\n\x08\x43ONVERSE\x10\x00\x12\x13\n\x0fREALTIME_SEARCH\x10\x01\x12\x0f\n\x0bTOOL_ACTION\x10\x02\x12\x10\n\x0cMEMORY_QUERY\x10\x03\x32H\n\x0c\x42rainService\x12\x38\n\nChatStream\x12\x11.kuro.UserMessage\x1a\x13.kuro.BrainResponse(\x01\x30\x01\x32\xc5\x01\n\rMemoryService\x12\x39\n\nGetContext\x12\x14.kuro.ContextRequest\x1a\x15.kuro.ContextResponse\x12\x39\n\rProposeMemory\x12\x14.kuro.MemoryProposal\x1a\x12.kuro.MemoryStatus\x12>\n\x10UpdatePreference\x12\x16.kuro.PreferenceUpdate\x1a\x12.kuro.MemoryStatus2J\n\nRagService\x12<\n\x0fSearchKnowledge\x12\x13.kuro.SearchRequest\x1a\x14.kuro.SearchResponse2\x9a\x01\n\x0e\x43lientExecutor\x12:\n\rExecuteAction\x12\x13.kuro.ActionRequest\x1a\x14.kuro.ActionResponse\x12L\n\x13RequestConfirmation\x12\x19.kuro.ConfirmationRequest\x1a\x1a.kuro.ConfirmationResponse2\x87\x01\n\rHealthService\x12<\n\x05\x43heck\x12\x18.kuro.HealthCheckRequest\x1a\x19.kuro.HealthCheckResponse\x12\x38\n\x05Watch\x12\x18.kuro.HealthCheckRequest\x1a\x13.kuro.ClusterHealth0\x01\x32N\n\nOpsService\x12@\n\x13\x45xecuteSystemAction\x12\x13.kuro.ActionRequest\x1a\x14.kuro.ActionResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x17\x63ommon/proto/kuro.proto\x12\x04kuro\x1a\x1fgoogle/protobuf/timestamp.proto\x1a\x1cgoogle/protobuf/struct.proto\"O\n\x0bUserMessage\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x1e\n\x07\x63ontext\x18\x03 \x01(\x0b\x32\r.kuro.Context\"\\\n\rBrainResponse\x12\x0c\n\x04text\x18\x01 \x01(\t\x12)\n\raction_intent\x18\x02 \x01(\x0b\x32\x12.kuro.ActionIntent\x12\x12\n\nis_partial\x18\x03 \x01(\x08\"\xb8\x01\n\x07\x43ontext\x12-\n\ttimestamp\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0c\n\x04mode\x18\x02 \x01(\t\x12\x10\n\x08location\x18\x03 \x01(\t\x12-\n\x08metadata\x18\x04 \x03(\x0b\x32\x1b.kuro.Context.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xa3\x01\n\x0c\x41\x63tionIntent\x12\x11\n\taction_id\x18\x01 \x01(\t\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x1d\n\x15requires_confirmation\x18\x03 \x01(\x08\x12\x12\n\ndepends_on\x18\x04 \x03(\t\x12\x16\n\tcondition\x18\x05 \x01(\tH\x00\x88\x01\x01\x42\x0c\n\n_condition\"W\n\x0bPlannerStep\x12\x0f\n\x07step_id\x18\x01 \x01(\t\x12\"\n\x06intent\x18\x02 \x01(\x0b\x32\x12.kuro.ActionIntent\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\"<\n\nPlannerDAG\x12 \n\x05steps\x18\x01 \x03(\x0b\x32\x11.kuro.PlannerStep\x12\x0c\n\x04goal\x18\x02 \x01(\t\"o\n\x0eMemoryProposal\x12\x11\n\tentity_id\x18\x01 \x01(\t\x12\x11\n\tdimension\x18\x02 \x01(\t\x12\r\n\x05\x64\x65lta\x18\x03 \x01(\x02\x12\x14\n\x0c\x63ontext_hash\x18\x04 \x01(\t\x12\x12\n\nconfidence\x18\x05 \x01(\x02\"0\n\x0cMemoryStatus\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\">\n\x13MemoryProposalBatch\x12\'\n\tproposals\x18\x01 \x03(\x0b\x32\x14.kuro.MemoryProposal\"I\n\x11MemoryBatchStatus\x12#\n\x07results\x18\x01 \x03(\x0b\x32\x12.kuro.MemoryStatus\x12\x0f\n\x07\x61pplied\x18\x02 \x01(\r\"\xa4\x02\n\x0e\x43ontextRequest\x12\x12\n\nsession_id\x18\x01 \x01(\t\x12\x10\n\x08\x65ntities\x18\x02 \x03(\t\x12\r\n\x05top_k\x18\x03 \x01(\r\x12\x15\n\rmin_magnitude\x18\x04 \x01(\x02\x12+\n\x06\x66ormat\x18\x05 \x01(\x0e\x32\x1b.kuro.ContextRequest.Format\x12\x18\n\x10\x65xpand_neighbors\x18\x06 \x01(\r\x12\x13\n\x0b\x65xpand_hops\x18\x07 \x01(\r\x12\x19\n\x11\x65xpand_min_weight\x18\x08 \x01(\x02\x12\x12\n\nchunk_size\x18\t \x01(\r\";\n\x06\x46ormat\x12\r\n\tSUMMARIES\x10\x00\x12\t\n\x05\x41TOMS\x10\x01\x12\x17\n\x13SUMMARIES_AND_ATOMS\x10\x02\"\x99\x01\n\nMemoryAtom\x12\x11\n\tentity_id\x18\x01 \x01(\t\x12\x11\n\tdimension\x18\x02 \x01(\t\x12\x11\n\tmagnitude\x18\x03 \x01(\x02\x12\x12\n\nconfidence\x18\x04 \x01(\x02\x12\x14\n\x0clast_updated\x18\x05 \x01(\x01\x12\x14\n\x0c\x63ontext_hash\x18\x06 \x01(\t\x12\x12\n\nwritten_at\x18\x07 \x01(\x01\"\xdf\x01\n\x0f\x43ontextResponse\x12\x18\n\x10memory_summaries\x18\x01 \x03(\t\x12;\n\x0bpreferences\x18\x02 \x03(\x0b\x32&.kuro.ContextResponse.PreferencesEntry\x12\x1f\n\x05\x61toms\x18\x03 \x03(\x0b\x32\x10.kuro.MemoryAtom\x12 \n\x08\x65xpanded\x18\x04 \x03(\x0b\x32\x0e.kuro.Neighbor\x1a\x32\n\x10PreferencesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"\x91\x02\n\tAtomQuery\x12\x10\n\x08\x65ntities\x18\x01 \x03(\t\x12\x18\n\x10\x64imension_prefix\x18\x02 \x01(\t\x12\x15\n\rupdated_after\x18\x03 \x01(\x01\x12\x16\n\x0eupdated_before\x18\x04 \x01(\x01\x12\x15\n\rmin_magnitude\x18\x05 \x01(\x02\x12\x16\n\x0emin_confidence\x18\x06 \x01(\x02\x12$\n\x05order\x18\x07 \x01(\x0e\x32\x15.kuro.AtomQuery.Order\x12\r\n\x05limit\x18\x08 \x01(\r\x12\x11\n\tpage_size\x18\t \x01(\r\x12\x0e\n\x06\x63ursor\x18\n \x01(\t\"\"\n\x05Order\x12\n\n\x06RECENT\x10\x00\x12\r\n\tSTRONGEST\x10\x01\"@\n\x08\x41tomPage\x12\x1f\n\x05\x61toms\x18\x01 \x03(\x0b\x32\x10.kuro.MemoryAtom\x12\x13\n\x0bnext_cursor\x18\x02 \x01(\t\"\xbf\x01\n\x0c\x43ontextChunk\x12\x1f\n\x05\x61toms\x18\x01 \x03(\x0b\x32\x10.kuro.MemoryAtom\x12\x38\n\x0bpreferences\x18\x02 \x03(\x0b\x32#.kuro.ContextChunk.PreferencesEntry\x12 \n\x08\x65xpanded\x18\x03 \x03(\x0b\x32\x0e.kuro.Neighbor\x1a\x32\n\x10PreferencesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\"n\n\x0eRelationUpdate\x12\x13\n\x0b\x66rom_entity\x18\x01 \x01(\t\x12\x10\n\x08relation\x18\x02 \x01(\t\x12\x11\n\tto_entity\x18\x03 \x01(\t\x12\x0e\n\x06weight\x18\x04 \x01(\x02\x12\x12\n\naccumulate\x18\x05 \x01(\x08\"8\n\rRelationBatch\x12\'\n\trelations\x18\x01 \x03(\x0b\x32\x14.kuro.RelationUpdate\"\x86\x01\n\x13NeighborhoodRequest\x12\x10\n\x08\x65ntities\x18\x01 \x03(\t\x12\x10\n\x08max_hops\x18\x02 \x01(\r\x12\x12\n\nmin_weight\x18\x03 \x01(\x02\x12\r\n\x05limit\x18\x04 \x01(\r\x12\x11\n\trelations\x18\x05 \x03(\t\x12\x15\n\rbidirectional\x18\x06 \x01(\x08\"Y\n\x08Neighbor\x12\x11\n\tentity_id\x18\x01 \x01(\t\x12\x0c\n\x04hops\x18\x02 \x01(\r\x12\r\n\x05score\x18\x03 \x01(\x02\x12\x0b\n\x03via\x18\x04 \x01(\t\x12\x10\n\x08relation\x18\x05 \x01(\t\"9\n\x14NeighborhoodResponse\x12!\n\tneighbors\x18\x01 \x03(\x0b\x32\x0e.kuro.Neighbor\"-\n\rSearchRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\r\n\x05top_k\x18\x02 \x01(\x05\"6\n\x0eSearchResponse\x12$\n\x06\x63hunks\x18\x01 \x03(\x0b\x32\x14.kuro.KnowledgeChunk\"=\n\x0eKnowledgeChunk\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x0e\n\x06source\x18\x03 \x01(\t\"K\n\rActionRequest\x12\x11\n\taction_id\x18\x01 \x01(\t\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\"@\n\x0e\x41\x63tionResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0e\n\x06output\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"8\n\x13\x43onfirmationRequest\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x10\n\x08severity\x18\x02 \x01(\t\"(\n\x14\x43onfirmationResponse\x12\x10\n\x08\x61pproved\x18\x01 \x01(\x08\".\n\x10PreferenceUpdate\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02\"%\n\x12HealthCheckRequest\x12\x0f\n\x07service\x18\x01 \x01(\t\"\xbc\x01\n\x0bNodeMetrics\x12\x13\n\x0b\x63pu_percent\x18\x01 \x01(\x02\x12\x13\n\x0bmem_percent\x18\x02 \x01(\x02\x12\x11\n\trss_bytes\x18\x03 \x01(\x04\x12\x12\n\nuptime_sec\x18\x04 \x01(\x04\x12-\n\x06gauges\x18\x05 \x03(\x0b\x32\x1d.kuro.NodeMetrics.GaugesEntry\x1a-\n\x0bGaugesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"\x94\x01\n\nNodeHealth\x12\x11\n\tnode_name\x18\x01 \x01(\t\x12\x37\n\x06status\x18\x02 \x01(\x0e\x32\'.kuro.HealthCheckResponse.ServingStatus\x12\"\n\x07metrics\x18\x03 \x01(\x0b\x32\x11.kuro.NodeMetrics\x12\x16\n\x0elast_seen_unix\x18\x04 \x01(\x04\"0\n\rClusterHealth\x12\x1f\n\x05nodes\x18\x01 \x03(\x0b\x32\x10.kuro.NodeHealth\"\x9c\x02\n\x13HealthCheckResponse\x12\x37\n\x06status\x18\x01 \x01(\x0e\x32\'.kuro.HealthCheckResponse.ServingStatus\x12\x37\n\x07metrics\x18\x02 \x03(\x0b\x32&.kuro.HealthCheckResponse.MetricsEntry\x12\'\n\x0cnode_metrics\x18\x03 \x01(\x0b\x32\x11.kuro.NodeMetrics\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x02:\x02\x38\x01\":\n\rServingStatus\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0b\n\x07SERVING\x10\x01\x12\x0f\n\x0bNOT_SERVING\x10\x02*R\n\nIntentType\x12\x0c\n\x08\x43ONVERSE\x10\x00\x12\x13\n\x0fREALTIME_SEARCH\x10\x01\x12\x0f\n\x0bTOOL_ACTION\x10\x02\x12\x10\n\x0cMEMORY_QUERY\x10\x03\x32H\n\x0c\x42rainService\x12\x38\n\nChatStream\x12\x11.kuro.UserMessage\x1a\x13.kuro.BrainResponse(\x01\x30\x01\x32\x8e\x05\n\rMemoryService\x12\x39\n\nGetContext\x12\x14.kuro.ContextRequest\x1a\x15.kuro.ContextResponse\x12;\n\rStreamContext\x12\x14.kuro.ContextRequest\x1a\x12.kuro.ContextChunk0\x01\x12\x39\n\rProposeMemory\x12\x14.kuro.MemoryProposal\x1a\x12.kuro.MemoryStatus\x12>\n\x10UpdatePreference\x12\x16.kuro.PreferenceUpdate\x1a\x12.kuro.MemoryStatus\x12H\n\x12ProposeMemoryBatch\x12\x19.kuro.MemoryProposalBatch\x1a\x17.kuro.MemoryBatchStatus\x12H\n\x15StreamMemoryProposals\x12\x14.kuro.MemoryProposal\x1a\x17.kuro.MemoryBatchStatus(\x01\x12:\n\x0eUpsertRelation\x12\x14.kuro.RelationUpdate\x1a\x12.kuro.MemoryStatus\x12?\n\x0fUpsertRelations\x12\x13.kuro.RelationBatch\x1a\x17.kuro.MemoryBatchStatus\x12H\n\x0fGetNeighborhood\x12\x19.kuro.NeighborhoodRequest\x1a\x1a.kuro.NeighborhoodResponse\x12/\n\nQueryAtoms\x12\x0f.kuro.AtomQuery\x1a\x0e.kuro.AtomPage0\x01\x32J\n\nRagService\x12<\n\x0fSearchKnowledge\x12\x13.kuro.SearchRequest\x1a\x14.kuro.SearchResponse2\x9a\x01\n\x0e\x43lientExecutor\x12:\n\rExecuteAction\x12\x13.kuro.ActionRequest\x1a\x14.kuro.ActionResponse\x12L\n\x13RequestConfirmation\x12\x19.kuro.ConfirmationRequest\x1a\x1a.kuro.ConfirmationResponse2\x87\x01\n\rHealthService\x12<\n\x05\x43heck\x12\x18.kuro.HealthCheckRequest\x1a\x19.kuro.HealthCheckResponse\x12\x38\n\x05Watch\x12\x18.kuro.HealthCheckRequest\x1a\x13.kuro.ClusterHealth0\x01\x32N\n\nOpsService\x12@\n\x13\x45xecuteSystemAction\x12\x13.kuro.ActionRequest\x1a\x14.kuro.ActionResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -37,10 +37,14 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_CONTEXT_METADATAENTRY']._serialized_options = b'8\001'
   _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._loaded_options = None
   _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._serialized_options = b'8\001'
+  _globals['_CONTEXTCHUNK_PREFERENCESENTRY']._loaded_options = None
+  _globals['_CONTEXTCHUNK_PREFERENCESENTRY']._serialized_options = b'8\001'
+  _globals['_NODEMETRICS_GAUGESENTRY']._loaded_options = None
+  _globals['_NODEMETRICS_GAUGESENTRY']._serialized_options = b'8\001'
   _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._loaded_options = None
   _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._serialized_options = b'8\001'
-  _globals['_INTENTTYPE']._serialized_start=2233
-  _globals['_INTENTTYPE']._serialized_end=2315
+  _globals['_INTENTTYPE']._serialized_start=3922
+  _globals['_INTENTTYPE']._serialized_end=4004
   _globals['_USERMESSAGE']._serialized_start=96
   _globals['_USERMESSAGE']._serialized_end=175
   _globals['_BRAINRESPONSE']._serialized_start=177
@@ -59,52 +63,82 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_MEMORYPROPOSAL']._serialized_end=886
   _globals['_MEMORYSTATUS']._serialized_start=888
   _globals['_MEMORYSTATUS']._serialized_end=936
-  _globals['_CONTEXTREQUEST']._serialized_start=938
-  _globals['_CONTEXTREQUEST']._serialized_end=992
-  _globals['_CONTEXTRESPONSE']._serialized_start=995
-  _globals['_CONTEXTRESPONSE']._serialized_end=1151
-  _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._serialized_start=1101
-  _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._serialized_end=1151
-  _globals['_SEARCHREQUEST']._serialized_start=1153
-  _globals['_SEARCHREQUEST']._serialized_end=1198
-  _globals['_SEARCHRESPONSE']._serialized_start=1200
-  _globals['_SEARCHRESPONSE']._serialized_end=1254
-  _globals['_KNOWLEDGECHUNK']._serialized_start=1256
-  _globals['_KNOWLEDGECHUNK']._serialized_end=1317
-  _globals['_ACTIONREQUEST']._serialized_start=1319
-  _globals['_ACTIONREQUEST']._serialized_end=1394
-  _globals['_ACTIONRESPONSE']._serialized_start=1396
-  _globals['_ACTIONRESPONSE']._serialized_end=1460
-  _globals['_CONFIRMATIONREQUEST']._serialized_start=1462
-  _globals['_CONFIRMATIONREQUEST']._serialized_end=1518
-  _globals['_CONFIRMATIONRESPONSE']._serialized_start=1520
-  _globals['_CONFIRMATIONRESPONSE']._serialized_end=1560
-  _globals['_PREFERENCEUPDATE']._serialized_start=1562
-  _globals['_PREFERENCEUPDATE']._serialized_end=1608
-  _globals['_HEALTHCHECKREQUEST']._serialized_start=1610
-  _globals['_HEALTHCHECKREQUEST']._serialized_end=1647
-  _globals['_NODEMETRICS']._serialized_start=1649
-  _globals['_NODEMETRICS']._serialized_end=1743
-  _globals['_NODEHEALTH']._serialized_start=1746
-  _globals['_NODEHEALTH']._serialized_end=1894
-  _globals['_CLUSTERHEALTH']._serialized_start=1896
-  _globals['_CLUSTERHEALTH']._serialized_end=1944
-  _globals['_HEALTHCHECKRESPONSE']._serialized_start=1947
-  _globals['_HEALTHCHECKRESPONSE']._serialized_end=2231
-  _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._serialized_start=2125
-  _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._serialized_end=2171
-  _globals['_HEALTHCHECKRESPONSE_SERVINGSTATUS']._serialized_start=2173
-  _globals['_HEALTHCHECKRESPONSE_SERVINGSTATUS']._serialized_end=2231
-  _globals['_BRAINSERVICE']._serialized_start=2317
-  _globals['_BRAINSERVICE']._serialized_end=2389
-  _globals['_MEMORYSERVICE']._serialized_start=2392
-  _globals['_MEMORYSERVICE']._serialized_end=2589
-  _globals['_RAGSERVICE']._serialized_start=2591
-  _globals['_RAGSERVICE']._serialized_end=2665
-  _globals['_CLIENTEXECUTOR']._serialized_start=2668
-  _globals['_CLIENTEXECUTOR']._serialized_end=2822
-  _globals['_HEALTHSERVICE']._serialized_start=2825
-  _globals['_HEALTHSERVICE']._serialized_end=2960
-  _globals['_OPSSERVICE']._serialized_start=2962
-  _globals['_OPSSERVICE']._serialized_end=3040
+  _globals['_MEMORYPROPOSALBATCH']._serialized_start=938
+  _globals['_MEMORYPROPOSALBATCH']._serialized_end=1000
+  _globals['_MEMORYBATCHSTATUS']._serialized_start=1002
+  _globals['_MEMORYBATCHSTATUS']._serialized_end=1075
+  _globals['_CONTEXTREQUEST']._serialized_start=1078
+  _globals['_CONTEXTREQUEST']._serialized_end=1370
+  _globals['_CONTEXTREQUEST_FORMAT']._serialized_start=1311
+  _globals['_CONTEXTREQUEST_FORMAT']._serialized_end=1370
+  _globals['_MEMORYATOM']._serialized_start=1373
+  _globals['_MEMORYATOM']._serialized_end=1526
+  _globals['_CONTEXTRESPONSE']._serialized_start=1529
+  _globals['_CONTEXTRESPONSE']._serialized_end=1752
+  _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._serialized_start=1702
+  _globals['_CONTEXTRESPONSE_PREFERENCESENTRY']._serialized_end=1752
+  _globals['_ATOMQUERY']._serialized_start=1755
+  _globals['_ATOMQUERY']._serialized_end=2028
+  _globals['_ATOMQUERY_ORDER']._serialized_start=1994
+  _globals['_ATOMQUERY_ORDER']._serialized_end=2028
+  _globals['_ATOMPAGE']._serialized_start=2030
+  _globals['_ATOMPAGE']._serialized_end=2094
+  _globals['_CONTEXTCHUNK']._serialized_start=2097
+  _globals['_CONTEXTCHUNK']._serialized_end=2288
+  _globals['_CONTEXTCHUNK_PREFERENCESENTRY']._serialized_start=1702
+  _globals['_CONTEXTCHUNK_PREFERENCESENTRY']._serialized_end=1752
+  _globals['_RELATIONUPDATE']._serialized_start=2290
+  _globals['_RELATIONUPDATE']._serialized_end=2400
+  _globals['_RELATIONBATCH']._serialized_start=2402
+  _globals['_RELATIONBATCH']._serialized_end=2458
+  _globals['_NEIGHBORHOODREQUEST']._serialized_start=2461
+  _globals['_NEIGHBORHOODREQUEST']._serialized_end=2595
+  _globals['_NEIGHBOR']._serialized_start=2597
+  _globals['_NEIGHBOR']._serialized_end=2686
+  _globals['_NEIGHBORHOODRESPONSE']._serialized_start=2688
+  _globals['_NEIGHBORHOODRESPONSE']._serialized_end=2745
+  _globals['_SEARCHREQUEST']._serialized_start=2747
+  _globals['_SEARCHREQUEST']._serialized_end=2792
+  _globals['_SEARCHRESPONSE']._serialized_start=2794
+  _globals['_SEARCHRESPONSE']._serialized_end=2848
+  _globals['_KNOWLEDGECHUNK']._serialized_start=2850
+  _globals['_KNOWLEDGECHUNK']._serialized_end=2911
+  _globals['_ACTIONREQUEST']._serialized_start=2913
+  _globals['_ACTIONREQUEST']._serialized_end=2988
+  _globals['_ACTIONRESPONSE']._serialized_start=2990
+  _globals['_ACTIONRESPONSE']._serialized_end=3054
+  _globals['_CONFIRMATIONREQUEST']._serialized_start=3056
+  _globals['_CONFIRMATIONREQUEST']._serialized_end=3112
+  _globals['_CONFIRMATIONRESPONSE']._serialized_start=3114
+  _globals['_CONFIRMATIONRESPONSE']._serialized_end=3154
+  _globals['_PREFERENCEUPDATE']._serialized_start=3156
+  _globals['_PREFERENCEUPDATE']._serialized_end=3202
+  _globals['_HEALTHCHECKREQUEST']._serialized_start=3204
+  _globals['_HEALTHCHECKREQUEST']._serialized_end=3241
+  _globals['_NODEMETRICS']._serialized_start=3244
+  _globals['_NODEMETRICS']._serialized_end=3432
+  _globals['_NODEMETRICS_GAUGESENTRY']._serialized_start=3387
+  _globals['_NODEMETRICS_GAUGESENTRY']._serialized_end=3432
+  _globals['_NODEHEALTH']._serialized_start=3435
+  _globals['_NODEHEALTH']._serialized_end=3583
+  _globals['_CLUSTERHEALTH']._serialized_start=3585
+  _globals['_CLUSTERHEALTH']._serialized_end=3633
+  _globals['_HEALTHCHECKRESPONSE']._serialized_start=3636
+  _globals['_HEALTHCHECKRESPONSE']._serialized_end=3920
+  _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._serialized_start=3814
+  _globals['_HEALTHCHECKRESPONSE_METRICSENTRY']._serialized_end=3860
+  _globals['_HEALTHCHECKRESPONSE_SERVINGSTATUS']._serialized_start=3862
+  _globals['_HEALTHCHECKRESPONSE_SERVINGSTATUS']._serialized_end=3920
+  _globals['_BRAINSERVICE']._serialized_start=4006
+  _globals['_BRAINSERVICE']._serialized_end=4078
+  _globals['_MEMORYSERVICE']._serialized_start=4081
+  _globals['_MEMORYSERVICE']._serialized_end=4735
+  _globals['_RAGSERVICE']._serialized_start=4737
+  _globals['_RAGSERVICE']._serialized_end=4811
+  _globals['_CLIENTEXECUTOR']._serialized_start=4814
+  _globals['_CLIENTEXECUTOR']._serialized_end=4968
+  _globals['_HEALTHSERVICE']._serialized_start=4971
+  _globals['_HEALTHSERVICE']._serialized_end=5106
+  _globals['_OPSSERVICE']._serialized_start=5108
+  _globals['_OPSSERVICE']._serialized_end=5186
 # @@protoc_insertion_point(module_scope)
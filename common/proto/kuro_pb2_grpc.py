@@ -116,6 +116,11 @@ class MemoryServiceStub(object):
                 request_serializer=common_dot_proto_dot_kuro__pb2.ContextRequest.SerializeToString,
                 response_deserializer=common_dot_proto_dot_kuro__pb2.ContextResponse.FromString,
                 _registered_method=True)
+        self.StreamContext = channel.unary_stream(
+                '/kuro.MemoryService/StreamContext',
+                request_serializer=common_dot_proto_dot_kuro__pb2.ContextRequest.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.ContextChunk.FromString,
+                _registered_method=True)
         self.ProposeMemory = channel.unary_unary(
                 '/kuro.MemoryService/ProposeMemory',
                 request_serializer=common_dot_proto_dot_kuro__pb2.MemoryProposal.SerializeToString,
@@ -126,6 +131,36 @@ class MemoryServiceStub(object):
                 request_serializer=common_dot_proto_dot_kuro__pb2.PreferenceUpdate.SerializeToString,
                 response_deserializer=common_dot_proto_dot_kuro__pb2.MemoryStatus.FromString,
                 _registered_method=True)
+        self.ProposeMemoryBatch = channel.unary_unary(
+                '/kuro.MemoryService/ProposeMemoryBatch',
+                request_serializer=common_dot_proto_dot_kuro__pb2.MemoryProposalBatch.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+                _registered_method=True)
+        self.StreamMemoryProposals = channel.stream_unary(
+                '/kuro.MemoryService/StreamMemoryProposals',
+                request_serializer=common_dot_proto_dot_kuro__pb2.MemoryProposal.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+                _registered_method=True)
+        self.UpsertRelation = channel.unary_unary(
+                '/kuro.MemoryService/UpsertRelation',
+                request_serializer=common_dot_proto_dot_kuro__pb2.RelationUpdate.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.MemoryStatus.FromString,
+                _registered_method=True)
+        self.UpsertRelations = channel.unary_unary(
+                '/kuro.MemoryService/UpsertRelations',
+                request_serializer=common_dot_proto_dot_kuro__pb2.RelationBatch.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+                _registered_method=True)
+        self.GetNeighborhood = channel.unary_unary(
+                '/kuro.MemoryService/GetNeighborhood',
+                request_serializer=common_dot_proto_dot_kuro__pb2.NeighborhoodRequest.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.NeighborhoodResponse.FromString,
+                _registered_method=True)
+        self.QueryAtoms = channel.unary_stream(
+                '/kuro.MemoryService/QueryAtoms',
+                request_serializer=common_dot_proto_dot_kuro__pb2.AtomQuery.SerializeToString,
+                response_deserializer=common_dot_proto_dot_kuro__pb2.AtomPage.FromString,
+                _registered_method=True)
 
 
 class MemoryServiceServicer(object):
@@ -139,6 +174,13 @@ class MemoryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamContext(self, request, context):
+        """GetContext for very large entities: atoms and preferences in bounded chunks, sent as they are read
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def ProposeMemory(self, request, context):
         """Decides whether an interaction should be stored (VM 1 calls this)
         """
@@ -153,6 +195,46 @@ class MemoryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ProposeMemoryBatch(self, request, context):
+        """Stores many proposals in one transaction (e.g. a whole conversation flush)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamMemoryProposals(self, request_iterator, context):
+        """Client-streaming variant of ProposeMemoryBatch
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UpsertRelation(self, request, context):
+        """Entity relation graph
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UpsertRelations(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetNeighborhood(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def QueryAtoms(self, request, context):
+        """Filtered atom scan across entities, streamed one keyset page at a time
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MemoryServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -161,6 +243,11 @@ def add_MemoryServiceServicer_to_server(servicer, server):
                     request_deserializer=common_dot_proto_dot_kuro__pb2.ContextRequest.FromString,
                     response_serializer=common_dot_proto_dot_kuro__pb2.ContextResponse.SerializeToString,
             ),
+            'StreamContext': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamContext,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.ContextRequest.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.ContextChunk.SerializeToString,
+            ),
             'ProposeMemory': grpc.unary_unary_rpc_method_handler(
                     servicer.ProposeMemory,
                     request_deserializer=common_dot_proto_dot_kuro__pb2.MemoryProposal.FromString,
@@ -171,6 +258,36 @@ def add_MemoryServiceServicer_to_server(servicer, server):
                     request_deserializer=common_dot_proto_dot_kuro__pb2.PreferenceUpdate.FromString,
                     response_serializer=common_dot_proto_dot_kuro__pb2.MemoryStatus.SerializeToString,
             ),
+            'ProposeMemoryBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ProposeMemoryBatch,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.MemoryProposalBatch.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.SerializeToString,
+            ),
+            'StreamMemoryProposals': grpc.stream_unary_rpc_method_handler(
+                    servicer.StreamMemoryProposals,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.MemoryProposal.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.SerializeToString,
+            ),
+            'UpsertRelation': grpc.unary_unary_rpc_method_handler(
+                    servicer.UpsertRelation,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.RelationUpdate.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.MemoryStatus.SerializeToString,
+            ),
+            'UpsertRelations': grpc.unary_unary_rpc_method_handler(
+                    servicer.UpsertRelations,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.RelationBatch.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.SerializeToString,
+            ),
+            'GetNeighborhood': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetNeighborhood,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.NeighborhoodRequest.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.NeighborhoodResponse.SerializeToString,
+            ),
+            'QueryAtoms': grpc.unary_stream_rpc_method_handler(
+                    servicer.QueryAtoms,
+                    request_deserializer=common_dot_proto_dot_kuro__pb2.AtomQuery.FromString,
+                    response_serializer=common_dot_proto_dot_kuro__pb2.AtomPage.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'kuro.MemoryService', rpc_method_handlers)
@@ -210,6 +327,33 @@ class MemoryService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def StreamContext(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/kuro.MemoryService/StreamContext',
+            common_dot_proto_dot_kuro__pb2.ContextRequest.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.ContextChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def ProposeMemory(request,
             target,
@@ -264,6 +408,168 @@ class MemoryService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ProposeMemoryBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/kuro.MemoryService/ProposeMemoryBatch',
+            common_dot_proto_dot_kuro__pb2.MemoryProposalBatch.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamMemoryProposals(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/kuro.MemoryService/StreamMemoryProposals',
+            common_dot_proto_dot_kuro__pb2.MemoryProposal.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UpsertRelation(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/kuro.MemoryService/UpsertRelation',
+            common_dot_proto_dot_kuro__pb2.RelationUpdate.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.MemoryStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UpsertRelations(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/kuro.MemoryService/UpsertRelations',
+            common_dot_proto_dot_kuro__pb2.RelationBatch.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.MemoryBatchStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetNeighborhood(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/kuro.MemoryService/GetNeighborhood',
+            common_dot_proto_dot_kuro__pb2.NeighborhoodRequest.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.NeighborhoodResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def QueryAtoms(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/kuro.MemoryService/QueryAtoms',
+            common_dot_proto_dot_kuro__pb2.AtomQuery.SerializeToString,
+            common_dot_proto_dot_kuro__pb2.AtomPage.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
 
 class RagServiceStub(object):
     """--- RAG SERVICE (VM 2) ---
@@ -1,48 +1,191 @@
 from common.proto import kuro_pb2
 from common.proto import kuro_pb2_grpc
 import psutil
+import asyncio
+import threading
 import time
 import os
 
-class HealthServicer(kuro_pb2_grpc.HealthServiceServicer):
+# How often the shared snapshot is refreshed (and Watch subscribers are sent an update).
+DEFAULT_SAMPLE_INTERVAL_SEC = 5.0
+
+
+class HealthSampler:
     """
-    Standardized Health Service for KURO nodes.
-    Tracks structured metrics like CPU, RAM, RSS, and Uptime.
+    Single background producer for node health.
+    Every interval_sec it samples process/host stats, the optional service gauges and
+    the metrics registry, and publishes one prebuilt HealthCheckResponse and one
+    ClusterHealth. Readers never touch psutil; Watch subscribers block on the
+    publication (threads) or get an asyncio event set (aio) instead of polling.
     """
-    def __init__(self, service_name):
+    def __init__(self, service_name, registry=None, gauges=None, interval_sec=DEFAULT_SAMPLE_INTERVAL_SEC):
         self.service_name = service_name
+        self.registry = registry
+        self.gauges = gauges
+        self.interval_sec = interval_sec
         self.process = psutil.Process(os.getpid())
         self.start_time = time.time()
+        self.generation = 0
+        self.response = None
+        self.health = None
+        self.errors = 0
+        self._cond = threading.Condition()
+        self._aio_subscribers = set()  # (loop, asyncio.Event)
+        self._stop = threading.Event()
+        self._thread = None
+        psutil.cpu_percent()  # prime: the first call has no reference interval
 
-    def Check(self, request, context):
+    def start(self):
+        if self._thread is None:
+            self.sample()
+            self._thread = threading.Thread(target=self._run_loop, name=f"health-{self.service_name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+        if self._thread:
+            self._thread.join()
+
+    def _run_loop(self):
+        while not self._stop.wait(self.interval_sec):
+            self.sample()
+
+    def _node_metrics(self):
+        metrics = kuro_pb2.NodeMetrics(
+            cpu_percent=psutil.cpu_percent(),
+            mem_percent=psutil.virtual_memory().percent,
+            rss_bytes=self.process.memory_info().rss,
+            uptime_sec=int(time.time() - self.start_time)
+        )
+        if self.gauges:
+            metrics.gauges.update(self.gauges())
+        return metrics
+
+    def sample(self):
+        """ Builds and publishes a fresh snapshot; keeps the previous one if sampling fails. """
         try:
-            metrics = kuro_pb2.NodeMetrics(
-                cpu_percent=psutil.cpu_percent(),
-                mem_percent=psutil.virtual_memory().percent,
-                rss_bytes=self.process.memory_info().rss,
-                uptime_sec=int(time.time() - self.start_time)
-            )
-            
-            return kuro_pb2.HealthCheckResponse(
+            metrics = self._node_metrics()
+            response = kuro_pb2.HealthCheckResponse(
                 status=kuro_pb2.HealthCheckResponse.SERVING,
                 node_metrics=metrics
             )
-        except Exception:
+            response.metrics["cpu_percent"] = metrics.cpu_percent
+            response.metrics["mem_percent"] = metrics.mem_percent
+            response.metrics["rss_bytes"] = metrics.rss_bytes
+            response.metrics["uptime_sec"] = metrics.uptime_sec
+            response.metrics.update(metrics.gauges)
+            if self.registry is not None:
+                response.metrics.update(self.registry.snapshot())
+            health = kuro_pb2.ClusterHealth(
+                nodes=[kuro_pb2.NodeHealth(
+                    node_name=self.service_name,
+                    status=kuro_pb2.HealthCheckResponse.SERVING,
+                    metrics=metrics,
+                    last_seen_unix=int(time.time())
+                )]
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"Health sampler error: {e}")
+            return
+        with self._cond:
+            self.response = response
+            self.health = health
+            self.generation += 1
+            subscribers = list(self._aio_subscribers)
+            self._cond.notify_all()
+        for entry in subscribers:
+            loop, event = entry
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone.
+                self.unsubscribe_aio(entry)
+
+    def wake(self):
+        """ Wakes blocked Watch threads so they can notice cancellation. """
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_for_update(self, generation, timeout):
+        """ Blocks until a snapshot newer than generation exists (or timeout/wake). """
+        with self._cond:
+            if self.generation == generation:
+                self._cond.wait(timeout)
+            return self.generation, self.health
+
+    def subscribe_aio(self):
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._aio_subscribers.add(entry)
+        return entry
+
+    def unsubscribe_aio(self, entry):
+        with self._cond:
+            self._aio_subscribers.discard(entry)
+
+
+class HealthServicer(kuro_pb2_grpc.HealthServiceServicer):
+    """
+    Standardized Health Service for KURO nodes.
+    Tracks structured metrics like CPU, RAM, RSS, and Uptime.
+    Check returns the sampler's latest snapshot (no syscalls on the probe path).
+    With a metrics registry the legacy `metrics` map also carries its snapshot;
+    gauges() adds service-specific values to NodeMetrics.gauges.
+    """
+    def __init__(self, service_name, registry=None, gauges=None, interval_sec=DEFAULT_SAMPLE_INTERVAL_SEC):
+        self.service_name = service_name
+        self.sampler = HealthSampler(service_name, registry, gauges, interval_sec).start()
+
+    def Check(self, request, context):
+        response = self.sampler.response
+        if response is None:
             return kuro_pb2.HealthCheckResponse(
                 status=kuro_pb2.HealthCheckResponse.NOT_SERVING
             )
+        return response
 
     def Watch(self, request, context):
         """
-        Default Watch yields the local health.
+        Default Watch yields the local health on every sample.
         VM4 (Ops) overrides this to yield ClusterHealth.
+        Returns (freeing the worker thread) as soon as the client goes away.
         """
-        while True:
-            yield kuro_pb2.ClusterHealth(
-                nodes=[kuro_pb2.NodeHealth(
-                    node_name=self.service_name,
-                    status=kuro_pb2.HealthCheckResponse.SERVING,
-                    last_seen_unix=int(time.time())
-                )]
-            )
-            time.sleep(5)
+        sampler = self.sampler
+        context.add_callback(sampler.wake)
+        generation, health = sampler.generation, sampler.health
+        if health is not None:
+            yield health
+        while context.is_active():
+            latest, health = sampler.wait_for_update(generation, sampler.interval_sec * 2)
+            if latest != generation and context.is_active():
+                generation = latest
+                yield health
+
+
+class AioHealthServicer(HealthServicer):
+    """
+    grpc.aio variant: Watch is an async generator, so idle subscribers hold no thread.
+    A client disconnect cancels the generator, which unsubscribes it.
+    """
+    async def Check(self, request, context):
+        return HealthServicer.Check(self, request, context)
+
+    async def Watch(self, request, context):
+        sampler = self.sampler
+        entry = sampler.subscribe_aio()
+        _, event = entry
+        try:
+            generation = sampler.generation
+            if sampler.health is not None:
+                yield sampler.health
+            while True:
+                await event.wait()
+                event.clear()
+                if sampler.generation != generation:
+                    generation = sampler.generation
+                    yield sampler.health
+        finally:
+            sampler.unsubscribe_aio(entry)
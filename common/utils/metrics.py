@@ -0,0 +1,480 @@
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import grpc
+
+# Seconds; tuned for RPCs and SQLite statements (sub-millisecond to tens of seconds).
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{v}"' for n, v in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values, **kwargs):
+        """ Child for one label combination; cache it when it is used on a hot path. """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _only(self):
+        return self._children[()]
+
+    def samples(self):
+        """ Yields (suffix, label_values, extra_labels, value). """
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(key)
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, key):
+        yield "_total", key, (), self.value
+
+
+class Counter(_Metric):
+    """ Monotonic count; exported as <name>_total. """
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount=1.0):
+        self._only().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = float(value)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def samples(self, key):
+        yield "", key, (), self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+    def set(self, value):
+        self._only().set(value)
+
+    def inc(self, amount=1.0):
+        self._only().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._only().dec(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """ Bucket-interpolated estimate, as histogram_quantile() would compute it. """
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def samples(self, key):
+        with self._lock:
+            counts, total, running_sum = list(self.counts), self.count, self.sum
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            yield "_bucket", key, (("le", _format_value(bound)),), cumulative
+        yield "_sum", key, (), running_sum
+        yield "_count", key, (), total
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labels)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._only().observe(value)
+
+    def time(self):
+        return _Timer(self._only())
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _Callback:
+    """ Values read at scrape time: fn() returns a number or {label_values: number}. """
+    def __init__(self, name, help_text, fn, kind, labels):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.kind = kind
+        self.labelnames = tuple(labels)
+
+    def samples(self):
+        values = self.fn()
+        if values is None:
+            return
+        suffix = "_total" if self.kind == "counter" else ""
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield suffix, key, (), float(value)
+
+
+class Registry:
+    """
+    Process-wide set of named metrics (VM 3 uses the module-level REGISTRY).
+    Renders the Prometheus text format for the HTTP endpoint and a flat
+    {"name{labels}": value} snapshot for HealthCheckResponse.metrics.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric '{metric.name}' already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name, help_text, fn, kind="gauge", labels=()):
+        """
+        Registers fn, evaluated on every scrape. Re-registering a name replaces the
+        previous callback (e.g. when a servicer is rebuilt).
+        """
+        metric = _Callback(name, help_text, fn, kind, labels)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def _collect(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                print(f"Metrics: collecting {metric.name} failed: {e}")
+                continue
+            yield metric, samples
+
+    def render(self):
+        lines = []
+        for metric, samples in self._collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, key, extra, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(metric.labelnames, key, extra)} "
+                             f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Flat view for map<string, float> consumers. Histograms contribute _count,
+        _sum and p50/p99 estimates instead of their buckets.
+        """
+        flat = {}
+        for metric, samples in self._collect():
+            for suffix, key, extra, value in samples:
+                if suffix == "_bucket":
+                    continue
+                flat[f"{metric.name}{suffix}{_format_labels(metric.labelnames, key)}"] = value
+            if isinstance(metric, Histogram):
+                with metric._lock:
+                    children = list(metric._children.items())
+                for key, child in children:
+                    labels = _format_labels(metric.labelnames, key)
+                    flat[f"{metric.name}_p50{labels}"] = child.quantile(0.50)
+                    flat[f"{metric.name}_p99{labels}"] = child.quantile(0.99)
+        return flat
+
+
+REGISTRY = Registry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """ Serves registry.render() at /metrics from a daemon thread; returns the server. """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def _split_method(full_method):
+    # "/kuro.MemoryService/GetContext" -> ("kuro.MemoryService", "GetContext")
+    _, _, rest = full_method.partition("/")
+    service, _, method = rest.partition("/")
+    return service or "unknown", method or full_method
+
+
+def _status_code(context, error):
+    if error is None:
+        code = getattr(context, "code", None)
+        code = code() if callable(code) else None
+        return code.name if isinstance(code, grpc.StatusCode) else "OK"
+    if isinstance(error, grpc.RpcError) and callable(getattr(error, "code", None)):
+        return error.code().name
+    code = getattr(context, "code", None)
+    code = code() if callable(code) else None
+    if isinstance(code, grpc.StatusCode) and code != grpc.StatusCode.OK:
+        return code.name
+    return "UNKNOWN"
+
+
+class _RpcMetrics:
+    def __init__(self, registry):
+        self.latency = registry.histogram(
+            "kuro_grpc_server_handling_seconds", "Time to handle an RPC, to the last response message.",
+            labels=("service", "method"))
+        self.handled = registry.counter(
+            "kuro_grpc_server_handled", "RPCs completed, by gRPC status code.",
+            labels=("service", "method", "code"))
+        self.in_flight = registry.gauge(
+            "kuro_grpc_server_in_flight", "RPCs currently being handled.", labels=("service", "method"))
+
+    def record(self, service, method, context, started, error):
+        self.latency.labels(service, method).observe(time.perf_counter() - started)
+        self.handled.labels(service, method, _status_code(context, error)).inc()
+        self.in_flight.labels(service, method).dec()
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """
+    Server interceptor recording per-RPC latency histograms, status-code counts and
+    in-flight gauges. Streaming responses are timed until the stream is exhausted.
+    """
+    def __init__(self, registry=REGISTRY):
+        self.metrics = _RpcMetrics(registry)
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        service, method = _split_method(handler_call_details.method)
+        metrics = self.metrics
+
+        def unary(behavior):
+            def wrapper(request, context):
+                started = time.perf_counter()
+                metrics.in_flight.labels(service, method).inc()
+                error = None
+                try:
+                    return behavior(request, context)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(service, method, context, started, error)
+            return wrapper
+
+        def streaming(behavior):
+            def wrapper(request, context):
+                started = time.perf_counter()
+                metrics.in_flight.labels(service, method).inc()
+                error = None
+                try:
+                    yield from behavior(request, context)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(service, method, context, started, error)
+            return wrapper
+
+        return _wrap_handler(handler, unary, streaming)
+
+
+class AioMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """ grpc.aio variant of MetricsInterceptor. """
+    def __init__(self, registry=REGISTRY):
+        self.metrics = _RpcMetrics(registry)
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        service, method = _split_method(handler_call_details.method)
+        metrics = self.metrics
+
+        def unary(behavior):
+            async def wrapper(request, context):
+                started = time.perf_counter()
+                metrics.in_flight.labels(service, method).inc()
+                error = None
+                try:
+                    return await behavior(request, context)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(service, method, context, started, error)
+            return wrapper
+
+        def streaming(behavior):
+            async def wrapper(request, context):
+                started = time.perf_counter()
+                metrics.in_flight.labels(service, method).inc()
+                error = None
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(service, method, context, started, error)
+            return wrapper
+
+        return _wrap_handler(handler, unary, streaming)
+
+
+def _wrap_handler(handler, unary, streaming):
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(
+            unary(handler.unary_unary), handler.request_deserializer, handler.response_serializer)
+    if handler.stream_unary:
+        return grpc.stream_unary_rpc_method_handler(
+            unary(handler.stream_unary), handler.request_deserializer, handler.response_serializer)
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(
+            streaming(handler.unary_stream), handler.request_deserializer, handler.response_serializer)
+    if handler.stream_stream:
+        return grpc.stream_stream_rpc_method_handler(
+            streaming(handler.stream_stream), handler.request_deserializer, handler.response_serializer)
+    return handler
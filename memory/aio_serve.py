@@ -0,0 +1,145 @@
+import asyncio
+import os
+import signal
+from concurrent import futures
+
+import grpc
+
+from memory.serve import MemoryServicer, STREAM_BATCH_SIZE, start_metrics_endpoint
+from common.utils.health import AioHealthServicer
+from common.utils.metrics import REGISTRY, AioMetricsInterceptor
+from common.proto import kuro_pb2
+from common.proto import kuro_pb2_grpc
+
+
+class AioMemoryServicer(kuro_pb2_grpc.MemoryServiceServicer):
+    """
+    grpc.aio front-end for MemoryServicer (VM 3).
+    The event loop only parses requests; SQLite work runs on bounded executors:
+    a reader pool for GetContext and a single writer thread for direct writes.
+    Group-committed writes are awaited on their queue futures without holding a thread,
+    so in-flight clients scale independently of thread count.
+    """
+    def __init__(self, servicer: MemoryServicer, read_workers=8):
+        self.servicer = servicer
+        self.read_executor = futures.ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="memory-read")
+        self.write_executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-write")
+
+    async def _run(self, executor, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def GetContext(self, request, context):
+        return await self._run(self.read_executor, self.servicer.GetContext, request, None)
+
+    async def StreamContext(self, request, context):
+        # Each chunk is built on a reader thread; the generator (and the pooled connection
+        # it holds) is closed there too, once any in-flight step has finished.
+        chunks = self.servicer._context_chunks(request)
+        step = None
+        try:
+            while True:
+                step = self.read_executor.submit(next, chunks, None)
+                chunk = await asyncio.wrap_future(step)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            if step is None:
+                chunks.close()
+            else:
+                step.add_done_callback(lambda _: self.read_executor.submit(chunks.close))
+
+    async def ProposeMemory(self, request, context):
+        queue = self.servicer.write_queue
+        if not queue or self.servicer.hot_tier:
+            return await self._run(self.write_executor, self.servicer.ProposeMemory, request, None)
+        try:
+            future = queue.submit_atom(
+                request.entity_id, request.dimension, request.delta,
+                request.context_hash, request.confidence
+            )
+            if queue.ack_mode == "enqueue":
+                return kuro_pb2.MemoryStatus(success=True, message="Memory atom queued.")
+            await asyncio.wrap_future(future)
+            return kuro_pb2.MemoryStatus(success=True, message="Memory atom stored.")
+        except Exception as e:
+            return kuro_pb2.MemoryStatus(success=False, message=str(e))
+
+    async def ProposeMemoryBatch(self, request, context):
+        return await self._run(self.write_executor, self.servicer._apply_proposals, request.proposals)
+
+    async def StreamMemoryProposals(self, request_iterator, context):
+        response = kuro_pb2.MemoryBatchStatus()
+        pending = []
+        async for proposal in request_iterator:
+            pending.append(proposal)
+            if len(pending) >= STREAM_BATCH_SIZE:
+                part = await self._run(self.write_executor, self.servicer._apply_proposals, pending)
+                self.servicer._merge_batch_status(response, part)
+                pending = []
+        if pending:
+            part = await self._run(self.write_executor, self.servicer._apply_proposals, pending)
+            self.servicer._merge_batch_status(response, part)
+        return response
+
+    async def UpsertRelation(self, request, context):
+        return await self._run(self.write_executor, self.servicer.UpsertRelation, request, None)
+
+    async def UpsertRelations(self, request, context):
+        return await self._run(self.write_executor, self.servicer.UpsertRelations, request, None)
+
+    async def GetNeighborhood(self, request, context):
+        return await self._run(self.read_executor, self.servicer.GetNeighborhood, request, None)
+
+    async def QueryAtoms(self, request, context):
+        servicer = self.servicer
+        if servicer.hot_tier:
+            await self._run(self.write_executor, servicer.hot_tier.checkpoint)
+        cursor, remaining = request.cursor or None, request.limit or None
+        while True:
+            try:
+                page, cursor, remaining = await self._run(
+                    self.read_executor, servicer._query_atoms_page, request, cursor, remaining)
+            except ValueError as e:
+                await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+            yield page
+            if not page.next_cursor or remaining == 0:
+                return
+
+    async def UpdatePreference(self, request, context):
+        queue = self.servicer.write_queue
+        if not queue:
+            return await self._run(self.write_executor, self.servicer.UpdatePreference, request, None)
+        delta = self.servicer.reinforce_engine.signal_delta(request.value > 0.5)
+        try:
+            future = queue.submit_preference(request.key, delta)
+            if queue.ack_mode == "enqueue":
+                return kuro_pb2.MemoryStatus(success=True, message=f"Preference '{request.key}' queued.")
+            await asyncio.wrap_future(future)
+        except Exception as e:
+            return kuro_pb2.MemoryStatus(success=False, message=str(e))
+        return kuro_pb2.MemoryStatus(success=True, message=f"Preference '{request.key}' reinforced.")
+
+
+async def serve_aio():
+    read_workers = int(os.environ.get("KURO_MEMORY_READ_WORKERS", "8"))
+    server = grpc.aio.server(interceptors=[AioMetricsInterceptor()])
+    servicer = MemoryServicer()
+    kuro_pb2_grpc.add_MemoryServiceServicer_to_server(AioMemoryServicer(servicer, read_workers), server)
+    kuro_pb2_grpc.add_HealthServiceServicer_to_server(
+        AioHealthServicer("Memory", registry=REGISTRY, gauges=servicer.health_gauges,
+                          interval_sec=float(os.environ.get("KURO_MEMORY_HEALTH_INTERVAL_SEC", "5"))), server)
+    start_metrics_endpoint()
+    port = os.environ.get("KURO_MEMORY_PORT", "50053")
+    server.add_insecure_port(f'0.0.0.0:{port}')
+    print(f"Memory Substrate (VM 3) starting on port {port} (asyncio)...")
+    await server.start()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(server.stop(5)))
+    try:
+        await server.wait_for_termination()
+    finally:
+        servicer.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_aio())
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+PREFERENCES_KEY = ("preferences",)
+
+
+def entity_key(entity_id):
+    return ("entity", entity_id)
+
+
+class ContextCache:
+    """
+    Read-through LRU/TTL cache for GetContext (VM 3).
+    Holds per-entity summaries and the preference snapshot, bounded by entry count
+    and an approximate byte budget. A key may hold several variants (e.g. different
+    top_k filters for one entity); invalidating the key drops all of them.
+
+    Staleness guarantee: writers invalidate after commit and before acknowledging.
+    Readers take a token before querying SQLite and put() rejects the value if any
+    invalidation for that key landed in between, so a fill can never resurrect data
+    older than an acknowledged write.
+    """
+    _STRIPES = 1024
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024, ttl_sec=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (key, variant) -> (value, size, expires_at)
+        self._variants = {}  # key -> {variant, ...}
+        self._bytes = 0
+        # Striped generation counters keep the bookkeeping bounded; a collision only
+        # causes a spurious rejected fill, never a stale one.
+        self._generations = [0] * self._STRIPES
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.rejected_fills = 0
+
+    def _stripe(self, key):
+        return hash(key) % self._STRIPES
+
+    def get(self, key, variant=None):
+        """ Returns (hit, value). """
+        with self._lock:
+            slot = (key, variant)
+            entry = self._entries.get(slot)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    return True, value
+                self._drop(slot)
+            self.misses += 1
+            return False, None
+
+    def token(self, key):
+        """ Snapshot to pass to put(); take it before reading from the database. """
+        with self._lock:
+            return self._epoch, self._generations[self._stripe(key)]
+
+    def put(self, key, value, token, size, variant=None):
+        with self._lock:
+            if token != (self._epoch, self._generations[self._stripe(key)]):
+                self.rejected_fills += 1
+                return False
+            if size > self.max_bytes:
+                return False
+            slot = (key, variant)
+            if slot in self._entries:
+                self._drop(slot)
+            self._entries[slot] = (value, size, time.monotonic() + self.ttl_sec)
+            self._variants.setdefault(key, set()).add(variant)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            return True
+
+    def _drop(self, slot):
+        _, size, _ = self._entries.pop(slot)
+        self._bytes -= size
+        key, variant = slot
+        variants = self._variants.get(key)
+        if variants is not None:
+            variants.discard(variant)
+            if not variants:
+                del self._variants[key]
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._generations[self._stripe(key)] += 1
+                for variant in list(self._variants.get(key, ())):
+                    self._drop((key, variant))
+                self.invalidations += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._variants.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def on_change(self, entities, pref_keys, all_entities=False):
+        """ MemoryDB change listener (see MemoryDB.add_listener). """
+        if all_entities:
+            self.invalidate_all()
+            return
+        keys = [entity_key(e) for e in entities]
+        if pref_keys:
+            keys.append(PREFERENCES_KEY)
+        if keys:
+            self.invalidate(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "rejected_fills": self.rejected_fills,
+            }
@@ -0,0 +1,265 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from common.utils.metrics import REGISTRY
+
+# Applied once per physical connection (not per checkout).
+# cache_size is negative => KiB; mmap_size is bytes.
+DEFAULT_PRAGMAS = (
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+    # After a checkpoint resets the WAL, truncate the file back to this many bytes.
+    ("journal_size_limit", 67108864),
+)
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "kuro_db_query_seconds", "Time in execute()/executemany(), by statement type (SELECTs exclude fetching).",
+    labels=("statement",))
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "kuro_db_lock_wait_seconds", "Time spent in BEGIN IMMEDIATE waiting for the database write lock.")
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "kuro_db_pool_wait_seconds", "Time spent waiting to check out a pooled connection.")
+CHECKOUT_SECONDS = REGISTRY.histogram(
+    "kuro_db_checkout_seconds", "How long a pooled connection was held (one unit of work or transaction).")
+# Statement label is the leading keyword; anything unexpected is folded into "other".
+_STATEMENTS = {"select", "insert", "update", "delete", "with", "begin", "commit", "rollback",
+               "savepoint", "release", "pragma", "create", "drop"}
+
+
+def _observe(sql, elapsed):
+    verb = sql.lstrip()[:9].split(None, 1)
+    verb = verb[0].lower() if verb else "other"
+    if verb == "begin" and "IMMEDIATE" in sql.upper():
+        LOCK_WAIT_SECONDS.observe(elapsed)
+    QUERY_SECONDS.labels(verb if verb in _STATEMENTS else "other").observe(elapsed)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection that remembers when it was opened and when it was last used,
+    so the pool can recycle old handles and ping ones that sat idle.
+    execute()/executemany() are timed into kuro_db_query_seconds.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.broken = False
+        self.pragma_epoch = 0
+        self.pool = None
+
+    def execute(self, sql, parameters=()):
+        if self.pool is not None and self.pool._writes_held and sql.startswith("BEGIN IMMEDIATE"):
+            self.pool.wait_for_writes()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe(sql, time.perf_counter() - started)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections for VM 3.
+    Connections are checked out by one thread at a time (gRPC workers, decay thread)
+    and returned afterwards, so the connect + PRAGMA cost is paid once per handle.
+    """
+    def __init__(self, db_path, max_size=12, max_age_sec=900, ping_after_sec=60,
+                 acquire_timeout=30.0, pragmas=DEFAULT_PRAGMAS, on_connect=None):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.max_age_sec = max_age_sec
+        self.ping_after_sec = ping_after_sec
+        self.acquire_timeout = acquire_timeout
+        self.pragmas = pragmas
+        self.on_connect = on_connect
+        self._idle = []
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._pragma_epoch = 0
+        self._writes_held = 0
+        self.last_activity = time.monotonic()
+
+        # journal_mode=WAL is persistent on the database file; set it once up front.
+        conn = self.acquire()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            self.release(conn)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+            timeout=self.acquire_timeout,
+        )
+        conn.pool = self
+        self._apply_pragmas(conn)
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _apply_pragmas(self, conn):
+        epoch, pragmas = self._pragma_epoch, self.pragmas
+        for name, value in pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        conn.pragma_epoch = epoch
+
+    def set_pragma(self, name, value):
+        """
+        Changes a per-connection PRAGMA. New handles get it on open; existing ones
+        are updated the next time they are checked out.
+        """
+        with self._cond:
+            self.pragmas = tuple(p for p in self.pragmas if p[0] != name) + ((name, value),)
+            self._pragma_epoch += 1
+
+    def _is_stale(self, conn, now):
+        if conn.broken or now - conn.created_at > self.max_age_sec:
+            return True
+        if now - conn.last_used > self.ping_after_sec:
+            try:
+                conn.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                return True
+        return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def acquire(self):
+        started = time.perf_counter()
+        try:
+            return self._acquire()
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    if self._opened < self.max_size:
+                        self._opened += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"No pooled connection available for {self.db_path}")
+                        self._cond.wait(remaining)
+                        continue
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._opened -= 1
+                        self._cond.notify()
+                    raise
+
+            # Recycle outside the lock: the ping may touch disk.
+            if self._is_stale(conn, time.monotonic()):
+                self._discard(conn)
+                continue
+            if conn.pragma_epoch != self._pragma_epoch:
+                try:
+                    self._apply_pragmas(conn)
+                except sqlite3.Error:
+                    self._discard(conn)
+                    continue
+            return conn
+
+    def release(self, conn):
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                conn.broken = True
+        conn.last_used = time.monotonic()
+        self.last_activity = conn.last_used
+
+        if conn.broken or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        checked_out = time.perf_counter()
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            # Constraint violations and lock timeouts are transient; anything else may mean a bad handle.
+            if not isinstance(e, (sqlite3.IntegrityError, sqlite3.OperationalError)):
+                conn.broken = True
+            raise
+        finally:
+            self.release(conn)
+            CHECKOUT_SECONDS.observe(time.perf_counter() - checked_out)
+
+    @contextmanager
+    def hold_writes(self):
+        """
+        While the block runs, BEGIN IMMEDIATE on pooled connections waits (for at most
+        acquire_timeout). Lets a WAL checkpoint get the write lock without racing
+        writers that re-acquire it back to back.
+        """
+        with self._cond:
+            self._writes_held += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writes_held -= 1
+                self._cond.notify_all()
+
+    def wait_for_writes(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while self._writes_held:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def in_use(self):
+        """ Connections currently checked out. """
+        with self._cond:
+            return self._opened - len(self._idle)
+
+    def stats(self):
+        with self._cond:
+            return {"opened": self._opened, "idle": len(self._idle), "max_size": self.max_size}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
@@ -0,0 +1,610 @@
+"""
+Optional in-memory tier for memory atoms (VM 3).
+Active entities' atoms live in compact per-entity arrays; reads never touch SQLite
+once an entity is resident, writes are applied in memory and made durable through an
+append log, and a background checkpoint folds them into kuro_memory.db.
+"""
+import datetime
+import json
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from memory.db.memory_db import (MemoryDB, CAP_EVICTIONS, CONFIDENCE_KEEP, IN_LIST_LIMIT, INVALID_PROPOSAL,
+                                 format_summary)
+from memory.db.sql_functions import atom_expiry
+
+# Rough resident footprint used for the memory budget: arrays, index entry, key tuple
+# and context hash per atom, plus the per-entity containers.
+ATOM_BYTES = 240
+ENTITY_BYTES = 512
+
+# Matches the decay_rate MemoryDB._upsert_atom gives new atoms.
+DEFAULT_DECAY_RATE = 0.05
+
+NEVER = math.inf
+
+
+class _EntityAtoms:
+    """
+    All atoms of one entity as parallel arrays (structure of arrays): slot i of each
+    array is one atom, and index maps (dimension, context_hash) -> slot.
+    """
+    __slots__ = ("entity_id", "index", "dimensions", "context_hashes",
+                 "magnitude", "confidence", "decay_rate", "updated", "expires_at")
+
+    def __init__(self, entity_id):
+        self.entity_id = entity_id
+        self.index = {}
+        self.dimensions = []
+        self.context_hashes = []
+        self.magnitude = array("d")
+        self.confidence = array("d")
+        self.decay_rate = array("d")
+        self.updated = array("d")     # epoch seconds
+        self.expires_at = array("d")  # epoch seconds, NEVER if the atom does not decay
+
+    def __len__(self):
+        return len(self.dimensions)
+
+    def nbytes(self):
+        return ENTITY_BYTES + ATOM_BYTES * len(self.dimensions)
+
+    def set(self, dimension, context_hash, image):
+        """ Stores an atom image; returns True if it added a new slot. """
+        magnitude, confidence, decay_rate, updated, expires_at = image
+        expires_at = NEVER if expires_at is None else expires_at
+        slot = self.index.get((dimension, context_hash))
+        if slot is None:
+            self.index[(dimension, context_hash)] = len(self.dimensions)
+            self.dimensions.append(sys.intern(dimension))
+            self.context_hashes.append(context_hash)
+            self.magnitude.append(magnitude)
+            self.confidence.append(confidence)
+            self.decay_rate.append(decay_rate)
+            self.updated.append(updated)
+            self.expires_at.append(expires_at)
+            return True
+        self.magnitude[slot] = magnitude
+        self.confidence[slot] = confidence
+        self.decay_rate[slot] = decay_rate
+        self.updated[slot] = updated
+        self.expires_at[slot] = expires_at
+        return False
+
+    def remove(self, dimension, context_hash):
+        """ Swap-removes an atom; returns True if it was present. """
+        slot = self.index.pop((dimension, context_hash), None)
+        if slot is None:
+            return False
+        last = len(self.dimensions) - 1
+        if slot != last:
+            self.dimensions[slot] = self.dimensions[last]
+            self.context_hashes[slot] = self.context_hashes[last]
+            for column in (self.magnitude, self.confidence, self.decay_rate, self.updated, self.expires_at):
+                column[slot] = column[last]
+            self.index[(self.dimensions[slot], self.context_hashes[slot])] = slot
+        self.dimensions.pop()
+        self.context_hashes.pop()
+        for column in (self.magnitude, self.confidence, self.decay_rate, self.updated, self.expires_at):
+            column.pop()
+        return True
+
+
+class HotTier:
+    """
+    Read/write-through atom tier in front of MemoryDB, with the same fetch_atoms /
+    update_atom(s) / summary methods so the servicer can use either.
+
+    Entities are loaded from SQLite on first use (one query for all misses of a call)
+    and evicted LRU once the resident set exceeds max_bytes. Every write is applied in
+    memory and appended to an append log as a full atom image with a log sequence
+    number (LSN); a checkpoint thread writes dirty atoms to memory_atoms every
+    checkpoint_interval_sec together with the checkpointed LSN, then truncates the log.
+    On startup, log records newer than the last checkpoint are replayed into SQLite.
+    Each write is flushed to the OS before it is acknowledged, so a process crash
+    loses nothing; sync_writes=True also fsyncs, for power loss.
+
+    Bulk maintenance (decay, pruning, collapse, cap sweeps) rewrites SQLite directly,
+    so it runs behind MemoryDB.maintenance(): the tier checkpoints once and keeps
+    accepting writes, but stops checkpointing and journals each write as a proposal
+    until the pass ends. Entities the pass reports as changed are rebuilt from SQLite
+    with their journaled proposals replayed on top, so a write and the pass that ran
+    alongside it both take effect. A crash before an entity is rebuilt replays images
+    computed before the pass reached it, so that pass is lost for those atoms only.
+    """
+    def __init__(self, db: MemoryDB, max_bytes=64 * 1024 * 1024, checkpoint_interval_sec=5.0,
+                 log_path=None, sync_writes=False):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.checkpoint_interval_sec = checkpoint_interval_sec
+        self.log_path = log_path or f"{db.db_path}-hotlog"
+        self.sync_writes = sync_writes
+        self._lock = threading.Lock()  # resident set, dirty maps and the log
+        self._write_gate = threading.RLock()  # held by writers, and by maintenance while it checkpoints
+        self._checkpoint_lock = threading.Lock()
+        self._local = threading.local()
+        self._entities = OrderedDict()  # entity_id -> _EntityAtoms, least recently used first
+        self._bytes = 0
+        # entity_id -> {(dimension, context_hash): image or None (deleted)}; _flushing is
+        # the snapshot being checkpointed. Both are overlaid on SQLite when loading.
+        self._dirty = {}
+        self._flushing = {}
+        # While maintenance runs: entity_id -> proposals written since it started, the
+        # journaled entities SQLite changed under since, and how many passes are open.
+        self._journal = None
+        self._stale = set()
+        self._maintaining = 0
+        self._lsn = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.checkpoints = 0
+        self.last_checkpoint_sec = 0.0
+
+        self._recover()
+        self._log = open(self.log_path, "ab")
+        db.add_listener(self.on_change)
+        db.add_maintenance_hook(self.maintenance)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="memory-hot-tier", daemon=True)
+        self._thread.start()
+        print(f"Hot tier started (budget {self.max_bytes // (1024 * 1024)} MB, "
+              f"checkpoint every {self.checkpoint_interval_sec}s, log {self.log_path})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.checkpoint()
+        with self._lock:
+            self._log.close()
+
+    def _run_loop(self):
+        while not self._stop.wait(self.checkpoint_interval_sec):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Hot tier checkpoint failed: {e}")
+
+    # --- reads ---
+
+    def fetch_atoms(self, entities, top_k=0, min_magnitude=0.0, detail=False):
+        """ Same contract as MemoryDB.fetch_atoms, served from memory. """
+        entities = list(dict.fromkeys(entities))
+        if not entities:
+            return {}
+        now = time.time()
+        lazy = self.db.lazy_decay
+        grouped = {}
+        with self._lock:
+            records = self._resident(entities)
+            for ent in entities:
+                record = records[ent]
+                rows = []
+                for i in range(len(record)):
+                    magnitude = record.magnitude[i]
+                    if lazy:
+                        # Expired but not yet swept atoms are already forgotten.
+                        if record.expires_at[i] <= now:
+                            continue
+                        magnitude *= math.exp(-record.decay_rate[i] * (now - record.updated[i]) / 3600.0)
+                    if min_magnitude > 0 and abs(magnitude) < min_magnitude:
+                        continue
+                    if detail:
+                        rows.append((record.dimensions[i], magnitude, record.confidence[i], record.updated[i]))
+                    else:
+                        rows.append((record.dimensions[i], magnitude))
+                if rows:
+                    rows.sort(key=lambda row: -abs(row[1]))
+                    grouped[ent] = rows[:top_k] if top_k > 0 else rows
+        return grouped
+
+    def iter_atoms(self, entities, top_k=0, min_magnitude=0.0, batch_size=None):
+        """ Same contract as MemoryDB.iter_atoms; entities are already resident, one at a time. """
+        for entity_id in dict.fromkeys(entities):
+            rows = self.fetch_atoms([entity_id], top_k=top_k, min_magnitude=min_magnitude, detail=True)
+            for row in rows.get(entity_id, ()):
+                yield (entity_id,) + row
+
+    def get_memory_summary_map(self, entities, top_k=0, min_magnitude=0.0):
+        grouped = self.fetch_atoms(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return {ent: format_summary(ent, atoms) for ent, atoms in grouped.items()}
+
+    def get_memory_summaries(self, entities, top_k=0, min_magnitude=0.0):
+        summary_map = self.get_memory_summary_map(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return [summary_map[ent] for ent in dict.fromkeys(entities) if ent in summary_map]
+
+    # --- writes ---
+
+    def update_atom(self, entity_id, dimension, delta, context_hash, confidence=0.5):
+        ok, message = self.update_atoms([(entity_id, dimension, delta, context_hash, confidence)])[0]
+        if not ok:
+            raise ValueError(message)
+
+    def update_atoms(self, proposals):
+        """
+        Same contract as MemoryDB.update_atoms. All proposals are applied in memory
+        and logged with a single append; caps are enforced once per touched pair.
+        """
+        now = time.time()
+        results = []
+        touched = set()
+        lines = []
+        proposals = [(e, self.db.resolve_dimension(d), delta, h, c) for e, d, delta, h, c in proposals]
+        with self._write_gate:
+            with self._lock:
+                records = self._resident([p[0] for p in proposals if p[0]])
+                for entity_id, dimension, delta, context_hash, confidence in proposals:
+                    if not entity_id or not dimension:
+                        results.append((False, INVALID_PROPOSAL))
+                        continue
+                    if self._journal is not None:
+                        self._journal.setdefault(entity_id, []).append(
+                            (dimension, delta, context_hash, confidence, now))
+                    if self._apply(records[entity_id], dimension, delta, context_hash, confidence, now, lines):
+                        self._bytes += ATOM_BYTES
+                    touched.add((entity_id, dimension))
+                    results.append((True, "Memory atom stored."))
+                for entity_id, dimension in touched:
+                    self._bytes -= ATOM_BYTES * self._enforce_cap(records[entity_id], dimension, lines)
+                self._append(lines)
+                self._evict_over_budget()
+            self._notify({entity_id for entity_id, _ in touched})
+        return results
+
+    def _apply(self, record, dimension, delta, context_hash, confidence, now, lines):
+        """ One proposal against a resident record, logged; returns True if it added an atom. """
+        slot = record.index.get((dimension, context_hash))
+        if slot is None:
+            magnitude, decay_rate = max(-1.0, min(1.0, delta)), DEFAULT_DECAY_RATE
+        else:
+            magnitude, decay_rate = record.magnitude[slot], record.decay_rate[slot]
+            if self.db.lazy_decay:
+                # Re-anchor: decay the stored value up to now before adding the delta.
+                magnitude *= math.exp(-decay_rate * (now - record.updated[slot]) / 3600.0)
+            magnitude = max(-1.0, min(1.0, magnitude + delta))
+            confidence = record.confidence[slot] * CONFIDENCE_KEEP + confidence * (1.0 - CONFIDENCE_KEEP)
+        image = (magnitude, confidence, decay_rate, now, atom_expiry(magnitude, decay_rate, now))
+        self._mark(record.entity_id, dimension, context_hash, image, lines)
+        return record.set(dimension, context_hash, image)
+
+    def _mark(self, entity_id, dimension, context_hash, image, lines):
+        self._lsn += 1
+        self._dirty.setdefault(entity_id, {})[(dimension, context_hash)] = image
+        record = [self._lsn, entity_id, dimension, context_hash]
+        if image is not None:
+            record.extend(image)
+        lines.append(json.dumps(record, separators=(",", ":")))
+
+    def _append(self, lines):
+        if not lines:
+            return
+        self._log.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self._log.flush()
+        if self.sync_writes:
+            os.fsync(self._log.fileno())
+
+    def _enforce_cap(self, record, dimension, lines):
+        """ Evicts atoms of one dimension beyond its cap; returns how many. """
+        max_atoms, eviction = self.db.dimension_policy(dimension)
+        slots = [i for i, d in enumerate(record.dimensions) if d == dimension]
+        if len(slots) <= max_atoms:
+            return 0
+        if eviction == "magnitude":
+            now = time.time()
+            lazy = self.db.lazy_decay
+            order = lambda i: abs(record.magnitude[i] * (
+                math.exp(-record.decay_rate[i] * (now - record.updated[i]) / 3600.0) if lazy else 1.0))
+        elif eviction == "oldest":
+            order = lambda i: record.updated[i]
+        else:
+            order = lambda i: record.confidence[i]
+        excess = len(slots) - max_atoms
+        victims = [record.context_hashes[i] for i in sorted(slots, key=order)[:excess]]
+        for context_hash in victims:
+            record.remove(dimension, context_hash)
+            self._mark(record.entity_id, dimension, context_hash, None, lines)
+        CAP_EVICTIONS.labels(eviction).inc(excess)
+        return excess
+
+    def _notify(self, entities):
+        # Our own notifications only need to reach the other listeners (e.g. the context cache).
+        self._local.notifying = True
+        try:
+            self.db.notify_change(entities=entities)
+        finally:
+            self._local.notifying = False
+
+    # --- residency ---
+
+    def _resident(self, entities):
+        """ {entity_id: _EntityAtoms} for the given entities, loading misses in one query. Needs _lock. """
+        records = {}
+        missing = []
+        for ent in entities:
+            record = self._entities.get(ent)
+            if record is None:
+                missing.append(ent)
+            else:
+                self._entities.move_to_end(ent)
+                records[ent] = record
+        self.hits += len(records)
+        if missing:
+            missing = list(dict.fromkeys(missing))
+            self.misses += len(missing)
+            loaded = self._load(missing)
+            for ent, record in loaded.items():
+                self._entities[ent] = record
+                self._bytes += record.nbytes()
+            records.update(loaded)
+            self._evict_over_budget(keep=records)
+        return records
+
+    def _load(self, entities):
+        records = {ent: _EntityAtoms(ent) for ent in entities}
+        groups = self.db.group_by_shard(entities)
+        self.db.map_shards(lambda shard: self._load_shard(shard, groups[shard], records), groups)
+        lines = []
+        for ent, record in records.items():
+            if ent in self._stale:
+                self._rebase(record, lines)
+                continue
+            # Writes not yet in SQLite win over what was just read.
+            for overlay in (self._flushing, self._dirty):
+                for (dimension, context_hash), image in overlay.get(ent, {}).items():
+                    if image is None:
+                        record.remove(dimension, context_hash)
+                    else:
+                        record.set(dimension, context_hash, image)
+        self._append(lines)
+        return records
+
+    def _rebase(self, record, lines):
+        """
+        Rebuilds a journaled entity freshly read from SQLite: replays the proposals
+        written since maintenance began and re-logs the resulting images. Needs _lock.
+        """
+        self._stale.discard(record.entity_id)
+        self._dirty.pop(record.entity_id, None)
+        dimensions = set()
+        for dimension, delta, context_hash, confidence, now in self._journal[record.entity_id]:
+            # A collapse that touched this entity may have aliased the dimension since.
+            dimension = self.db.resolve_dimension(dimension)
+            self._apply(record, dimension, delta, context_hash, confidence, now, lines)
+            dimensions.add(dimension)
+        for dimension in dimensions:
+            self._enforce_cap(record, dimension, lines)
+
+    @staticmethod
+    def _load_shard(db, entities, records):
+        with db.get_conn() as conn:
+            for start in range(0, len(entities), IN_LIST_LIMIT):
+                chunk = entities[start:start + IN_LIST_LIMIT]
+                for row in conn.execute(f"""
+                    SELECT entity_id, dimension, context_hash, magnitude, confidence, decay_rate,
+                           last_updated, expires_at
+                    FROM memory_atoms WHERE entity_id IN ({", ".join("?" * len(chunk))})
+                """, chunk):
+                    entity_id, dimension, context_hash, magnitude, confidence, decay_rate, updated, expires_at = row
+                    if dimension is None or context_hash is None:
+                        continue
+                    records[entity_id].set(dimension, context_hash, (
+                        magnitude or 0.0, confidence or 0.0, decay_rate or 0.0, updated or 0.0, expires_at))
+
+    def _evict_over_budget(self, keep=()):
+        # Dropping a record is always safe: unflushed writes are overlaid again on reload.
+        while self._bytes > self.max_bytes and self._entities:
+            ent = next(iter(self._entities))
+            if ent in keep:
+                if len(self._entities) <= len(keep):
+                    break
+                self._entities.move_to_end(ent)
+                continue
+            self._bytes -= self._entities.pop(ent).nbytes()
+            self.evictions += 1
+
+    def on_change(self, entities, pref_keys, all_entities=False):
+        """
+        MemoryDB change listener: drop entities that were rewritten in SQLite directly.
+        Those written during maintenance are rebuilt on their next load.
+        """
+        if getattr(self._local, "notifying", False):
+            return
+        with self._lock:
+            if all_entities:
+                self._entities.clear()
+                self._bytes = 0
+                if self._journal:
+                    self._stale.update(self._journal)
+                return
+            for ent in entities:
+                record = self._entities.pop(ent, None)
+                if record is not None:
+                    self._bytes -= record.nbytes()
+                if self._journal and ent in self._journal:
+                    self._stale.add(ent)
+
+    @contextmanager
+    def maintenance(self):
+        """
+        MemoryDB maintenance hook: checkpoint, then journal writes instead of
+        checkpointing them until the last open pass is done. Writes wait only for
+        the opening checkpoint.
+        """
+        with self._write_gate:
+            with self._lock:
+                opening = self._maintaining == 0
+                self._maintaining += 1
+            try:
+                if opening:
+                    self.checkpoint()
+                    with self._lock:
+                        self._journal = {}
+            except Exception:
+                with self._lock:
+                    self._maintaining -= 1
+                raise
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._maintaining -= 1
+                if self._maintaining == 0 and self._journal is not None:
+                    if self._stale:
+                        # Entities the pass changed that were not loaded since; settle their images now.
+                        self._load(list(self._stale))
+                    self._journal = None
+                    self._stale = set()
+
+    # --- durability ---
+
+    def checkpoint(self):
+        """
+        Writes every dirty atom to SQLite in one transaction and truncates the log.
+        A no-op while maintenance runs; the dirty atoms are written after it.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                if not self._dirty or self._journal is not None:
+                    return 0
+                snapshot, self._dirty = self._dirty, {}
+                self._flushing = snapshot
+                lsn = self._lsn
+                offset = self._log.tell()
+            started = time.perf_counter()
+            try:
+                written = self._write_images(snapshot, lsn)
+            except Exception:
+                with self._lock:
+                    # Newer writes since the snapshot win; the log still holds everything.
+                    for ent, images in snapshot.items():
+                        current = self._dirty.setdefault(ent, {})
+                        for key, image in images.items():
+                            current.setdefault(key, image)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+                self._truncate_log(offset)
+            self.checkpoints += 1
+            self.last_checkpoint_sec = time.perf_counter() - started
+            return written
+
+    def _write_images(self, images_by_entity, lsn):
+        """
+        Writes the images on each shard in its own transaction, recording lsn on every
+        shard; recovery replays from the lowest, and replaying full images is idempotent.
+        """
+        puts = {}
+        deletes = {}
+        for entity_id, images in images_by_entity.items():
+            shard = self.db.shard_for(entity_id)
+            for (dimension, context_hash), image in images.items():
+                if image is None:
+                    deletes.setdefault(shard, []).append((entity_id, dimension, context_hash))
+                    continue
+                magnitude, confidence, decay_rate, updated, expires_at = image
+                puts.setdefault(shard, []).append(
+                    (entity_id, dimension, magnitude, context_hash, confidence, decay_rate, updated, expires_at))
+        self.db.map_shards(lambda shard: self._write_shard(shard, puts.get(shard, []), deletes.get(shard, []), lsn))
+        return sum(map(len, puts.values())) + sum(map(len, deletes.values()))
+
+    def _write_shard(self, db, puts, deletes, lsn):
+        with db.get_conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM memory_atoms WHERE entity_id = ? AND dimension = ? AND context_hash = ?",
+                             deletes)
+            conn.executemany("""
+                INSERT INTO memory_atoms (entity_id, dimension, magnitude, context_hash, confidence, decay_rate, last_updated, expires_at, written_at)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?7)
+                ON CONFLICT(entity_id, dimension, context_hash) DO UPDATE SET
+                    magnitude = EXCLUDED.magnitude,
+                    confidence = EXCLUDED.confidence,
+                    decay_rate = EXCLUDED.decay_rate,
+                    last_updated = EXCLUDED.last_updated,
+                    expires_at = EXCLUDED.expires_at,
+                    written_at = EXCLUDED.written_at
+            """, puts)
+            conn.execute("""
+                INSERT INTO hot_tier_checkpoints (log_path, lsn, checkpointed_at) VALUES (?, ?, ?)
+                ON CONFLICT(log_path) DO UPDATE SET lsn = EXCLUDED.lsn, checkpointed_at = EXCLUDED.checkpointed_at
+            """, (self.log_path, lsn, datetime.datetime.now().isoformat()))
+
+    def _truncate_log(self, offset):
+        """ Drops log records up to byte offset (already checkpointed). Needs _lock. """
+        end = self._log.tell()
+        if end == offset:
+            self._log.seek(0)
+            self._log.truncate()
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            tail = f.read(end - offset)
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log.close()
+        os.replace(tmp_path, self.log_path)
+        self._log = open(self.log_path, "ab")
+
+    def _recover(self):
+        checkpointed = min(self.db.map_shards(self._checkpointed_lsn))
+        pending = {}
+        replayed = 0
+        last_lsn = checkpointed
+        for record in self._read_log():
+            lsn, entity_id, dimension, context_hash = record[:4]
+            last_lsn = max(last_lsn, lsn)
+            if lsn <= checkpointed:
+                continue
+            pending.setdefault(entity_id, {})[(dimension, context_hash)] = tuple(record[4:]) or None
+            replayed += 1
+        if pending:
+            self._write_images(pending, last_lsn)
+            print(f"Hot tier: replayed {replayed} logged writes from {self.log_path} (LSN {checkpointed} -> {last_lsn}).")
+        self._lsn = last_lsn
+        open(self.log_path, "wb").close()
+
+    def _checkpointed_lsn(self, db):
+        with db.get_conn() as conn:
+            row = conn.execute("SELECT lsn FROM hot_tier_checkpoints WHERE log_path = ?", (self.log_path,)).fetchone()
+        return row[0] if row else 0
+
+    def _read_log(self):
+        if not os.path.exists(self.log_path):
+            return []
+        records = []
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final record from a crash mid-append was never acknowledged.
+                    break
+        return records
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident_entities": len(self._entities),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "dirty_atoms": sum(len(images) for images in self._dirty.values()),
+                "lsn": self._lsn,
+                "checkpoints": self.checkpoints,
+                "last_checkpoint_sec": self.last_checkpoint_sec,
+            }
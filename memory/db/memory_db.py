@@ -1,108 +1,746 @@
 import sqlite3
-import datetime
 import os
+import re
+import time
+from contextlib import contextmanager, ExitStack
+from memory.db import migrations, sql_functions
+from memory.db.connection_pool import ConnectionPool
+from memory.db.wal_checkpoint import WalCheckpointer
+from common.utils.metrics import REGISTRY
+
+DECAY_MODES = ("eager", "lazy")
+
+# S(t) = S0 * e^(-lambda * t), t in hours since the atom was last anchored.
+# Expects named parameter :now (epoch seconds, like last_updated).
+DECAYED_MAGNITUDE_SQL = "(magnitude * exp(-decay_rate * (:now - last_updated) / 3600.0))"
+
+# Above this many entities, fetch_atoms joins a temp table instead of binding an IN list.
+IN_LIST_LIMIT = 500
+
+# Confidence is an EMA: c' = c * CONFIDENCE_KEEP + x * (1 - CONFIDENCE_KEEP)
+CONFIDENCE_KEEP = 0.7
+
+# Deepest relation traversal served by get_neighborhood / expand_entities.
+MAX_HOPS = 4
+
+# Atoms kept per (entity, dimension) unless dimension_policies says otherwise.
+DEFAULT_MAX_ATOMS = 50
+
+# Eviction policy -> ORDER BY putting the first atom to evict first.
+EVICTION_POLICIES = {
+    "confidence": "confidence ASC",
+    "magnitude": "abs({magnitude}) ASC",
+    "oldest": "last_updated ASC",
+}
+
+# query_atoms orderings -> sort key (descending; ties broken by id descending).
+# "strongest" in eager mode matches idx_atoms_abs_magnitude's expression exactly.
+QUERY_ORDERS = {
+    "recent": "written_at",
+    "strongest": "abs({magnitude})",
+}
+
+# Rows pulled from the SQLite cursor per fetchmany() in iter_atoms / iter_preferences.
+STREAM_FETCH_SIZE = 256
+
+# Default and largest page for query_atoms.
+QUERY_PAGE_SIZE = 500
+MAX_QUERY_PAGE_SIZE = 5000
+
+# update_atoms' result for a proposal without an entity or dimension (every write path).
+INVALID_PROPOSAL = "Proposal needs an entity_id and a dimension."
+
+CAP_EVICTIONS = REGISTRY.counter(
+    "kuro_memory_cap_evictions", "Atoms evicted by per-(entity, dimension) caps.", labels=("eviction",))
+
+
+def format_summary(entity_id, atoms):
+    """ Legacy GetContext summary line: "Entity: x | dim: 0.42, ...". """
+    return f"Entity: {entity_id} | " + ", ".join([f"{d}: {m:.2f}" for d, m in atoms])
 
 class MemoryDB:
     """
     Persistent Memory Substrate using SQLite (WAL mode).
     Hardenened for Phase 3.5: Per-thread connection safety.
+    Connections are pooled and shared by the gRPC workers and the engine threads.
+
+    decay_mode="eager": the DecayEngine rewrites stored magnitudes on every pass.
+    decay_mode="lazy": stored magnitudes are anchored at last_updated and decayed on read;
+    the DecayEngine only sweeps atoms whose expires_at has passed.
     """
-    def __init__(self, db_path="memory/db/kuro_memory.db"):
+    def __init__(self, db_path="memory/db/kuro_memory.db", pool_size=12, decay_mode="eager",
+                 max_atoms=DEFAULT_MAX_ATOMS, eviction="confidence"):
+        if decay_mode not in DECAY_MODES:
+            raise ValueError(f"Unknown decay mode '{decay_mode}', expected one of {DECAY_MODES}")
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {tuple(EVICTION_POLICIES)}")
         self.db_path = db_path
+        self.decay_mode = decay_mode
+        self.default_policy = (max_atoms, eviction)
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.db_path or "memory/db/"), exist_ok=True)
-        # Setup schema using a transient connection
+        self.pool = ConnectionPool(self.db_path, max_size=pool_size, on_connect=sql_functions.register)
+        self._listeners = []
+        self._maintenance_hooks = []
+        self._dimension_aliases = {}
+        self._dimension_policies = {}
+        # Background WAL checkpoints; idle until start_checkpointer() (the server calls it).
+        self.checkpointer = WalCheckpointer(self)
+        self.add_maintenance_hook(self.checkpointer.maintenance)
         with self.get_conn() as conn:
-            self._create_tables(conn)
+            self._migrate(conn)
+        self.reload_dimension_aliases()
+        self.reload_dimension_policies()
 
+    @contextmanager
     def get_conn(self):
-        """ Returns a fresh, thread-local connection with WAL enabled. """
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA journal_mode=WAL")
-        return conn
-
-    def _create_tables(self, conn):
-        with conn:
-            # Atomic Memory Units (AMUs)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS memory_atoms (
-                    id TEXT PRIMARY KEY,
-                    entity_id TEXT,
-                    dimension TEXT,
-                    magnitude REAL,
-                    context_hash TEXT,
-                    confidence REAL,
-                    decay_rate REAL,
-                    last_updated TIMESTAMP
-                )
-            """)
-            
-            # Behavioral Preferences (Math-based weights)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS preferences (
-                    key TEXT PRIMARY KEY,
-                    value REAL,
-                    confidence REAL,
-                    updated_at TIMESTAMP
-                )
-            """)
-            
-            # Entity Relations (Graph adjacency)
+        """
+        Checks out a pooled connection for the calling thread.
+        Commits on success, rolls back on error, and returns the handle to the pool.
+        """
+        with self.pool.connection() as conn:
+            with conn:
+                yield conn
+
+    def start_checkpointer(self, **settings):
+        """ Starts background WAL checkpoints; settings override WalCheckpointer defaults. """
+        for name, value in settings.items():
+            if not hasattr(self.checkpointer, name):
+                raise TypeError(f"Unknown checkpointer setting '{name}'")
+            setattr(self.checkpointer, name, value)
+        self.checkpointer.start()
+        return self.checkpointer
+
+    def close(self):
+        self.checkpointer.stop()
+        self.pool.close()
+
+    # Shard routing. A MemoryDB is its own single shard; ShardedMemoryDB partitions
+    # memory_atoms by entity across several. Code that runs its own SQL on atoms goes
+    # through these so it works unchanged against either.
+
+    @property
+    def shards(self):
+        """ Stores holding memory_atoms (and the stats/count tables derived from it). """
+        return [self]
+
+    @property
+    def home(self):
+        """ Store holding the unpartitioned tables: preferences and entity_relations. """
+        return self
+
+    def shard_for(self, entity_id):
+        return self
+
+    def group_by_shard(self, items, entity_of=None):
+        """ {shard: [items]} with each item routed by entity_of(item) (the item itself by default). """
+        items = list(items)
+        return {self: items} if items else {}
+
+    def map_shards(self, fn, shards=None):
+        """ [fn(shard) for each shard], concurrently when there is more than one. """
+        return [fn(shard) for shard in (self.shards if shards is None else shards)]
+
+    def add_listener(self, listener):
+        """
+        Registers listener(entities, pref_keys, all_entities) to be called after any
+        committed write, before the write is acknowledged (used for cache invalidation).
+        """
+        self._listeners.append(listener)
+
+    def notify_change(self, entities=(), pref_keys=(), all_entities=False):
+        for listener in self._listeners:
+            listener(entities, pref_keys, all_entities)
+
+    def add_maintenance_hook(self, hook):
+        """
+        Registers hook(), a context manager entered around every bulk maintenance pass
+        (decay, pruning, dimension collapse, cap sweeps) that rewrites memory_atoms
+        directly. Used by the hot tier to checkpoint and hold writes first.
+        """
+        self._maintenance_hooks.append(hook)
+
+    @contextmanager
+    def maintenance(self):
+        with ExitStack() as stack:
+            for hook in self._maintenance_hooks:
+                stack.enter_context(hook())
+            yield
+
+    def _migrate(self, conn):
+        """ Applies any pending versioned migrations (see memory/db/migrations.py). """
+        applied = migrations.migrate(conn)
+        if 8 in applied:
+            # The compact atom rebuild frees most of the old table's pages; hand them back.
+            conn.execute("VACUUM")
+
+    def schema_version(self):
+        with self.get_conn() as conn:
+            return migrations.current_version(conn)
+
+    def table_row_counts(self):
+        """
+        Row counts for the main tables. Atoms come from the trigger-maintained
+        dimension_stats, so this stays cheap enough to call on every metrics scrape.
+        """
+        with self.get_conn() as conn:
+            atoms, preferences, relations = conn.execute("""
+                SELECT (SELECT coalesce(sum(atom_count), 0) FROM dimension_stats),
+                       (SELECT count(*) FROM preferences),
+                       (SELECT count(*) FROM entity_relations)
+            """).fetchone()
+        return {"memory_atoms": atoms, "preferences": preferences, "entity_relations": relations}
+
+    @property
+    def lazy_decay(self):
+        return self.decay_mode == "lazy"
+
+    def magnitude_sql(self):
+        """ Column expression for an atom's current magnitude (needs :now when lazy). """
+        return DECAYED_MAGNITUDE_SQL if self.lazy_decay else "magnitude"
+
+    def _upsert_atom(self, conn, entity_id, dimension, delta, context_hash, confidence, now,
+                     keep=CONFIDENCE_KEEP, blend=None):
+        """
+        keep/blend generalise the confidence EMA so several writes to one atom can be
+        folded into a single statement (see memory/write_queue.py).
+        """
+        if blend is None:
+            blend = confidence * (1.0 - keep)
+        # Lazy mode re-anchors: decay the stored value up to now before adding the delta.
+        # The raw delta, not the clamped insert value: a folded delta may exceed 1.
+        new_magnitude = f"MAX(-1.0, MIN(1.0, {self.magnitude_sql()} + :delta))"
+        conn.execute(f"""
+            INSERT INTO memory_atoms (entity_id, dimension, magnitude, context_hash, confidence, decay_rate, last_updated, expires_at, written_at)
+            VALUES (:entity_id, :dimension, MAX(-1.0, MIN(1.0, :delta)), :context_hash, :confidence, :decay_rate, :now,
+                    atom_expiry(MAX(-1.0, MIN(1.0, :delta)), :decay_rate, :now), :now)
+            ON CONFLICT(entity_id, dimension, context_hash) DO UPDATE SET
+                magnitude = {new_magnitude},
+                confidence = (confidence * :keep) + :blend,
+                last_updated = EXCLUDED.last_updated,
+                written_at = EXCLUDED.written_at,
+                expires_at = atom_expiry({new_magnitude}, decay_rate, :now)
+        """, {
+            "entity_id": entity_id,
+            "dimension": dimension,
+            "delta": delta,
+            "context_hash": context_hash,
+            "confidence": confidence,
+            "keep": keep,
+            "blend": blend,
+            "decay_rate": 0.05,
+            "now": now,
+        })
+
+    def reload_dimension_aliases(self):
+        with self.get_conn() as conn:
+            self._dimension_aliases = dict(conn.execute("SELECT alias, canonical FROM dimension_aliases"))
+
+    def resolve_dimension(self, dimension):
+        """ Redirects writes for a collapsed dimension to its canonical dimension. """
+        return self._dimension_aliases.get(dimension, dimension)
+
+    def reload_dimension_policies(self):
+        with self.get_conn() as conn:
+            self._dimension_policies = {
+                dimension: (max_atoms, eviction)
+                for dimension, max_atoms, eviction in conn.execute(
+                    "SELECT dimension, max_atoms, eviction FROM dimension_policies")
+            }
+
+    def dimension_policy(self, dimension):
+        """ (max_atoms, eviction) for a dimension; NULL columns fall back to the defaults. """
+        max_atoms, eviction = self._dimension_policies.get(dimension, (None, None))
+        default_max, default_eviction = self.default_policy
+        return (default_max if max_atoms is None else max_atoms), (eviction or default_eviction)
+
+    def set_dimension_policy(self, dimension, max_atoms=None, eviction=None):
+        """
+        Overrides the atom cap and/or eviction policy for one dimension
+        (None keeps the default). Existing atoms are trimmed to the new cap.
+        """
+        if eviction is not None and eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {tuple(EVICTION_POLICIES)}")
+        dimension = self.resolve_dimension(dimension)
+        self._store_dimension_policy(dimension, max_atoms, eviction)
+        self.enforce_all_caps(dimensions=(dimension,))
+
+    def _store_dimension_policy(self, dimension, max_atoms, eviction):
+        with self.get_conn() as conn:
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS entity_relations (
-                    from_entity TEXT,
-                    relation TEXT,
-                    to_entity TEXT,
-                    weight REAL,
-                    last_updated TIMESTAMP,
-                    PRIMARY KEY (from_entity, relation, to_entity)
-                )
-            """)
+                INSERT INTO dimension_policies (dimension, max_atoms, eviction) VALUES (?, ?, ?)
+                ON CONFLICT(dimension) DO UPDATE SET max_atoms = EXCLUDED.max_atoms, eviction = EXCLUDED.eviction
+            """, (dimension, max_atoms, eviction))
+        self.reload_dimension_policies()
 
     def update_atom(self, entity_id, dimension, delta, context_hash, confidence=0.5):
-        now = datetime.datetime.now()
+        if not entity_id or not dimension:
+            raise ValueError(INVALID_PROPOSAL)
+        now = time.time()
+        dimension = self.resolve_dimension(dimension)
         with self.get_conn() as conn:
-            with conn:
-                conn.execute("""
-                    INSERT INTO memory_atoms (id, entity_id, dimension, magnitude, context_hash, confidence, decay_rate, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(id) DO UPDATE SET
-                        magnitude = MAX(-1.0, MIN(1.0, magnitude + EXCLUDED.magnitude)),
-                        confidence = (confidence * 0.7) + (EXCLUDED.confidence * 0.3),
-                        last_updated = EXCLUDED.last_updated
-                """, (f"{entity_id}_{dimension}_{context_hash}", entity_id, dimension, delta, context_hash, confidence, 0.05, now))
-                self._enforce_caps(conn, entity_id, dimension)
-
-    def _enforce_caps(self, conn, entity_id, dimension, max_atoms=50):
-        cursor = conn.execute("""
-            SELECT count(*) FROM memory_atoms 
-            WHERE entity_id = ? AND dimension = ?
-        """, (entity_id, dimension))
-        count = cursor.fetchone()[0]
-        
-        if count > max_atoms:
-            conn.execute("""
+            self._upsert_atom(conn, entity_id, dimension, delta, context_hash, confidence, now)
+            self._enforce_caps(conn, [(entity_id, dimension)])
+        self.notify_change(entities=(entity_id,))
+
+    def update_atoms(self, proposals):
+        """
+        Applies many (entity_id, dimension, delta, context_hash, confidence) proposals
+        in one write transaction. Each proposal runs under its own savepoint so a bad
+        item does not sink the batch; caps are enforced once per touched
+        (entity_id, dimension) pair. Proposals without an entity_id or dimension are
+        rejected. Returns one (success, message) per proposal.
+        """
+        now = time.time()
+        results = []
+        touched = set()
+        with self.get_conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for entity_id, dimension, delta, context_hash, confidence in proposals:
+                if not entity_id or not dimension:
+                    results.append((False, INVALID_PROPOSAL))
+                    continue
+                dimension = self.resolve_dimension(dimension)
+                conn.execute("SAVEPOINT proposal")
+                try:
+                    self._upsert_atom(conn, entity_id, dimension, delta, context_hash, confidence, now)
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO proposal")
+                    results.append((False, str(e)))
+                else:
+                    touched.add((entity_id, dimension))
+                    results.append((True, "Memory atom stored."))
+                conn.execute("RELEASE proposal")
+            self._enforce_caps(conn, touched)
+        self.notify_change(entities={entity_id for entity_id, _ in touched})
+        return results
+
+    def _min_cap(self):
+        """ Smallest cap in force; pairs at or below it never need a policy lookup. """
+        caps = [max_atoms for max_atoms, _ in self._dimension_policies.values() if max_atoms is not None]
+        return min([self.default_policy[0]] + caps)
+
+    def _eviction_order(self, eviction):
+        return EVICTION_POLICIES[eviction].format(magnitude=self.magnitude_sql())
+
+    def _enforce_caps(self, conn, pairs):
+        """
+        Evicts atoms over the cap for each touched (entity_id, dimension) pair.
+        Counts come from the trigger-maintained atom_counts table, looked up for the
+        whole batch at once; each over-cap pair is trimmed in a single DELETE.
+        """
+        pairs = list(pairs)
+        min_cap = self._min_cap()
+        over = []
+        for start in range(0, len(pairs), IN_LIST_LIMIT):
+            chunk = pairs[start:start + IN_LIST_LIMIT]
+            params = [value for pair in chunk for value in pair]
+            over.extend(conn.execute(f"""
+                SELECT entity_id, dimension, atom_count FROM atom_counts
+                WHERE atom_count > ? AND (entity_id, dimension) IN (VALUES {", ".join(["(?, ?)"] * len(chunk))})
+            """, [min_cap] + params))
+
+        now = time.time()
+        for entity_id, dimension, count in over:
+            max_atoms, eviction = self.dimension_policy(dimension)
+            if count <= max_atoms:
+                continue
+            conn.execute(f"""
                 DELETE FROM memory_atoms 
-                WHERE id = (
+                WHERE id IN (
                     SELECT id FROM memory_atoms 
-                    WHERE entity_id = ? AND dimension = ?
-                    ORDER BY confidence ASC LIMIT 1
+                    WHERE entity_id = :entity_id AND dimension = :dimension
+                    ORDER BY {self._eviction_order(eviction)} LIMIT :excess
                 )
-            """, (entity_id, dimension))
-            print(f"Memory: Cap reached for {dimension}. Evicting weakest atom.")
+            """, {"entity_id": entity_id, "dimension": dimension, "excess": count - max_atoms, "now": now})
+            CAP_EVICTIONS.labels(eviction).inc(count - max_atoms)
+
+    def enforce_all_caps(self, dimensions=None):
+        """
+        Trims every over-cap (entity_id, dimension) pair, e.g. after a bulk import or
+        a policy change. One set-based DELETE per eviction policy; returns atoms evicted.
+        """
+        with self.maintenance():
+            evicted = self._sweep_caps(dimensions)
+            if evicted:
+                print(f"Memory: Cap sweep evicted {evicted} atom(s).")
+                self.notify_change(all_entities=True)
+        return evicted
+
+    def _sweep_caps(self, dimensions):
+        evicted = 0
+        now = time.time()
+        with self.get_conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS cap_policies (dimension TEXT PRIMARY KEY, max_atoms INTEGER, eviction TEXT)")
+            conn.execute("DELETE FROM temp.cap_policies")
+            if dimensions is None:
+                dimensions = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT dimension FROM atom_counts WHERE atom_count > ?", (self._min_cap(),))]
+            conn.executemany("INSERT OR REPLACE INTO temp.cap_policies VALUES (?, ?, ?)",
+                             [(d,) + self.dimension_policy(d) for d in dimensions])
+            for eviction in EVICTION_POLICIES:
+                count = conn.execute(f"""
+                    DELETE FROM memory_atoms WHERE id IN (
+                        SELECT id FROM (
+                            SELECT a.id, c.atom_count - p.max_atoms AS excess,
+                                   ROW_NUMBER() OVER (PARTITION BY a.entity_id, a.dimension
+                                                      ORDER BY {self._eviction_order(eviction)}) AS rank
+                            FROM temp.cap_policies p
+                            JOIN atom_counts c ON c.dimension = p.dimension AND c.atom_count > p.max_atoms
+                            JOIN memory_atoms a ON a.entity_id = c.entity_id AND a.dimension = c.dimension
+                            WHERE p.eviction = :eviction
+                        ) WHERE rank <= excess
+                    )
+                """, {"eviction": eviction, "now": now}).rowcount
+                CAP_EVICTIONS.labels(eviction).inc(count)
+                evicted += count
+            conn.execute("DELETE FROM temp.cap_policies")
+        return evicted
+
+    def fetch_atoms(self, entities, top_k=0, min_magnitude=0.0, detail=False):
+        """
+        Fetches atoms for all requested entities in one query, strongest first.
+        top_k (per entity) and min_magnitude are applied in SQL. Lists longer than
+        IN_LIST_LIMIT are joined through a temp table instead of bound parameters.
+        Returns {entity_id: [(dimension, magnitude), ...]} for entities that have atoms;
+        with detail=True each row is (dimension, magnitude, confidence, last_updated_unix).
+        """
+        entities = list(dict.fromkeys(entities))
+        if not entities:
+            return {}
+        params = {"now": time.time(), "min_magnitude": min_magnitude, "top_k": top_k}
+        magnitude = self.magnitude_sql()
+        extra = ", confidence, last_updated" if detail else ""
+
+        filters = [f"abs({magnitude}) >= :min_magnitude"] if min_magnitude > 0 else []
+        if self.lazy_decay:
+            # Expired but not yet swept atoms are already forgotten.
+            filters.append("(expires_at IS NULL OR expires_at > :now)")
 
-    def get_memory_summaries(self, entities):
         with self.get_conn() as conn:
-            summaries = []
-            for ent in entities:
-                cursor = conn.execute("SELECT dimension, magnitude FROM memory_atoms WHERE entity_id = ?", (ent,))
-                atoms = cursor.fetchall()
-                if atoms:
-                    sum_str = f"Entity: {ent} | " + ", ".join([f"{d}: {m:.2f}" for d, m in atoms])
-                    summaries.append(sum_str)
-            return summaries
+            source = self._bind_entities(conn, entities, params, filters)
+            where = " AND ".join(filters) or "1"
+
+            if top_k > 0:
+                query = f"""
+                    SELECT * FROM (
+                        SELECT entity_id, dimension, {magnitude} AS magnitude{extra},
+                               ROW_NUMBER() OVER (PARTITION BY entity_id ORDER BY abs({magnitude}) DESC) AS rank
+                        FROM {source} WHERE {where}
+                    ) WHERE rank <= :top_k
+                    ORDER BY entity_id, abs(magnitude) DESC
+                """
+            else:
+                query = f"""
+                    SELECT entity_id, dimension, {magnitude} AS current{extra} FROM {source} WHERE {where}
+                    ORDER BY entity_id, abs(current) DESC
+                """
+            grouped = {}
+            for row in conn.execute(query, params):
+                atoms = grouped.get(row[0])
+                if atoms is None:
+                    atoms = grouped[row[0]] = []
+                atoms.append(row[1:5] if detail else row[1:3])
+            if len(entities) > IN_LIST_LIMIT:
+                conn.execute("DELETE FROM temp.requested_entities")
+        return grouped
+
+    @staticmethod
+    def _bind_entities(conn, entities, params, filters):
+        """
+        Restricts a memory_atoms query to entities and returns its FROM source:
+        a bound IN list, or past IN_LIST_LIMIT a join on temp.requested_entities
+        (the caller empties it again before returning the connection).
+        """
+        if len(entities) > IN_LIST_LIMIT:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS requested_entities (entity_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.requested_entities")
+            conn.executemany("INSERT INTO temp.requested_entities VALUES (?)", ((e,) for e in entities))
+            return "memory_atoms JOIN temp.requested_entities USING (entity_id)"
+        params.update({f"e{i}": e for i, e in enumerate(entities)})
+        filters.append("entity_id IN (%s)" % ", ".join(f":e{i}" for i in range(len(entities))))
+        return "memory_atoms"
+
+    def query_atoms(self, entities=(), dimension_prefix="", since=None, until=None, min_magnitude=0.0,
+                    min_confidence=0.0, order="recent", limit=QUERY_PAGE_SIZE, cursor=None):
+        """
+        One page of atoms matching every given filter, across all entities unless
+        entities is given, newest (order="recent") or strongest ("strongest") first.
+        since/until bound written_at, when the atom was last created or reinforced
+        (epoch seconds, until exclusive); decay passes do not count as writes.
+
+        Pages are keyset-paginated on (sort key, id): pass the returned cursor back to
+        continue after the last row. The cursor also pins the "now" used for decayed
+        magnitudes, so a lazy-mode "strongest" scan stays consistently ordered.
+        Cost follows the page size for global "recent" and eager "strongest" scans
+        (index walks); entity-scoped and lazy "strongest" queries sort the matching rows.
+
+        Returns (rows, next_cursor) with rows of (entity_id, dimension, context_hash,
+        magnitude, confidence, last_updated, written_at); next_cursor is None after the
+        last page.
+        """
+        limit = self._query_limit(order, limit)
+        after = None
+        if cursor:
+            cursor_order, now, after_key, after_id = self._parse_cursor(cursor)
+            if cursor_order != order:
+                raise ValueError(f"Cursor was issued for order '{cursor_order}', not '{order}'")
+            after = (after_key, after_id)
+        else:
+            now = time.time()
+        rows = self._query_rows(entities, dimension_prefix, since, until, min_magnitude, min_confidence,
+                                order, limit + 1, now, after)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_id, last_key = rows[-1][:2]
+            next_cursor = f"{order}:{now!r}:{last_key!r}:{last_id}"
+        return [row[2:] for row in rows], next_cursor
+
+    @staticmethod
+    def _query_limit(order, limit):
+        if order not in QUERY_ORDERS:
+            raise ValueError(f"Unknown order '{order}', expected one of {tuple(QUERY_ORDERS)}")
+        return max(1, min(int(limit or QUERY_PAGE_SIZE), MAX_QUERY_PAGE_SIZE))
+
+    def _query_rows(self, entities, dimension_prefix, since, until, min_magnitude, min_confidence,
+                    order, limit, now, after=None):
+        """
+        query_atoms' SQL: up to limit rows of (id, sort key, entity_id, dimension,
+        context_hash, magnitude, confidence, last_updated, written_at) that sort after the
+        (sort key, id) keyset position `after`.
+        """
+        entities = list(dict.fromkeys(entities))
+        magnitude = self.magnitude_sql()
+        key = QUERY_ORDERS[order].format(magnitude=magnitude)
+        params = {"min_magnitude": min_magnitude, "min_confidence": min_confidence, "limit": limit, "now": now}
+        filters = [f"{key} IS NOT NULL"]
+        if after is not None:
+            # Spelled out rather than as a row value so the sort key's index bounds the scan.
+            filters.append(f"{key} <= :after_key AND ({key} < :after_key OR id < :after_id)")
+            params.update(after_key=after[0], after_id=after[1])
+        if dimension_prefix:
+            # GLOB is case-sensitive, so SQLite bounds it on idx_atoms_dimension like a range.
+            filters.append("dimension GLOB :dim_glob")
+            params["dim_glob"] = re.sub(r"([*?\[])", r"[\1]", dimension_prefix) + "*"
+        if since is not None:
+            filters.append("written_at >= :since")
+            params["since"] = since
+        if until is not None:
+            filters.append("written_at < :until")
+            params["until"] = until
+        if min_magnitude > 0:
+            filters.append(f"abs({magnitude}) >= :min_magnitude")
+        if min_confidence > 0:
+            filters.append("confidence >= :min_confidence")
+        if self.lazy_decay:
+            filters.append("(expires_at IS NULL OR expires_at > :now)")
+
+        with self.get_conn() as conn:
+            source = self._bind_entities(conn, entities, params, filters) if entities else "memory_atoms"
+            rows = conn.execute(f"""
+                SELECT id, {key}, entity_id, dimension, context_hash, {magnitude}, confidence, last_updated,
+                       written_at
+                FROM {source} WHERE {" AND ".join(filters)}
+                ORDER BY {key} DESC, id DESC
+                LIMIT :limit
+            """, params).fetchall()
+            if len(entities) > IN_LIST_LIMIT:
+                conn.execute("DELETE FROM temp.requested_entities")
+        return rows
+
+    @staticmethod
+    def _parse_cursor(cursor, parts=4):
+        try:
+            fields = cursor.split(":")
+            if len(fields) != parts:
+                raise ValueError
+            return (fields[0], float(fields[1]), float(fields[2])) + tuple(int(f) for f in fields[3:])
+        except ValueError:
+            raise ValueError(f"Malformed query cursor '{cursor}'") from None
+
+    def iter_atoms(self, entities, top_k=0, min_magnitude=0.0, batch_size=STREAM_FETCH_SIZE):
+        """
+        Streaming fetch_atoms(detail=True): yields (entity_id, dimension, magnitude,
+        confidence, last_updated) entity by entity in request order, reading the cursor
+        batch_size rows at a time so memory stays bounded however many atoms an entity has.
+        With top_k, each entity's atoms come strongest first (a top-k sort); without it
+        they come in idx_atoms_entity_dim_conf order (by dimension), so the first rows are
+        available without sorting the whole entity. Each entity is its own statement (and
+        read snapshot); the pooled connection is held until the generator is exhausted or closed.
+        """
+        params = {"now": time.time(), "min_magnitude": min_magnitude, "top_k": top_k if top_k > 0 else -1}
+        magnitude = self.magnitude_sql()
+        filters = ["entity_id = :entity_id"]
+        if min_magnitude > 0:
+            filters.append(f"abs({magnitude}) >= :min_magnitude")
+        if self.lazy_decay:
+            filters.append("(expires_at IS NULL OR expires_at > :now)")
+        query = f"""
+            SELECT entity_id, dimension, {magnitude} AS current, confidence, last_updated
+            FROM memory_atoms WHERE {" AND ".join(filters)}
+            ORDER BY {"abs(current) DESC" if top_k > 0 else "dimension"}
+            LIMIT :top_k
+        """
+        with self.get_conn() as conn:
+            for entity_id in dict.fromkeys(entities):
+                params["entity_id"] = entity_id
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+
+    def get_memory_summary_map(self, entities, top_k=0, min_magnitude=0.0):
+        """ {entity_id: "Entity: x | dim: 0.42, ..."} for entities that have atoms. """
+        grouped = self.fetch_atoms(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return {ent: format_summary(ent, atoms) for ent, atoms in grouped.items()}
+
+    def get_memory_summaries(self, entities, top_k=0, min_magnitude=0.0):
+        summary_map = self.get_memory_summary_map(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return [summary_map[ent] for ent in dict.fromkeys(entities) if ent in summary_map]
+
+    def upsert_relations(self, relations):
+        """
+        Applies many (from_entity, relation, to_entity, weight, accumulate) edges in one
+        write transaction, one savepoint per edge. accumulate adds to the stored weight
+        instead of replacing it. Returns one (success, message) per edge.
+        """
+        now = time.time()
+        results = []
+        with self.get_conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for from_entity, relation, to_entity, weight, accumulate in relations:
+                if not from_entity or not to_entity:
+                    results.append((False, "Relation needs both from_entity and to_entity."))
+                    continue
+                conn.execute("SAVEPOINT relation")
+                try:
+                    conn.execute(f"""
+                        INSERT INTO entity_relations (from_entity, relation, to_entity, weight, last_updated)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(from_entity, relation, to_entity) DO UPDATE SET
+                            weight = {"weight + EXCLUDED.weight" if accumulate else "EXCLUDED.weight"},
+                            last_updated = EXCLUDED.last_updated
+                    """, (from_entity, relation, to_entity, weight, now))
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO relation")
+                    results.append((False, str(e)))
+                else:
+                    results.append((True, "Relation stored."))
+                conn.execute("RELEASE relation")
+        return results
+
+    def upsert_relation(self, from_entity, relation, to_entity, weight, accumulate=False):
+        return self.upsert_relations([(from_entity, relation, to_entity, weight, accumulate)])[0]
+
+    def _walk_relations(self, conn, seeds, max_hops, min_weight, relations, bidirectional):
+        """
+        Breadth-first walk from every seed, one indexed query per hop over the whole
+        frontier (PK prefix forwards, idx_relations_to_entity backwards). Unlike a
+        path-enumerating recursive CTE, work grows with the nodes reached, not the paths.
+        Returns {(seed, entity): (hops, score, via, relation)} keeping, for each pair,
+        the shortest hop count and the best weight product at that depth.
+        """
+        reached = {(seed, seed): (0, 1.0, None, None) for seed in seeds}
+        frontier = {seed: [seed] for seed in seeds}  # entity -> seeds that reached it last hop
+        relation_filter = ""
+        params = {"min_weight": min_weight}
+        if relations:
+            params.update({f"r{i}": r for i, r in enumerate(relations)})
+            relation_filter = "AND relation IN (%s)" % ", ".join(f":r{i}" for i in range(len(relations)))
+
+        for hop in range(1, min(max_hops, MAX_HOPS) + 1):
+            nodes = list(frontier)
+            edges = []
+            for start in range(0, len(nodes), IN_LIST_LIMIT):
+                chunk = nodes[start:start + IN_LIST_LIMIT]
+                chunk_params = dict(params, **{f"e{i}": e for i, e in enumerate(chunk)})
+                in_list = ", ".join(f":e{i}" for i in range(len(chunk)))
+                query = f"""
+                    SELECT from_entity, relation, to_entity, weight FROM entity_relations
+                    WHERE from_entity IN ({in_list}) AND weight >= :min_weight {relation_filter}
+                """
+                if bidirectional:
+                    query += f"""
+                        UNION ALL
+                        SELECT to_entity, relation, from_entity, weight FROM entity_relations
+                        WHERE to_entity IN ({in_list}) AND weight >= :min_weight {relation_filter}
+                    """
+                edges.extend(conn.execute(query, chunk_params))
+
+            next_frontier = {}
+            for source, relation, target, weight in edges:
+                for seed in frontier[source]:
+                    score = reached[(seed, source)][1] * weight
+                    best = reached.get((seed, target))
+                    if best is not None and (best[0] < hop or best[1] >= score):
+                        continue
+                    if best is None:
+                        next_frontier.setdefault(target, []).append(seed)
+                    reached[(seed, target)] = (hop, score, source, relation)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return reached
+
+    def get_neighborhood(self, entities, max_hops=1, min_weight=0.0, limit=0, relations=(), bidirectional=False):
+        """
+        Entities within max_hops of any of the given ones (which are excluded), best
+        score first. Returns [(entity_id, hops, score, via, relation), ...].
+        """
+        seeds = list(dict.fromkeys(entities))
+        if not seeds:
+            return []
+        with self.get_conn() as conn:
+            reached = self._walk_relations(conn, seeds, max_hops or 1, min_weight, relations, bidirectional)
+        best = {}
+        for (seed, entity), (hops, score, via, relation) in reached.items():
+            if entity in seeds:
+                continue
+            current = best.get(entity)
+            if current is None or (score, -hops) > (current[1], -current[0]):
+                best[entity] = (hops, score, via, relation)
+        ranked = sorted(best.items(), key=lambda item: (-item[1][1], item[1][0], item[0]))
+        if limit:
+            ranked = ranked[:limit]
+        return [(entity,) + info for entity, info in ranked]
+
+    def expand_entities(self, entities, per_entity, max_hops=1, min_weight=0.0):
+        """
+        Top per_entity neighbors of each entity (by score) that are not already in
+        the list, in one traversal. Returns [(entity_id, hops, score, via, relation), ...]
+        ordered by the entity they expand.
+        """
+        seeds = list(dict.fromkeys(entities))
+        if not seeds or per_entity <= 0:
+            return []
+        with self.get_conn() as conn:
+            reached = self._walk_relations(conn, seeds, max_hops or 1, min_weight, (), False)
+        by_seed = {}
+        for (seed, entity), info in reached.items():
+            if entity not in seeds:
+                by_seed.setdefault(seed, []).append((entity,) + info)
+        expanded = {}
+        for seed in seeds:
+            ranked = sorted(by_seed.get(seed, ()), key=lambda row: (-row[2], row[1], row[0]))
+            for row in ranked[:per_entity]:
+                expanded.setdefault(row[0], row)
+        return list(expanded.values())
 
     def get_preferences(self):
         with self.get_conn() as conn:
             cursor = conn.execute("SELECT key, value FROM preferences")
             return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def iter_preferences(self, batch_size=STREAM_FETCH_SIZE):
+        """ Streaming get_preferences: yields (key, value) batch_size rows at a time. """
+        with self.get_conn() as conn:
+            cursor = conn.execute("SELECT key, value FROM preferences")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
@@ -0,0 +1,359 @@
+"""
+Ordered schema migrations for the VM 3 memory substrate.
+Each entry is (version, description, apply(conn)). Versions are applied in order,
+each inside its own write transaction, and recorded in schema_version.
+Append new migrations to the end; never edit one that has shipped.
+"""
+import datetime
+
+
+def _baseline_tables(conn):
+    # Atomic Memory Units (AMUs)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory_atoms (
+            id TEXT PRIMARY KEY,
+            entity_id TEXT,
+            dimension TEXT,
+            magnitude REAL,
+            context_hash TEXT,
+            confidence REAL,
+            decay_rate REAL,
+            last_updated TIMESTAMP
+        )
+    """)
+
+    # Behavioral Preferences (Math-based weights)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS preferences (
+            key TEXT PRIMARY KEY,
+            value REAL,
+            confidence REAL,
+            updated_at TIMESTAMP
+        )
+    """)
+
+    # Entity Relations (Graph adjacency)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entity_relations (
+            from_entity TEXT,
+            relation TEXT,
+            to_entity TEXT,
+            weight REAL,
+            last_updated TIMESTAMP,
+            PRIMARY KEY (from_entity, relation, to_entity)
+        )
+    """)
+
+
+def _hot_path_indexes(conn):
+    # get_memory_summaries (entity_id -> dimension, magnitude) and
+    # _enforce_caps (count / ORDER BY confidence per entity+dimension) are both covered.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_atoms_entity_dim_conf
+        ON memory_atoms (entity_id, dimension, confidence, magnitude)
+    """)
+    # get_dimension_report: GROUP BY dimension, sum(abs(magnitude)) without touching the table
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_atoms_dimension
+        ON memory_atoms (dimension, magnitude)
+    """)
+    # prune_weak_atoms: abs(magnitude) < ? OR confidence < ? (multi-index OR)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_abs_magnitude ON memory_atoms (abs(magnitude))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_confidence ON memory_atoms (confidence)")
+    # Reverse adjacency lookups on the relation graph
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_relations_to_entity
+        ON entity_relations (to_entity, weight)
+    """)
+
+
+def _atom_expiry_column(conn):
+    # Epoch second at which the atom decays below the floor; lets lazy mode
+    # delete expired atoms with an indexed range scan instead of a full pass.
+    conn.execute("ALTER TABLE memory_atoms ADD COLUMN expires_at REAL")
+    conn.execute("""
+        UPDATE memory_atoms
+        SET expires_at = atom_expiry(magnitude, decay_rate, iso_to_epoch(last_updated))
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_expires_at ON memory_atoms (expires_at)")
+
+
+def _dimension_aliases(conn):
+    # Dimensions folded into a canonical one by DimensionManager.collapse_redundant_dimensions
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dimension_aliases (
+            alias TEXT PRIMARY KEY,
+            canonical TEXT NOT NULL,
+            similarity REAL,
+            collapsed_at TIMESTAMP
+        )
+    """)
+
+
+def _dimension_stats(conn):
+    # Per-dimension aggregates kept current by triggers on every write path
+    # (upserts, cap eviction, pruning, decay, collapse), so reports are O(#dimensions).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dimension_stats (
+            dimension TEXT PRIMARY KEY,
+            atom_count INTEGER NOT NULL DEFAULT 0,
+            sum_abs_magnitude REAL NOT NULL DEFAULT 0,
+            sum_confidence REAL NOT NULL DEFAULT 0,
+            last_touched TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_dimension_stats_insert AFTER INSERT ON memory_atoms
+        BEGIN
+            INSERT INTO dimension_stats (dimension, atom_count, sum_abs_magnitude, sum_confidence, last_touched)
+            VALUES (NEW.dimension, 1, abs(NEW.magnitude), NEW.confidence, NEW.last_updated)
+            ON CONFLICT(dimension) DO UPDATE SET
+                atom_count = atom_count + 1,
+                sum_abs_magnitude = sum_abs_magnitude + EXCLUDED.sum_abs_magnitude,
+                sum_confidence = sum_confidence + EXCLUDED.sum_confidence,
+                last_touched = EXCLUDED.last_touched;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_dimension_stats_delete AFTER DELETE ON memory_atoms
+        BEGIN
+            UPDATE dimension_stats SET
+                atom_count = atom_count - 1,
+                sum_abs_magnitude = sum_abs_magnitude - abs(OLD.magnitude),
+                sum_confidence = sum_confidence - OLD.confidence
+            WHERE dimension = OLD.dimension;
+            DELETE FROM dimension_stats WHERE dimension = OLD.dimension AND atom_count <= 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_dimension_stats_update
+        AFTER UPDATE OF dimension, magnitude, confidence, last_updated ON memory_atoms
+        BEGIN
+            UPDATE dimension_stats SET
+                atom_count = atom_count - 1,
+                sum_abs_magnitude = sum_abs_magnitude - abs(OLD.magnitude),
+                sum_confidence = sum_confidence - OLD.confidence
+            WHERE dimension = OLD.dimension;
+            DELETE FROM dimension_stats WHERE dimension = OLD.dimension AND atom_count <= 0;
+            INSERT INTO dimension_stats (dimension, atom_count, sum_abs_magnitude, sum_confidence, last_touched)
+            VALUES (NEW.dimension, 1, abs(NEW.magnitude), NEW.confidence, NEW.last_updated)
+            ON CONFLICT(dimension) DO UPDATE SET
+                atom_count = atom_count + 1,
+                sum_abs_magnitude = sum_abs_magnitude + EXCLUDED.sum_abs_magnitude,
+                sum_confidence = sum_confidence + EXCLUDED.sum_confidence,
+                last_touched = EXCLUDED.last_touched;
+        END
+    """)
+    rebuild_dimension_stats(conn)
+
+
+def rebuild_dimension_stats(conn):
+    conn.execute("DELETE FROM dimension_stats")
+    conn.execute("""
+        INSERT INTO dimension_stats (dimension, atom_count, sum_abs_magnitude, sum_confidence, last_touched)
+        SELECT dimension, count(*), sum(abs(magnitude)), sum(confidence), max(last_updated)
+        FROM memory_atoms GROUP BY dimension
+    """)
+
+
+def _atom_caps(conn):
+    # Live atom count per (entity, dimension) so cap checks are a primary-key lookup
+    # instead of a count(*) over the pair on every write.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS atom_counts (
+            entity_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            atom_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (entity_id, dimension)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atom_counts_insert AFTER INSERT ON memory_atoms
+        WHEN NEW.entity_id IS NOT NULL AND NEW.dimension IS NOT NULL
+        BEGIN
+            INSERT INTO atom_counts (entity_id, dimension, atom_count) VALUES (NEW.entity_id, NEW.dimension, 1)
+            ON CONFLICT(entity_id, dimension) DO UPDATE SET atom_count = atom_count + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atom_counts_delete AFTER DELETE ON memory_atoms
+        BEGIN
+            UPDATE atom_counts SET atom_count = atom_count - 1
+            WHERE entity_id = OLD.entity_id AND dimension = OLD.dimension;
+            DELETE FROM atom_counts
+            WHERE entity_id = OLD.entity_id AND dimension = OLD.dimension AND atom_count <= 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atom_counts_update AFTER UPDATE OF entity_id, dimension ON memory_atoms
+        WHEN OLD.entity_id IS NOT NEW.entity_id OR OLD.dimension IS NOT NEW.dimension
+        BEGIN
+            UPDATE atom_counts SET atom_count = atom_count - 1
+            WHERE entity_id = OLD.entity_id AND dimension = OLD.dimension;
+            DELETE FROM atom_counts
+            WHERE entity_id = OLD.entity_id AND dimension = OLD.dimension AND atom_count <= 0;
+            INSERT INTO atom_counts (entity_id, dimension, atom_count) VALUES (NEW.entity_id, NEW.dimension, 1)
+            ON CONFLICT(entity_id, dimension) DO UPDATE SET atom_count = atom_count + 1;
+        END
+    """)
+    rebuild_atom_counts(conn)
+
+    # Per-dimension cap and eviction policy; dimensions without a row use MemoryDB's defaults.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dimension_policies (
+            dimension TEXT PRIMARY KEY,
+            max_atoms INTEGER,
+            eviction TEXT CHECK (eviction IN ('confidence', 'magnitude', 'oldest'))
+        )
+    """)
+
+
+def rebuild_atom_counts(conn):
+    conn.execute("DELETE FROM atom_counts")
+    conn.execute("""
+        INSERT INTO atom_counts (entity_id, dimension, atom_count)
+        SELECT entity_id, dimension, count(*) FROM memory_atoms
+        WHERE entity_id IS NOT NULL AND dimension IS NOT NULL
+        GROUP BY entity_id, dimension
+    """)
+
+
+def _hot_tier_checkpoints(conn):
+    # Last append-log LSN whose effects are in memory_atoms, per hot tier log file.
+    # Written in the same transaction as the checkpointed atoms.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS hot_tier_checkpoints (
+            log_path TEXT PRIMARY KEY,
+            lsn INTEGER NOT NULL,
+            checkpointed_at TIMESTAMP
+        )
+    """)
+
+
+def _compact_atoms(conn):
+    # Atoms drop the synthetic "entity_dimension_hash" text id for an integer rowid
+    # (still named id) plus a unique key on the three columns it duplicated, and store
+    # timestamps as epoch seconds (REAL) instead of ISO strings, so decay and reads do
+    # plain arithmetic. Rows are copied in key order so an entity's atoms are adjacent.
+    conn.execute("""
+        CREATE TABLE memory_atoms_compact (
+            id INTEGER PRIMARY KEY,
+            entity_id TEXT,
+            dimension TEXT,
+            context_hash TEXT,
+            magnitude REAL,
+            confidence REAL,
+            decay_rate REAL,
+            last_updated REAL,
+            expires_at REAL,
+            UNIQUE (entity_id, dimension, context_hash)
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO memory_atoms_compact
+            (entity_id, dimension, context_hash, magnitude, confidence, decay_rate, last_updated, expires_at)
+        SELECT entity_id, dimension, context_hash, magnitude, confidence, decay_rate,
+               CASE WHEN typeof(last_updated) = 'text' THEN iso_to_epoch(last_updated) ELSE last_updated END,
+               expires_at
+        FROM memory_atoms
+        ORDER BY entity_id, dimension, context_hash
+    """)
+    # Dropping the table drops its indexes and the stats/count triggers; recreate them.
+    conn.execute("DROP TABLE memory_atoms")
+    conn.execute("ALTER TABLE memory_atoms_compact RENAME TO memory_atoms")
+    _hot_path_indexes(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_expires_at ON memory_atoms (expires_at)")
+    _dimension_stats(conn)
+    _atom_caps(conn)
+
+    # The other decayed tables get the same epoch anchors.
+    conn.execute("""
+        UPDATE preferences SET updated_at = iso_to_epoch(updated_at) WHERE typeof(updated_at) = 'text'
+    """)
+    conn.execute("""
+        UPDATE entity_relations SET last_updated = iso_to_epoch(last_updated) WHERE typeof(last_updated) = 'text'
+    """)
+
+
+def _recency_index(conn):
+    # query_atoms order="recent": newest-first keyset pages walk this index (with the
+    # implicit rowid as tiebreak) instead of sorting the table. Entity-scoped queries
+    # use idx_atoms_entity_dim_conf and sort only that entity's atoms.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_last_updated ON memory_atoms (last_updated)")
+
+
+def _shard_info(conn):
+    # Which slice of a ShardedMemoryDB this file is; empty for an unsharded store.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shard_info (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            shard_index INTEGER NOT NULL,
+            shard_count INTEGER NOT NULL
+        )
+    """)
+
+
+def _atom_write_times(conn):
+    # When an atom was last written (created or reinforced). Unlike last_updated, the
+    # decay anchor, eager decay passes leave it alone, so "recent" means recently written;
+    # query_atoms' recency order and since/until filters walk its index instead.
+    conn.execute("ALTER TABLE memory_atoms ADD COLUMN written_at REAL")
+    conn.execute("UPDATE memory_atoms SET written_at = last_updated")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_atoms_written_at ON memory_atoms (written_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_atoms_last_updated")
+
+
+MIGRATIONS = [
+    (1, "baseline tables", _baseline_tables),
+    (2, "hot-path secondary indexes", _hot_path_indexes),
+    (3, "atom expiry column for lazy decay", _atom_expiry_column),
+    (4, "dimension alias table", _dimension_aliases),
+    (5, "trigger-maintained dimension stats", _dimension_stats),
+    (6, "atom counts and per-dimension cap policies", _atom_caps),
+    (7, "hot tier checkpoint log positions", _hot_tier_checkpoints),
+    (8, "integer atom ids and epoch timestamps", _compact_atoms),
+    (9, "atom recency index", _recency_index),
+    (10, "shard identity", _shard_info),
+    (11, "atom write times", _atom_write_times),
+]
+
+
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP
+        )
+    """)
+    row = conn.execute("SELECT max(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """
+    Brings the database up to the latest schema version.
+    Safe to call from several processes at once: each step re-checks the
+    version after taking the write lock.
+    """
+    applied = []
+    for version, description, apply in migrations:
+        if current_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.datetime.now().isoformat()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        print(f"Memory: Applied schema migration {version} ({description}).")
+    return applied
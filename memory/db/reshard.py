@@ -0,0 +1,143 @@
+"""
+Offline conversion between shard layouts of the VM 3 memory store.
+
+    python -m memory.db.reshard memory/db/kuro_memory.db memory/db/kuro_memory.db --shards 4
+
+copies an unsharded store into kuro_memory.shard{i}of4.db (--from-shards reads a
+sharded one). Atoms go to the shard their entity hashes to; preferences and
+relations go to shard 0; dimension aliases and policies are copied to every shard.
+The server must be stopped, with its hot tier log (if any) checkpointed.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from memory.db import migrations
+from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import shard_index, shard_paths
+
+# Tables that live only on the home shard, and tables kept identical on every shard.
+HOME_TABLES = ("preferences", "entity_relations")
+REPLICATED_TABLES = ("dimension_aliases", "dimension_policies")
+
+
+def _columns(conn, table, schema="main"):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _copy_table(conn, table, where="", params=(), exclude=()):
+    """ INSERT INTO main.table SELECT the shared columns (minus exclude) FROM src.table. """
+    columns = [c for c in _columns(conn, table) if c in set(_columns(conn, table, "src")) and c not in exclude]
+    names = ", ".join(columns)
+    return conn.execute(f"INSERT INTO main.{table} ({names}) SELECT {names} FROM src.{table} {where}",
+                        params).rowcount
+
+
+def reshard(source, dest, shards, from_shards=1):
+    """ Writes the dest layout from the source layout; returns atoms copied per destination shard. """
+    sources = shard_paths(source, from_shards)
+    targets = shard_paths(dest, shards)
+    missing = [path for path in sources if not os.path.exists(path)]
+    if missing:
+        raise SystemExit(f"Source shard(s) not found: {missing}")
+    existing = [path for path in targets if os.path.exists(path)]
+    if existing:
+        raise SystemExit(f"Destination file(s) already exist: {existing}")
+    log_path = f"{source}-hotlog"
+    if os.path.exists(log_path) and os.path.getsize(log_path):
+        raise SystemExit(f"{log_path} holds writes that are not checkpointed; "
+                         f"start and stop the server once so the hot tier folds them in.")
+
+    for path in sources:
+        # Brings the source schema up to date (and checkpoints its WAL on close).
+        MemoryDB(path).close()
+
+    started = time.perf_counter()
+    try:
+        copied = _write_targets(sources, targets, shards)
+        expected = 0
+        for path in sources:
+            conn = sqlite3.connect(path)
+            expected += conn.execute("SELECT count(*) FROM memory_atoms").fetchone()[0]
+            conn.close()
+        if sum(copied) != expected:
+            raise SystemExit(f"Copied {sum(copied)} atoms but the source holds {expected}.")
+    except BaseException:
+        _remove_layout(targets)
+        print("Reshard failed; removed the partial destination files.")
+        raise
+    print(f"Resharded {expected} atoms from {from_shards} to {shards} shard(s) in {time.perf_counter() - started:.1f}s.")
+    return copied
+
+
+def _remove_layout(paths):
+    for path in paths:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def _write_targets(sources, targets, shards):
+    copied = []
+    for index, path in enumerate(targets):
+        MemoryDB(path).close()
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.create_function("shard_index", 1, lambda entity_id: shard_index(entity_id or "", shards),
+                                 deterministic=True)
+            conn.execute("BEGIN IMMEDIATE")
+            # Bulk-load without the per-row stats triggers, then rebuild the derived tables once.
+            triggers = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'memory_atoms'").fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            atoms = 0
+            for source_index, source_path in enumerate(sources):
+                conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+                # Every source shard numbers its atoms from 1; the destination assigns fresh ids.
+                atoms += _copy_table(conn, "memory_atoms", "WHERE shard_index(entity_id) = ?", (index,),
+                                     exclude=("id",))
+                if source_index == 0:
+                    for table in REPLICATED_TABLES + (HOME_TABLES if index == 0 else ()):
+                        _copy_table(conn, table)
+                conn.execute("COMMIT")
+                conn.execute("DETACH DATABASE src")
+                conn.execute("BEGIN IMMEDIATE")
+            for _, sql in triggers:
+                conn.execute(sql)
+            migrations.rebuild_dimension_stats(conn)
+            migrations.rebuild_atom_counts(conn)
+            if shards > 1:
+                conn.execute("INSERT INTO shard_info (id, shard_index, shard_count) VALUES (0, ?, ?)",
+                             (index, shards))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        copied.append(atoms)
+        print(f"{path}: {atoms} atoms")
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the memory store between shard layouts (offline).")
+    parser.add_argument("source", help="database path the source layout was opened with (KURO_MEMORY_DB)")
+    parser.add_argument("dest", help="database path for the new layout")
+    parser.add_argument("--shards", type=int, required=True, help="shard count to write")
+    parser.add_argument("--from-shards", type=int, default=1, help="shard count of the source layout")
+    parser.add_argument("--remove-source", action="store_true",
+                        help="delete the source files afterwards (the server refuses to start next to them)")
+    args = parser.parse_args()
+
+    if args.shards < 1 or args.from_shards < 1:
+        raise SystemExit("Shard counts must be at least 1.")
+    if set(shard_paths(args.source, args.from_shards)) & set(shard_paths(args.dest, args.shards)):
+        raise SystemExit("Source and destination layouts overlap.")
+    reshard(args.source, args.dest, args.shards, args.from_shards)
+    if args.remove_source:
+        for path in shard_paths(args.source, args.from_shards):
+            for suffix in ("", "-wal", "-shm", "-hotlog"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        if os.path.exists(f"{args.source}-hotlog"):
+            os.remove(f"{args.source}-hotlog")
+        print("Removed the source layout.")
@@ -0,0 +1,335 @@
+"""
+Entity-partitioned memory store for VM 3.
+memory_atoms, with the dimension_stats / atom_counts tables its triggers maintain, is
+hash-partitioned by entity_id across N SQLite files. Each shard is a full MemoryDB with
+its own writer lock, connection pool and WAL checkpointer, so writes and maintenance on
+different entities no longer queue behind one lock. Shard 0 is also home to the
+unpartitioned tables (preferences, entity_relations); dimension_aliases and
+dimension_policies are kept identical on every shard so each resolves and caps its
+own writes.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent import futures
+from contextlib import contextmanager, ExitStack
+from memory.db.memory_db import MemoryDB, DEFAULT_MAX_ATOMS, EVICTION_POLICIES, STREAM_FETCH_SIZE, \
+    QUERY_PAGE_SIZE, format_summary
+from common.utils.metrics import REGISTRY
+
+# Largest rowid SQLite hands out; as a keyset tiebreak it admits every row with an equal key.
+MAX_ROWID = 2 ** 63 - 1
+
+
+def shard_index(entity_id, shard_count):
+    """ Shard number for an entity; stable across processes (unlike hash()). """
+    return zlib.crc32(entity_id.encode("utf-8")) % shard_count
+
+
+def shard_paths(db_path, shard_count):
+    """ kuro_memory.db -> kuro_memory.shard0of4.db, ...; one shard is db_path itself. """
+    if shard_count <= 1:
+        return [db_path]
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{i}of{shard_count}{ext}" for i in range(shard_count)]
+
+
+def existing_layouts(db_path):
+    """ Shard counts that have database files next to db_path (1 = the unsharded file). """
+    counts = set()
+    if os.path.exists(db_path):
+        counts.add(1)
+    root, ext = os.path.splitext(db_path)
+    directory = os.path.dirname(db_path) or "."
+    pattern = re.compile(re.escape(os.path.basename(root)) + r"\.shard\d+of(\d+)" + re.escape(ext) + "$")
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match:
+                counts.add(int(match.group(1)))
+    return counts
+
+
+def open_memory_db(db_path, shards=1, **settings):
+    """
+    MemoryDB for one shard, ShardedMemoryDB for more. Refuses to open a layout next to
+    data written with a different shard count (it would silently be invisible); convert
+    it with `python -m memory.db.reshard` first.
+    """
+    shards = max(shards, 1)
+    others = existing_layouts(db_path) - {shards}
+    if others:
+        raise ValueError(f"{db_path} has data laid out in {sorted(others)} shard(s), not {shards}; "
+                         f"convert it with `python -m memory.db.reshard` and remove the old files.")
+    if shards == 1:
+        return MemoryDB(db_path, **settings)
+    return ShardedMemoryDB(db_path, shards, **settings)
+
+
+class ShardedMemoryDB:
+    """
+    MemoryDB-compatible store over N entity-partitioned MemoryDB shards.
+
+    Single-entity calls go straight to the owning shard. Multi-entity reads and writes
+    (fetch_atoms, update_atoms, query_atoms) are split by shard and scatter-gathered on
+    one thread per shard; bulk maintenance and reports run per shard through
+    map_shards(). Listeners and maintenance hooks registered here cover every shard.
+    Each shard has its own pool of pool_size connections.
+    """
+    def __init__(self, db_path="memory/db/kuro_memory.db", shard_count=4, pool_size=12, decay_mode="eager",
+                 max_atoms=DEFAULT_MAX_ATOMS, eviction="confidence"):
+        if shard_count < 2:
+            raise ValueError("ShardedMemoryDB needs at least 2 shards; use MemoryDB for one")
+        self.db_path = db_path
+        self.shard_count = shard_count
+        self.decay_mode = decay_mode
+        self.default_policy = (max_atoms, eviction)
+        self._listeners = []
+        self._maintenance_hooks = []
+        self._local = threading.local()
+        self._shards = [
+            MemoryDB(path, pool_size=pool_size, decay_mode=decay_mode, max_atoms=max_atoms, eviction=eviction)
+            for path in shard_paths(db_path, shard_count)
+        ]
+        for index, shard in enumerate(self._shards):
+            self._claim(shard, index)
+            shard.add_listener(self.notify_change)
+        self._executor = futures.ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix="memory-shard")
+        print(f"Memory: {shard_count} shards under {db_path}")
+
+    def _claim(self, shard, index):
+        """ Records (or checks) which slice of this store a shard file holds. """
+        with shard.get_conn() as conn:
+            row = conn.execute("SELECT shard_index, shard_count FROM shard_info").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO shard_info (id, shard_index, shard_count) VALUES (0, ?, ?)",
+                             (index, self.shard_count))
+            elif tuple(row) != (index, self.shard_count):
+                raise ValueError(f"{shard.db_path} is shard {row[0]} of {row[1]}, "
+                                 f"expected {index} of {self.shard_count}")
+
+    def close(self):
+        for shard in self._shards:
+            shard.close()
+        self._executor.shutdown()
+
+    def start_checkpointer(self, **settings):
+        """ Starts every shard's WAL checkpointer; returns them. """
+        checkpointers = [shard.start_checkpointer(**settings) for shard in self._shards]
+        # Each checkpointer registers its own file; report the total instead.
+        REGISTRY.callback("kuro_db_wal_bytes", "Size of the -wal files.",
+                          lambda: sum(checkpointer.wal_bytes() for checkpointer in checkpointers))
+        return checkpointers
+
+    # --- routing ---
+
+    @property
+    def shards(self):
+        return list(self._shards)
+
+    @property
+    def home(self):
+        return self._shards[0]
+
+    def shard_for(self, entity_id):
+        return self._shards[shard_index(entity_id or "", self.shard_count)]
+
+    def group_by_shard(self, items, entity_of=None):
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_for(entity_of(item) if entity_of else item), []).append(item)
+        return groups
+
+    def map_shards(self, fn, shards=None):
+        """
+        [fn(shard) for each shard], one executor thread per shard. Waits for all of them
+        before raising the first error. Nested calls from a shard thread run inline.
+        """
+        shards = self._shards if shards is None else list(shards)
+        if len(shards) <= 1 or getattr(self._local, "in_shard", False):
+            return [fn(shard) for shard in shards]
+        pending = [self._executor.submit(self._call_in_shard, fn, shard) for shard in shards]
+        futures.wait(pending)
+        return [future.result() for future in pending]
+
+    def _call_in_shard(self, fn, shard):
+        self._local.in_shard = True
+        try:
+            return fn(shard)
+        finally:
+            self._local.in_shard = False
+
+    # --- hooks ---
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def notify_change(self, entities=(), pref_keys=(), all_entities=False):
+        for listener in self._listeners:
+            listener(entities, pref_keys, all_entities)
+
+    def add_maintenance_hook(self, hook):
+        self._maintenance_hooks.append(hook)
+
+    @contextmanager
+    def maintenance(self):
+        with ExitStack() as stack:
+            for shard in self._shards:
+                stack.enter_context(shard.maintenance())
+            for hook in self._maintenance_hooks:
+                stack.enter_context(hook())
+            yield
+
+    # --- schema and settings ---
+
+    def schema_version(self):
+        return min(shard.schema_version() for shard in self._shards)
+
+    def table_row_counts(self):
+        totals = {}
+        for counts in self.map_shards(lambda shard: shard.table_row_counts()):
+            for table, rows in counts.items():
+                totals[table] = totals.get(table, 0) + rows
+        return totals
+
+    @property
+    def lazy_decay(self):
+        return self.decay_mode == "lazy"
+
+    def magnitude_sql(self):
+        return self.home.magnitude_sql()
+
+    def reload_dimension_aliases(self):
+        for shard in self._shards:
+            shard.reload_dimension_aliases()
+
+    def resolve_dimension(self, dimension):
+        return self.home.resolve_dimension(dimension)
+
+    def reload_dimension_policies(self):
+        for shard in self._shards:
+            shard.reload_dimension_policies()
+
+    def dimension_policy(self, dimension):
+        return self.home.dimension_policy(dimension)
+
+    def set_dimension_policy(self, dimension, max_atoms=None, eviction=None):
+        """ MemoryDB.set_dimension_policy, stored on every shard before the cap sweep. """
+        if eviction is not None and eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {tuple(EVICTION_POLICIES)}")
+        dimension = self.resolve_dimension(dimension)
+        for shard in self._shards:
+            shard._store_dimension_policy(dimension, max_atoms, eviction)
+        self.enforce_all_caps(dimensions=(dimension,))
+
+    def enforce_all_caps(self, dimensions=None):
+        with self.maintenance():
+            evicted = sum(self.map_shards(lambda shard: shard._sweep_caps(dimensions)))
+            if evicted:
+                print(f"Memory: Cap sweep evicted {evicted} atom(s).")
+                self.notify_change(all_entities=True)
+        return evicted
+
+    # --- atoms ---
+
+    def update_atom(self, entity_id, dimension, delta, context_hash, confidence=0.5):
+        self.shard_for(entity_id).update_atom(entity_id, dimension, delta, context_hash, confidence)
+
+    def update_atoms(self, proposals):
+        """ MemoryDB.update_atoms with one transaction per shard touched, committed concurrently. """
+        indexed = list(enumerate(proposals))
+        groups = self.group_by_shard(indexed, lambda item: item[1][0])
+        results = [None] * len(indexed)
+
+        def apply(shard):
+            items = groups[shard]
+            for (position, _), result in zip(items, shard.update_atoms(proposal for _, proposal in items)):
+                results[position] = result
+
+        self.map_shards(apply, groups)
+        return results
+
+    def fetch_atoms(self, entities, top_k=0, min_magnitude=0.0, detail=False):
+        groups = self.group_by_shard(dict.fromkeys(entities))
+        grouped = {}
+        for part in self.map_shards(
+                lambda shard: shard.fetch_atoms(groups[shard], top_k=top_k, min_magnitude=min_magnitude,
+                                                detail=detail), groups):
+            grouped.update(part)
+        return grouped
+
+    def get_memory_summary_map(self, entities, top_k=0, min_magnitude=0.0):
+        grouped = self.fetch_atoms(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return {ent: format_summary(ent, atoms) for ent, atoms in grouped.items()}
+
+    def get_memory_summaries(self, entities, top_k=0, min_magnitude=0.0):
+        summary_map = self.get_memory_summary_map(entities, top_k=top_k, min_magnitude=min_magnitude)
+        return [summary_map[ent] for ent in dict.fromkeys(entities) if ent in summary_map]
+
+    def iter_atoms(self, entities, top_k=0, min_magnitude=0.0, batch_size=STREAM_FETCH_SIZE):
+        for entity_id in dict.fromkeys(entities):
+            yield from self.shard_for(entity_id).iter_atoms(
+                [entity_id], top_k=top_k, min_magnitude=min_magnitude, batch_size=batch_size)
+
+    def query_atoms(self, entities=(), dimension_prefix="", since=None, until=None, min_magnitude=0.0,
+                    min_confidence=0.0, order="recent", limit=QUERY_PAGE_SIZE, cursor=None):
+        """
+        MemoryDB.query_atoms merged across shards. Rows are ordered by (sort key, shard,
+        id) descending, so the cursor records the shard of the last row as well; each
+        shard returns at most one page past that position and the pages are merged.
+        """
+        limit = MemoryDB._query_limit(order, limit)
+        position = None
+        if cursor:
+            cursor_order, now, after_key, after_shard, after_id = MemoryDB._parse_cursor(cursor, parts=5)
+            if cursor_order != order:
+                raise ValueError(f"Cursor was issued for order '{cursor_order}', not '{order}'")
+            position = (after_key, after_shard, after_id)
+        else:
+            now = time.time()
+        entities = list(dict.fromkeys(entities))
+        groups = self.group_by_shard(entities) if entities else {shard: () for shard in self._shards}
+
+        def page(shard):
+            number = self._shards.index(shard)
+            after = None
+            if position is not None:
+                after_key, after_shard, after_id = position
+                # Equal keys continue on later shards in full, on earlier ones not at all.
+                after_id = MAX_ROWID if number < after_shard else after_id if number == after_shard else -1
+                after = (after_key, after_id)
+            rows = shard._query_rows(groups[shard], dimension_prefix, since, until, min_magnitude, min_confidence,
+                                     order, limit + 1, now, after)
+            return [(row[1], number, row[0], row[2:]) for row in rows]
+
+        merged = sorted((row for rows in self.map_shards(page, groups) for row in rows),
+                        key=lambda row: row[:3], reverse=True)
+        next_cursor = None
+        if len(merged) > limit:
+            merged = merged[:limit]
+            last_key, last_shard, last_id = merged[-1][:3]
+            next_cursor = f"{order}:{now!r}:{last_key!r}:{last_shard}:{last_id}"
+        return [row[3] for row in merged], next_cursor
+
+    # --- unpartitioned tables (home shard) ---
+
+    def upsert_relations(self, relations):
+        return self.home.upsert_relations(relations)
+
+    def upsert_relation(self, from_entity, relation, to_entity, weight, accumulate=False):
+        return self.home.upsert_relation(from_entity, relation, to_entity, weight, accumulate)
+
+    def get_neighborhood(self, entities, max_hops=1, min_weight=0.0, limit=0, relations=(), bidirectional=False):
+        return self.home.get_neighborhood(entities, max_hops=max_hops, min_weight=min_weight, limit=limit,
+                                          relations=relations, bidirectional=bidirectional)
+
+    def expand_entities(self, entities, per_entity, max_hops=1, min_weight=0.0):
+        return self.home.expand_entities(entities, per_entity, max_hops=max_hops, min_weight=min_weight)
+
+    def get_preferences(self):
+        return self.home.get_preferences()
+
+    def iter_preferences(self, batch_size=STREAM_FETCH_SIZE):
+        return self.home.iter_preferences(batch_size=batch_size)
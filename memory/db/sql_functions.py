@@ -0,0 +1,52 @@
+"""
+Application-defined SQLite functions registered on every pooled connection.
+"""
+import datetime
+import math
+import sqlite3
+
+# Atoms whose |magnitude| falls below this are considered forgotten.
+EXPIRY_FLOOR = 0.01
+
+
+def atom_expiry(magnitude, decay_rate, anchor_epoch):
+    """
+    Epoch second at which |S0 * e^(-lambda * t)| drops below EXPIRY_FLOOR,
+    with t in hours since anchor_epoch. NULL means the atom never expires.
+    """
+    if magnitude is None or anchor_epoch is None:
+        return None
+    strength = abs(magnitude)
+    if strength < EXPIRY_FLOOR:
+        return anchor_epoch
+    if not decay_rate or decay_rate <= 0:
+        return None
+    return anchor_epoch + math.log(strength / EXPIRY_FLOOR) / decay_rate * 3600.0
+
+
+def iso_to_epoch(value):
+    """
+    Naive ISO timestamps are local time, matching the datetime.now() the baseline wrote
+    them with. The result depends on the host's timezone, so it is not registered as
+    deterministic and must not appear in indexes or generated columns.
+    """
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _has_math_functions(conn):
+    try:
+        conn.execute("SELECT exp(0), ln(1)").fetchone()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def register(conn):
+    conn.create_function("atom_expiry", 3, atom_expiry, deterministic=True)
+    conn.create_function("iso_to_epoch", 1, iso_to_epoch)
+    # SQLite builds without SQLITE_ENABLE_MATH_FUNCTIONS lack exp()/ln().
+    if not _has_math_functions(conn):
+        conn.create_function("exp", 1, math.exp, deterministic=True)
+        conn.create_function("ln", 1, math.log, deterministic=True)
@@ -0,0 +1,177 @@
+"""
+WAL checkpoint management for VM 3.
+SQLite's built-in auto-checkpoint runs PASSIVE on whichever writer commits the
+1000th page, adds that cost to the write, and can never reset the WAL while a reader
+holds an old snapshot, so the -wal file grows and every read scans a larger WAL index.
+The checkpointer moves that work to a background thread and escalates in idle windows.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from common.utils.metrics import REGISTRY
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+CHECKPOINT_SECONDS = REGISTRY.histogram(
+    "kuro_db_checkpoint_seconds", "Duration of WAL checkpoints.", labels=("mode",))
+CHECKPOINT_FRAMES = REGISTRY.counter(
+    "kuro_db_checkpoint_frames", "WAL frames copied into the database by checkpoints.", labels=("mode",))
+CHECKPOINT_BUSY = REGISTRY.counter(
+    "kuro_db_checkpoint_busy", "Checkpoints that could not finish because of readers or writers.", labels=("mode",))
+
+
+class WalCheckpointer:
+    """
+    Background WAL checkpoints for a MemoryDB.
+
+    Every poll_sec it looks at the -wal size:
+      - a PASSIVE checkpoint (never blocks readers or writers) runs once the WAL passes
+        passive_wal_bytes or interval_sec has gone by since the last one;
+      - when the pool has been idle for idle_sec, it escalates to TRUNCATE so the file
+        drops back to zero;
+      - above restart_wal_bytes it follows the PASSIVE with RESTART, so the next writer
+        wraps to the start of the WAL (and journal_size_limit trims the file).
+    A WAL under continuous writes is never fully backfilled at the moment a writer
+    starts, so it only ever grows. Escalated modes therefore hold new write
+    transactions at the pool for their duration (the PASSIVE before them has already
+    copied most frames) and use a short busy timeout for readers still on old snapshots.
+
+    While started, connection auto-checkpoints are turned off. It is also a MemoryDB
+    maintenance hook: during decay/pruning passes only PASSIVE checkpoints run, and the
+    pass is followed by a checkpoint of everything it wrote.
+    """
+    def __init__(self, db, interval_sec=30.0, poll_sec=1.0, passive_wal_bytes=4 * 1024 * 1024,
+                 restart_wal_bytes=64 * 1024 * 1024, idle_sec=10.0, busy_timeout_ms=1000):
+        self.db = db
+        self.interval_sec = interval_sec
+        self.poll_sec = poll_sec
+        self.passive_wal_bytes = passive_wal_bytes
+        self.restart_wal_bytes = restart_wal_bytes
+        self.idle_sec = idle_sec
+        self.busy_timeout_ms = busy_timeout_ms
+        self.wal_path = f"{db.db_path}-wal"
+        self.running = False
+        self.last_checkpoint_at = time.monotonic()
+        self.last_result = None
+        self.checkpoints = 0
+        self._lock = threading.Lock()  # one checkpoint at a time
+        self._state_lock = threading.Lock()
+        self._in_maintenance = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.db.pool.set_pragma("wal_autocheckpoint", 0)
+        REGISTRY.callback("kuro_db_wal_bytes", "Size of the -wal file.", self.wal_bytes)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="memory-wal-checkpoint", daemon=True)
+        self._thread.start()
+        print(f"WAL checkpointer started (PASSIVE at {self.passive_wal_bytes // 1024} KiB "
+              f"or every {self.interval_sec}s, TRUNCATE after {self.idle_sec}s idle)")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.running = False
+        self.checkpoint("PASSIVE")
+        self.db.pool.set_pragma("wal_autocheckpoint", 1000)
+        with self._lock:
+            self._conn.close()
+            self._conn = None
+
+    def _run_loop(self):
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"WAL checkpoint failed: {e}")
+
+    def wal_bytes(self):
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def is_idle(self):
+        pool = self.db.pool
+        return (not self._in_maintenance and pool.in_use() == 0
+                and time.monotonic() - pool.last_activity >= self.idle_sec)
+
+    def tick(self):
+        """ One scheduling decision; returns the checkpoint result or None. """
+        wal = self.wal_bytes()
+        if not wal:
+            return None
+        if self._in_maintenance:
+            # The pass commits chunk by chunk; keep copying frames back without blocking it.
+            return self.checkpoint("PASSIVE") if wal >= self.passive_wal_bytes else None
+        if self.is_idle():
+            return self.checkpoint("TRUNCATE")
+        due = time.monotonic() - self.last_checkpoint_at >= self.interval_sec
+        if wal >= self.restart_wal_bytes:
+            self.checkpoint("PASSIVE")
+            return self.checkpoint("RESTART")
+        if wal >= self.passive_wal_bytes or due:
+            return self.checkpoint("PASSIVE")
+        return None
+
+    def checkpoint(self, mode="PASSIVE"):
+        """
+        Runs PRAGMA wal_checkpoint(mode) on a pooled connection.
+        Returns {"mode", "busy", "log", "checkpointed", "elapsed_sec", "wal_bytes"}.
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode '{mode}', expected one of {CHECKPOINT_MODES}")
+        escalated = mode != "PASSIVE"
+        with self._lock:
+            if self._conn is None:
+                # Own handle, not a pooled one: checkpoints must not count as pool activity.
+                self._conn = sqlite3.connect(self.db.db_path, check_same_thread=False)
+                self._conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            started = time.perf_counter()
+            with self.db.pool.hold_writes() if escalated else nullcontext():
+                busy, log, checkpointed = self._conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            elapsed = time.perf_counter() - started
+        CHECKPOINT_SECONDS.labels(mode).observe(elapsed)
+        CHECKPOINT_FRAMES.labels(mode).inc(max(checkpointed, 0))
+        if busy:
+            CHECKPOINT_BUSY.labels(mode).inc()
+        self.checkpoints += 1
+        self.last_checkpoint_at = time.monotonic()
+        self.last_result = {"mode": mode, "busy": bool(busy), "log": log, "checkpointed": checkpointed,
+                            "elapsed_sec": elapsed, "wal_bytes": self.wal_bytes()}
+        return self.last_result
+
+    @contextmanager
+    def maintenance(self):
+        """ MemoryDB maintenance hook: no escalation during the pass, checkpoint after it. """
+        with self._state_lock:
+            self._in_maintenance += 1
+        try:
+            yield
+        finally:
+            with self._state_lock:
+                self._in_maintenance -= 1
+            if self.running:
+                try:
+                    self.checkpoint("PASSIVE")
+                except Exception as e:
+                    print(f"WAL checkpoint after maintenance failed: {e}")
+
+    def stats(self):
+        return {
+            "wal_bytes": self.wal_bytes(),
+            "checkpoints": self.checkpoints,
+            "seconds_since_checkpoint": time.monotonic() - self.last_checkpoint_at,
+            "last": self.last_result,
+        }
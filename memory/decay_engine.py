@@ -1,24 +1,128 @@
 import time
-import math
 import datetime
 import threading
-import sqlite3
 from memory.db.memory_db import MemoryDB
+from memory.db.sql_functions import EXPIRY_FLOOR
+from common.utils.metrics import REGISTRY
+
+# Per-hour decay rates for the tables without a per-row rate column.
+# Preferences halve in ~6 days and relation weights in ~2 weeks without reinforcement.
+PREFERENCE_DECAY_RATE = 0.005
+RELATION_DECAY_RATE = 0.002
+RELATION_FLOOR = 0.05
+
+PASS_SECONDS = REGISTRY.histogram(
+    "kuro_decay_pass_seconds", "Duration of one decay pass over all tables.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0))
+ROWS_PROCESSED = REGISTRY.counter("kuro_decay_rows", "Rows decayed or deleted by decay passes.", labels=("table",))
+ROWS_DELETED = REGISTRY.counter("kuro_decay_deleted", "Rows deleted by decay passes.", labels=("table",))
+MAX_LOCK_SECONDS = REGISTRY.gauge("kuro_decay_max_lock_seconds", "Longest chunk write lock held in the last pass.")
+LAST_PASS_UNIX = REGISTRY.gauge("kuro_decay_last_complete_pass_unix", "When the last complete decay pass finished.")
+
+
+def record_pass(report):
+    """ Records a decay pass report in the metrics registry (also for passes run in another process). """
+    PASS_SECONDS.observe(report["elapsed_sec"])
+    MAX_LOCK_SECONDS.set(report["max_lock_sec"])
+    if report["complete"]:
+        LAST_PASS_UNIX.set(time.time())
+    for table, t in report["tables"].items():
+        ROWS_PROCESSED.labels(table).inc(t["rows"])
+        ROWS_DELETED.labels(table).inc(t["deleted"])
+
+
+def merge_reports(reports):
+    """ Combines per-shard table reports; the shards ran concurrently, so time is the slowest one's. """
+    if len(reports) == 1:
+        return reports[0]
+    processed = sum(r["rows"] for r in reports)
+    elapsed = max(r["elapsed_sec"] for r in reports)
+    return {
+        "rows": processed,
+        "deleted": sum(r["deleted"] for r in reports),
+        "chunks": sum(r["chunks"] for r in reports),
+        "elapsed_sec": elapsed,
+        "rows_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+        "max_lock_sec": max(r["max_lock_sec"] for r in reports),
+        "complete": all(r["complete"] for r in reports),
+    }
+
+
+class DecayPolicy:
+    """
+    How one table decays: value <- value * e^(-rate * t), t in hours since anchor_column.
+    rate is a number or the name of a per-row column. Rows matching the pruning rule
+    (by default |decayed value| < floor) are deleted in the same chunk transaction.
+    on_change(db) runs after each committed chunk (e.g. cache invalidation).
+    A sharded table is decayed on every shard concurrently; others live on db.home.
+    """
+    def __init__(self, table, value_column, anchor_column, rate, floor=EXPIRY_FLOOR,
+                 prune_sql=None, extra_sets=(), on_change=None, sharded=False):
+        self.table = table
+        self.sharded = sharded
+        self.value_column = value_column
+        self.anchor_column = anchor_column
+        self.rate = rate
+        self.floor = floor
+        self.extra_sets = extra_sets
+        self.on_change = on_change
+        rate_sql = rate if isinstance(rate, str) else ":rate"
+        self.decayed_sql = f"({value_column} * exp(-{rate_sql} * (:now - {anchor_column}) / 3600.0))"
+        self.prune_sql = (prune_sql or "abs({decayed}) < :floor").format(decayed=self.decayed_sql)
+
+    def params(self, now):
+        params = {"now": now.timestamp(), "floor": self.floor}
+        if not isinstance(self.rate, str):
+            params["rate"] = self.rate
+        return params
+
+
+def default_policies(db: MemoryDB):
+    """ Atoms (eager mode only; lazy mode sweeps expires_at instead), preferences, relations. """
+    policies = []
+    if not db.lazy_decay:
+        policies.append(DecayPolicy(
+            "memory_atoms", "magnitude", "last_updated", "decay_rate",
+            extra_sets=("expires_at = atom_expiry({decayed}, decay_rate, :now)",),
+            # Every magnitude in the chunk moved; readers must not see pre-pass values.
+            on_change=lambda db: db.notify_change(all_entities=True),
+            sharded=True,
+        ))
+    policies.append(DecayPolicy(
+        "preferences", "value", "updated_at", PREFERENCE_DECAY_RATE,
+        on_change=lambda db: db.notify_change(pref_keys=("*",)),
+    ))
+    policies.append(DecayPolicy("entity_relations", "weight", "last_updated", RELATION_DECAY_RATE, floor=RELATION_FLOOR))
+    return policies
+
 
 class DecayEngine:
     """
     Exponential Decay Daemon for VM 3.
-    Applies S(t) = S0 * e^(-lambda * t) to all memory atoms.
+    Applies S(t) = S0 * e^(-lambda * t) to every table with a DecayPolicy
+    (memory atoms, preferences and relation weights by default).
     Hardenened for Phase 3.5: Per-thread connection safety.
+    Each table is walked set-based in rowid chunks of chunk_size rows, each in its own
+    short write transaction. With pass_budget_sec set, a pass stops once the budget is
+    spent and the next pass resumes where it left off.
     """
-    def __init__(self, db: MemoryDB, interval_sec=3600):
+    def __init__(self, db: MemoryDB, interval_sec=3600, chunk_size=2000, policies=None, pass_budget_sec=None):
         self.db = db
         self.interval_sec = interval_sec
+        self.chunk_size = chunk_size
+        self.policies = policies if policies is not None else default_policies(db)
+        self.pass_budget_sec = pass_budget_sec
+        self.last_report = None
+        self.last_complete_at = None  # wall clock of the last pass that covered every table
+        self.started_at = None
         self.running = False
         self._thread = None
+        self._cursors = {}  # (db path, table) -> last rowid processed by an unfinished pass
+        self._resume_at = 0  # policy index an unfinished pass stopped at
 
     def start(self):
         self.running = True
+        self.started_at = time.time()
         self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
         print(f"Decay Engine started (Interval: {self.interval_sec}s)")
@@ -28,6 +132,16 @@ class DecayEngine:
         if self._thread:
             self._thread.join()
 
+    def lag_sec(self):
+        """
+        How far decay is behind schedule: seconds since the last complete pass (or
+        since start) beyond one interval. 0 while on time or when not running.
+        """
+        anchor = self.last_complete_at or self.started_at
+        if anchor is None:
+            return 0.0
+        return max(0.0, time.time() - anchor - self.interval_sec)
+
     def _run_loop(self):
         while self.running:
             try:
@@ -38,32 +152,157 @@ class DecayEngine:
 
     def apply_decay(self):
         """
-        Iterate through all memory atoms and reduce magnitude based on time delta.
+        One decay pass over every policy's table, with per-table timing.
+        In lazy mode atom magnitudes are decayed on read, so only expired atoms are removed.
         """
+        with self.db.maintenance():
+            return self._decay_pass()
+
+    def _decay_pass(self):
         now = datetime.datetime.now()
-        # Audit Fix: Open a fresh connection for the decay thread
-        with sqlite3.connect(self.db.db_path) as conn:
-            with conn:
-                cursor = conn.execute("SELECT id, magnitude, last_updated, decay_rate FROM memory_atoms")
-                atoms = cursor.fetchall()
-                
-                for atom_id, magnitude, last_updated_str, decay_rate in atoms:
-                    last_updated = datetime.datetime.fromisoformat(last_updated_str)
-                    delta_t = (now - last_updated).total_seconds() / 3600.0 # Time in hours
-                    
-                    # S(t) = S0 * e^(-lambda * t)
-                    new_magnitude = magnitude * math.exp(-decay_rate * delta_t)
-                    
-                    if abs(new_magnitude) < 0.01:
-                        conn.execute("DELETE FROM memory_atoms WHERE id = ?", (atom_id,))
-                    else:
-                        conn.execute("""
-                            UPDATE memory_atoms 
-                            SET magnitude = ?, last_updated = ? 
-                            WHERE id = ?
-                        """, (new_magnitude, now.isoformat(), atom_id))
-                
-                print(f"[{now}] Applied decay to {len(atoms)} memory atoms.")
+        started = time.perf_counter()
+        deadline = started + self.pass_budget_sec if self.pass_budget_sec else None
+        tables = {}
+        if self.db.lazy_decay:
+            tables["memory_atoms"] = self.sweep_expired()
+
+        # Start with the table an over-budget pass stopped at, so later tables are not starved.
+        complete = True
+        order = list(range(self._resume_at, len(self.policies))) + list(range(self._resume_at))
+        for index in order:
+            policy = self.policies[index]
+            if deadline is not None and time.perf_counter() >= deadline:
+                complete = False
+            else:
+                tables[policy.table] = self._decay_policy(policy, now, deadline)
+                complete = tables[policy.table]["complete"]
+            if not complete:
+                self._resume_at = index
+                break
+        if complete:
+            self._resume_at = 0
+
+        elapsed = time.perf_counter() - started
+        processed = sum(t["rows"] for t in tables.values())
+        report = {
+            "rows": processed,
+            "deleted": sum(t["deleted"] for t in tables.values()),
+            "chunks": sum(t["chunks"] for t in tables.values()),
+            "elapsed_sec": elapsed,
+            "rows_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+            "max_lock_sec": max([t["max_lock_sec"] for t in tables.values()] or [0.0]),
+            "complete": complete,
+            "tables": tables,
+        }
+        self.last_report = report
+        record_pass(report)
+        if complete:
+            self.last_complete_at = time.time()
+        for table, t in tables.items():
+            print(f"[{now}] Decay {table}: {t['rows']} rows ({t['deleted']} deleted) in {t['chunks']} chunks, "
+                  f"{t['elapsed_sec'] * 1000:.1f} ms, max lock hold {t['max_lock_sec'] * 1000:.1f} ms.")
+        if not complete:
+            print(f"[{now}] Decay pass hit its {self.pass_budget_sec}s budget; resuming next pass.")
+        return report
+
+    def _decay_policy(self, policy, now, deadline=None):
+        if not policy.sharded:
+            return self._decay_table(self.db.home, policy, now, deadline)
+        return merge_reports(self.db.map_shards(lambda shard: self._decay_table(shard, policy, now, deadline)))
+
+    def _decay_table(self, db, policy, now, deadline=None):
+        params = policy.params(now)
+        decayed = policy.decayed_sql
+        sets = ", ".join(
+            [f"{policy.value_column} = {decayed}", f"{policy.anchor_column} = :now"]
+            + [extra.format(decayed=decayed) for extra in policy.extra_sets]
+        )
+        table = policy.table
+        processed = deleted = chunks = 0
+        max_lock_sec = 0.0
+        complete = True
+        started = time.perf_counter()
+
+        # The decay thread checks out its own pooled connection and walks the table in
+        # rowid chunks, committing between them so writers can interleave.
+        with db.get_conn() as conn:
+            after = self._cursors.pop((db.db_path, table), -1)
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    self._cursors[(db.db_path, table)] = after
+                    complete = False
+                    break
+                upper = conn.execute(f"""
+                    SELECT rowid FROM {table} WHERE rowid > ?
+                    ORDER BY rowid LIMIT 1 OFFSET ?
+                """, (after, self.chunk_size - 1)).fetchone()
+                upper = upper[0] if upper else conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0]
+                if upper is None or upper <= after:
+                    break
+
+                chunk = dict(params, lo=after, hi=upper)
+                conn.execute("BEGIN IMMEDIATE")
+                locked_at = time.perf_counter()
+                try:
+                    cursor = conn.execute(f"""
+                        DELETE FROM {table}
+                        WHERE rowid > :lo AND rowid <= :hi AND {policy.prune_sql}
+                    """, chunk)
+                    deleted += cursor.rowcount
+                    processed += cursor.rowcount
+                    # RHS expressions all see the pre-update row, so every SET uses the old value.
+                    cursor = conn.execute(f"""
+                        UPDATE {table} SET {sets}
+                        WHERE rowid > :lo AND rowid <= :hi
+                    """, chunk)
+                    processed += cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                if policy.on_change:
+                    policy.on_change(self.db)
+                max_lock_sec = max(max_lock_sec, time.perf_counter() - locked_at)
+                chunks += 1
+                after = upper
+
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": processed,
+            "deleted": deleted,
+            "chunks": chunks,
+            "elapsed_sec": elapsed,
+            "rows_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+            "max_lock_sec": max_lock_sec,
+            "complete": complete,
+        }
+
+    def sweep_expired(self):
+        """
+        Lazy-mode pass: physically delete atoms whose decayed magnitude has crossed the
+        floor. Uses the expires_at index, so cost is proportional to the expired set.
+        """
+        now = datetime.datetime.now()
+        return merge_reports(self.db.map_shards(lambda shard: self._sweep_shard(shard, now)))
+
+    def _sweep_shard(self, db, now):
+        with db.get_conn() as conn:
+            started = time.perf_counter()
+            entities = conn.execute(
+                "DELETE FROM memory_atoms WHERE expires_at <= ? RETURNING entity_id", (now.timestamp(),)
+            ).fetchall()
+            elapsed = time.perf_counter() - started
+        deleted = len(entities)
+        self.db.notify_change(entities={row[0] for row in entities})
+        return {
+            "rows": deleted,
+            "deleted": deleted,
+            "chunks": 1,
+            "elapsed_sec": elapsed,
+            "rows_per_sec": deleted / elapsed if elapsed > 0 else 0.0,
+            "max_lock_sec": elapsed,
+            "complete": True,
+        }
 
 class ReinforcementEngine:
     """
@@ -72,18 +311,30 @@ class ReinforcementEngine:
     def __init__(self, db: MemoryDB):
         self.db = db
 
+    @staticmethod
+    def signal_delta(choice: bool, magnitude=0.1):
+        return magnitude if choice else -magnitude
+
     def reinforce(self, key: str, choice: bool, magnitude=0.1):
-        delta = magnitude if choice else -magnitude
-        now = datetime.datetime.now()
+        delta = self.signal_delta(choice, magnitude)
+        now = time.time()
         
-        with sqlite3.connect(self.db.db_path) as conn:
-            with conn:
-                conn.execute("""
-                    INSERT INTO preferences (key, value, confidence, updated_at)
-                    VALUES (?, ?, ?, ?)
-                    ON CONFLICT(key) DO UPDATE SET
-                        value = value + EXCLUDED.value,
-                        confidence = MIN(1.0, confidence + 0.05),
-                        updated_at = EXCLUDED.updated_at
-                """, (key, delta, 0.5, now.isoformat()))
-                print(f"Reinforced '{key}': {delta}")
+        with self.db.home.get_conn() as conn:
+            self._apply(conn, key, delta, 1, now)
+            print(f"Reinforced '{key}': {delta}")
+        self.db.notify_change(pref_keys=(key,))
+
+    def _apply(self, conn, key, delta, count, now):
+        """
+        Applies `count` reinforcements for one key whose deltas sum to `delta`.
+        Values are additive and confidence steps are linear below 1.0, so folding
+        several signals into one statement gives the same row as applying them in turn.
+        """
+        conn.execute("""
+            INSERT INTO preferences (key, value, confidence, updated_at)
+            VALUES (?, ?, MIN(1.0, 0.5 + 0.05 * (? - 1)), ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = value + EXCLUDED.value,
+                confidence = MIN(1.0, confidence + 0.05 * ?),
+                updated_at = EXCLUDED.updated_at
+        """, (key, delta, count, now, count))
@@ -1,36 +1,364 @@
-import sqlite3
 import datetime
+import random
+import time
+from memory.db import migrations
 from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import open_memory_db
+
+try:
+    import numpy as np
+except ImportError:  # only collapse_redundant_dimensions needs NumPy
+    np = None
 
 class DimensionManager:
     """
     Manages the health and density of memory dimensions in VM 3.
     Hardened for Phase 3.5: Per-thread connection safety.
     """
-    def __init__(self, db: MemoryDB, pruning_threshold=0.1):
+    def __init__(self, db: MemoryDB, pruning_threshold=0.1, similarity_threshold=0.98,
+                 min_shared_entities=3, max_profile_entities=1000, entity_block=4096):
         self.db = db
         self.pruning_threshold = pruning_threshold
+        self.similarity_threshold = similarity_threshold
+        self.min_shared_entities = min_shared_entities
+        self.max_profile_entities = max_profile_entities
+        self.entity_block = entity_block
 
     def prune_weak_atoms(self):
         """
         Deletes memory atoms where magnitude or confidence is too low.
         """
-        with self.db.get_conn() as conn:
-            with conn:
-                cursor = conn.execute("""
-                    DELETE FROM memory_atoms 
-                    WHERE abs(magnitude) < ? OR confidence < ?
-                """, (self.pruning_threshold, self.pruning_threshold))
-                print(f"Pruned {cursor.rowcount} weak memory atoms.")
+        with self.db.maintenance():
+            entities = [row for rows in self.db.map_shards(self._prune_shard) for row in rows]
+            print(f"Pruned {len(entities)} weak memory atoms.")
+            self.db.notify_change(entities={row[0] for row in entities})
+
+    def _prune_shard(self, db):
+        with db.get_conn() as conn:
+            return conn.execute(f"""
+                DELETE FROM memory_atoms 
+                WHERE abs({db.magnitude_sql()}) < :threshold OR confidence < :threshold
+                RETURNING entity_id
+            """, {"threshold": self.pruning_threshold, "now": time.time()}).fetchall()
 
     def collapse_redundant_dimensions(self):
-        pass
-
-    def get_dimension_report(self):
-        with self.db.get_conn() as conn:
-            cursor = conn.execute("""
-                SELECT dimension, count(*), sum(abs(magnitude)) 
-                FROM memory_atoms 
-                GROUP BY dimension
-            """)
-            return cursor.fetchall()
+        """
+        Folds dimensions with near-identical magnitude profiles across entities into a
+        canonical dimension. Profiles are columns of an entity x dimension matrix of
+        summed magnitudes; pairs whose cosine similarity is at least similarity_threshold
+        and that share min_shared_entities entities are clustered (union-find), and each
+        cluster is merged into its most populated dimension in one transaction.
+        Stores larger than max_profile_entities entities are profiled on a random entity
+        sample so detection stays sub-second. Later writes to a collapsed dimension are
+        redirected via dimension_aliases: the write-behind queue and the hot tier's
+        maintenance journal resolve them when they are applied, and in process mode the
+        server reloads the aliases on the merge's change notification. A write applied
+        between the merge commit and that reload (or a hot tier write to an entity the
+        merge did not touch) still lands on the alias dimension.
+        Returns {"merged": {alias: canonical}, "atoms_removed": n, "elapsed_sec": t}.
+        """
+        if np is None:
+            raise RuntimeError("collapse_redundant_dimensions requires NumPy")
+        with self.db.maintenance():
+            return self._collapse()
+
+    def _collapse(self):
+        started = time.perf_counter()
+        now = datetime.datetime.now()
+
+        # Each shard profiles its share of the entity sample.
+        max_entities = max(1, self.max_profile_entities // len(self.db.shards))
+        parts = self.db.map_shards(lambda shard: self._profile_shard(shard, now, max_entities))
+        counts = {}
+        for shard_counts, _ in parts:
+            for dimension, count in shard_counts:
+                counts[dimension] = counts.get(dimension, 0) + count
+        dim_counts = sorted(counts.items())
+        rows = [row for _, shard_rows in parts for row in shard_rows]
+        if not rows:
+            return {"merged": {}, "atoms_removed": 0, "elapsed_sec": time.perf_counter() - started}
+
+        dim_names = np.array([d for d, _ in dim_counts], dtype=object)
+        atom_counts = np.array([c for _, c in dim_counts], dtype=np.float64)
+        dim_lookup = {d: i for i, (d, _) in enumerate(dim_counts)}
+        ent_lookup = {}
+        ent_idx = np.fromiter((ent_lookup.setdefault(r[0], len(ent_lookup)) for r in rows), np.int64, len(rows))
+        dim_idx = np.fromiter((dim_lookup[r[1]] for r in rows), np.int64, len(rows))
+        values = np.fromiter((r[2] for r in rows), np.float64, len(rows))
+
+        gram, shared = self._profile_gram(ent_idx, dim_idx, values, len(dim_names))
+        norms = np.sqrt(np.diag(gram))
+        denom = np.outer(norms, norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cosine = np.where(denom > 0, gram / denom, 0.0)
+        candidates = (cosine >= self.similarity_threshold) & (shared >= self.min_shared_entities)
+        left, right = np.nonzero(np.triu(candidates, k=1))
+
+        merged = self._cluster(dim_names, atom_counts, left, right, cosine)
+        if not merged:
+            return {"merged": {}, "atoms_removed": 0, "elapsed_sec": time.perf_counter() - started}
+
+        removed = self._merge_dimensions(merged, now)
+        elapsed = time.perf_counter() - started
+        print(f"Collapsed {len(merged)} redundant dimensions, removed {removed} atoms in {elapsed:.2f}s.")
+        return {"merged": {a: c for a, (c, _) in merged.items()}, "atoms_removed": removed, "elapsed_sec": elapsed}
+
+    def _profile_shard(self, db, now, max_entities):
+        with db.get_conn() as conn:
+            # Both scans are covered by the hot-path indexes from migration 2.
+            dim_counts = conn.execute(
+                "SELECT dimension, count(*) FROM memory_atoms GROUP BY dimension").fetchall()
+            return dim_counts, self._profile_rows(db, conn, now, max_entities)
+
+    def _profile_rows(self, db, conn, now, max_entities):
+        """
+        (entity_id, dimension, summed magnitude) rows for every entity, or for a random
+        sample of about max_entities entities when the store is larger.
+        Sampling probes random rowids, so it costs O(sample * log n), not a table scan.
+        """
+        params = {"now": now.timestamp()}
+        magnitude = db.magnitude_sql()
+        max_rowid = conn.execute("SELECT max(rowid) FROM memory_atoms").fetchone()[0]
+        if max_rowid is None:
+            return []
+        total = conn.execute("SELECT count(*) FROM memory_atoms").fetchone()[0]
+        if total <= max_entities * 50:
+            return conn.execute(f"""
+                SELECT entity_id, dimension, sum({magnitude})
+                FROM memory_atoms GROUP BY entity_id, dimension
+            """, params).fetchall()
+
+        sample = set()
+        for _ in range(max_entities * 2):
+            row = conn.execute(
+                "SELECT entity_id FROM memory_atoms WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+                (random.randint(0, max_rowid),)).fetchone()
+            if row:
+                sample.add(row[0])
+            if len(sample) >= max_entities:
+                break
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS profile_entities (entity_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.profile_entities")
+        conn.executemany("INSERT INTO temp.profile_entities VALUES (?)", ((e,) for e in sample))
+        rows = conn.execute(f"""
+            SELECT entity_id, dimension, sum({magnitude})
+            FROM temp.profile_entities JOIN memory_atoms USING (entity_id)
+            GROUP BY entity_id, dimension
+        """, params).fetchall()
+        conn.execute("DELETE FROM temp.profile_entities")
+        return rows
+
+    def _profile_gram(self, ent_idx, dim_idx, values, n_dims):
+        """
+        Accumulates M.T @ M (dot products of dimension profiles) and the shared-entity
+        counts block by block over entities, so memory stays O(entity_block x dims).
+        """
+        gram = np.zeros((n_dims, n_dims))
+        shared = np.zeros((n_dims, n_dims))
+        order = np.argsort(ent_idx, kind="stable")
+        ent_idx, dim_idx, values = ent_idx[order], dim_idx[order], values[order]
+        n_entities = int(ent_idx[-1]) + 1
+        bounds = np.searchsorted(ent_idx, np.arange(0, n_entities + self.entity_block, self.entity_block))
+        for block_no, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if lo == hi:
+                continue
+            block = np.zeros((self.entity_block, n_dims))
+            block[ent_idx[lo:hi] - block_no * self.entity_block, dim_idx[lo:hi]] = values[lo:hi]
+            present = (block != 0).astype(np.float64)
+            gram += block.T @ block
+            shared += present.T @ present
+        return gram, shared
+
+    @staticmethod
+    def _cluster(dim_names, atom_counts, left, right, cosine):
+        parent = list(range(len(dim_names)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in zip(left.tolist(), right.tolist()):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[rj] = ri
+
+        clusters = {}
+        for i in set(left.tolist()) | set(right.tolist()):
+            clusters.setdefault(find(i), []).append(i)
+
+        merged = {}
+        for members in clusters.values():
+            canonical = max(members, key=lambda i: (atom_counts[i], dim_names[i]))
+            for i in members:
+                if i != canonical:
+                    merged[str(dim_names[i])] = (str(dim_names[canonical]), float(cosine[i, canonical]))
+        return merged
+
+    def _merge_dimensions(self, merged, now):
+        """ Merges on every shard concurrently, one transaction each; returns atoms removed. """
+        results = self.db.map_shards(lambda shard: self._merge_shard(shard, merged, now))
+        self.db.reload_dimension_aliases()
+        self.db.notify_change(entities={entity_id for touched, _ in results for entity_id, _ in touched})
+        return sum(removed for _, removed in results)
+
+    def _merge_shard(self, db, merged, now):
+        lazy = db.lazy_decay
+        magnitude = db.magnitude_sql()
+        # Lazy mode decays both sides to now before adding, then re-anchors at now.
+        anchor = ":now" if lazy else "last_updated"
+        # The two atoms describe the same signal, so overlapping ones are averaged, not summed.
+        new_magnitude = f"(({magnitude} + EXCLUDED.magnitude) / 2.0)"
+        new_anchor = ":now" if lazy else "MAX(last_updated, EXCLUDED.last_updated)"
+
+        with db.get_conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.execute("SELECT count(*) FROM memory_atoms").fetchone()[0]
+            touched = set()
+            for alias, (canonical, similarity) in merged.items():
+                params = {"alias": alias, "canonical": canonical, "now": now.timestamp(),
+                          "collapsed_at": now.isoformat()}
+                touched.update((row[0], canonical) for row in conn.execute(
+                    "SELECT DISTINCT entity_id FROM memory_atoms WHERE dimension = :alias", params))
+                conn.execute(f"""
+                    INSERT INTO memory_atoms (entity_id, dimension, magnitude, context_hash, confidence,
+                                              decay_rate, last_updated, expires_at, written_at)
+                    SELECT entity_id, :canonical, {magnitude}, context_hash, confidence, decay_rate, {anchor}, expires_at,
+                           written_at
+                    FROM memory_atoms WHERE dimension = :alias AND true
+                    ON CONFLICT(entity_id, dimension, context_hash) DO UPDATE SET
+                        magnitude = {new_magnitude},
+                        confidence = MAX(confidence, EXCLUDED.confidence),
+                        last_updated = {new_anchor},
+                        written_at = MAX(written_at, EXCLUDED.written_at),
+                        expires_at = atom_expiry({new_magnitude}, decay_rate, {new_anchor})
+                """, params)
+                conn.execute("DELETE FROM memory_atoms WHERE dimension = :alias", params)
+                conn.execute("""
+                    INSERT INTO dimension_aliases (alias, canonical, similarity, collapsed_at)
+                    VALUES (:alias, :canonical, :similarity, :collapsed_at)
+                    ON CONFLICT(alias) DO UPDATE SET canonical = EXCLUDED.canonical,
+                        similarity = EXCLUDED.similarity, collapsed_at = EXCLUDED.collapsed_at
+                """, dict(params, similarity=similarity))
+                # Anything that used to redirect to the alias now redirects to its canonical.
+                conn.execute("UPDATE dimension_aliases SET canonical = :canonical WHERE canonical = :alias", params)
+            db._enforce_caps(conn, touched)
+            after = conn.execute("SELECT count(*) FROM memory_atoms").fetchone()[0]
+        return touched, before - after
+
+    def get_dimension_report(self, exact=False):
+        """
+        (dimension, atom_count, sum |magnitude|) per dimension, read from the
+        trigger-maintained dimension_stats table in O(#dimensions).
+        In lazy decay mode the stored sums use anchored magnitudes (an upper bound);
+        exact=True rescans memory_atoms with decay applied.
+        """
+        def report(db):
+            with db.get_conn() as conn:
+                if exact:
+                    cursor = conn.execute(f"""
+                        SELECT dimension, count(*), sum(abs({db.magnitude_sql()})) 
+                        FROM memory_atoms 
+                        GROUP BY dimension
+                    """, {"now": time.time()})
+                else:
+                    cursor = conn.execute("""
+                        SELECT dimension, atom_count, sum_abs_magnitude
+                        FROM dimension_stats
+                        ORDER BY dimension
+                    """)
+                return cursor.fetchall()
+
+        parts = self.db.map_shards(report)
+        if len(parts) == 1:
+            return parts[0]
+        return [(d, n, m) for d, (n, m) in self._sum_by_dimension(parts).items()]
+
+    def get_dimension_stats(self):
+        def stats(db):
+            with db.get_conn() as conn:
+                return conn.execute("""
+                    SELECT dimension, atom_count, sum_abs_magnitude, sum_confidence, last_touched
+                    FROM dimension_stats
+                    ORDER BY dimension
+                """).fetchall()
+
+        parts = self.db.map_shards(stats)
+        last_touched = {}
+        for rows in parts:
+            for d, _, _, _, t in rows:
+                last_touched[d] = t if last_touched.get(d) is None else max(last_touched[d], t)
+        totals = self._sum_by_dimension([[row[:4] for row in rows] for rows in parts])
+        return [
+            {"dimension": d, "atom_count": n, "sum_abs_magnitude": m,
+             "mean_confidence": c / n if n else None, "last_touched": last_touched[d]}
+            for d, (n, m, c) in totals.items()
+        ]
+
+    @staticmethod
+    def _sum_by_dimension(parts):
+        """ Adds up per-shard (dimension, *numbers) rows; returns {dimension: sums} in dimension order. """
+        totals = {}
+        for rows in parts:
+            for dimension, *values in rows:
+                current = totals.get(dimension)
+                totals[dimension] = values if current is None else [a + b for a, b in zip(current, values)]
+        return {d: tuple(totals[d]) for d in sorted(totals)}
+
+    def check_dimension_stats(self, tolerance=1e-6):
+        """
+        Compares dimension_stats with a full GROUP BY over memory_atoms, shard by shard.
+        Returns a list of (dimension, stored, actual) mismatches; empty means consistent.
+        """
+        return [m for mismatches in self.db.map_shards(lambda shard: self._check_shard(shard, tolerance))
+                for m in mismatches]
+
+    @staticmethod
+    def _check_shard(db, tolerance):
+        with db.get_conn() as conn:
+            actual = {d: (n, m, c) for d, n, m, c in conn.execute("""
+                SELECT dimension, count(*), sum(abs(magnitude)), sum(confidence)
+                FROM memory_atoms GROUP BY dimension
+            """)}
+            stored = {d: (n, m, c) for d, n, m, c in conn.execute("""
+                SELECT dimension, atom_count, sum_abs_magnitude, sum_confidence FROM dimension_stats
+            """)}
+        mismatches = []
+        for dimension in sorted(set(actual) | set(stored)):
+            a, b = actual.get(dimension), stored.get(dimension)
+            if a is None or b is None or a[0] != b[0] or any(
+                    abs(x - y) > tolerance * max(1, a[0]) for x, y in zip(a[1:], b[1:])):
+                mismatches.append((dimension, b, a))
+        return mismatches
+
+    def rebuild_dimension_stats(self):
+        """ Recovery path: recompute dimension_stats from memory_atoms, one transaction per shard. """
+        def rebuild(db):
+            with db.get_conn() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                migrations.rebuild_dimension_stats(conn)
+                return {row[0] for row in conn.execute("SELECT dimension FROM dimension_stats")}
+
+        count = len(set().union(*self.db.map_shards(rebuild)))
+        print(f"Rebuilt dimension stats for {count} dimensions.")
+        return count
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Dimension stats maintenance for the VM 3 memory store.")
+    parser.add_argument("--db", default="memory/db/kuro_memory.db")
+    parser.add_argument("--shards", type=int, default=1, help="shard count the store was created with")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+
+    manager = DimensionManager(open_memory_db(args.db, shards=args.shards))
+    if args.command == "rebuild":
+        manager.rebuild_dimension_stats()
+    else:
+        problems = manager.check_dimension_stats()
+        for dimension, stored, actual in problems:
+            print(f"{dimension}: stored={stored} actual={actual}")
+        print(f"{len(problems)} inconsistent dimensions.")
+        raise SystemExit(1 if problems else 0)
@@ -0,0 +1,313 @@
+"""
+Maintenance scheduler for VM 3.
+Decay, pruning and dimension collapse run as scheduled jobs, one at a time. In
+"process" mode they run in a worker process with its own MemoryDB, so their per-row
+Python work (atom_expiry and the other SQLite functions, NumPy profiling) does not
+compete with RPC threads for the GIL; the serving process only wraps each job in
+MemoryDB.maintenance() and applies the change notifications the worker sends back.
+"thread" mode runs the same jobs on the scheduler thread.
+"""
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from memory.db.sharded_db import open_memory_db
+from memory.decay_engine import DecayEngine, record_pass
+from memory.dimension_manager import DimensionManager
+from common.utils.metrics import REGISTRY
+
+MAINTENANCE_MODES = ("process", "thread")
+
+JOB_SECONDS = REGISTRY.histogram(
+    "kuro_maintenance_job_seconds", "Duration of maintenance jobs.", labels=("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0))
+JOB_FAILURES = REGISTRY.counter(
+    "kuro_maintenance_job_failures", "Maintenance jobs that failed, overran their budget or were cancelled.",
+    labels=("job", "reason"))
+
+
+class MaintenanceCancelled(Exception):
+    pass
+
+
+class MaintenanceJob:
+    """
+    One scheduled job: runs every interval_sec (stretched or shrunk by the scheduler's
+    jitter) and, with run_at_start, once right after start. interval_sec=0 without
+    run_at_start disables it.
+    budget_sec is passed to the job as a soft budget (decay stops and resumes next
+    pass); in process mode a job still running grace_sec past it is killed.
+    """
+    def __init__(self, name, interval_sec, budget_sec=None, run_at_start=False):
+        self.name = name
+        self.interval_sec = interval_sec
+        self.budget_sec = budget_sec
+        self.run_at_start = run_at_start
+        self.next_run_at = None
+        self.scheduled_at = None
+        self.last_started_at = None
+        self.last_complete_at = None  # wall clock of the last run that finished its work
+        self.last_report = None
+        self.last_error = None
+        self.runs = 0
+        self.failures = 0
+
+    @property
+    def enabled(self):
+        return self.interval_sec > 0 or self.run_at_start
+
+    def lag_sec(self):
+        """ Seconds since the last complete run (or since scheduling) beyond one interval. """
+        anchor = self.last_complete_at or self.scheduled_at
+        if anchor is None or not self.interval_sec:
+            return 0.0
+        return max(0.0, time.time() - anchor - self.interval_sec)
+
+
+def default_jobs(decay_sec=3600.0, prune_sec=6 * 3600.0, collapse_sec=0.0, decay_budget_sec=300.0,
+                 prune_budget_sec=300.0, collapse_budget_sec=600.0):
+    """ Prune and decay at start and then periodically; collapse only when given an interval. """
+    return [
+        MaintenanceJob("prune", prune_sec, prune_budget_sec, run_at_start=True),
+        MaintenanceJob("decay", decay_sec, decay_budget_sec, run_at_start=True),
+        MaintenanceJob("collapse", collapse_sec, collapse_budget_sec),
+    ]
+
+
+class _JobRunner:
+    """ The job bodies, built once per process around that process's MemoryDB. """
+    def __init__(self, db):
+        self.decay_engine = DecayEngine(db)
+        self.dim_manager = DimensionManager(db)
+
+    def run(self, name, budget_sec):
+        if name == "decay":
+            self.decay_engine.pass_budget_sec = budget_sec
+            return self.decay_engine.apply_decay()
+        if name == "prune":
+            return self.dim_manager.prune_weak_atoms()
+        if name == "collapse":
+            return self.dim_manager.collapse_redundant_dimensions()
+        raise ValueError(f"Unknown maintenance job '{name}'")
+
+
+def _worker_main(db_settings, tasks, events, parent_pid):
+    """
+    Worker process loop: runs (name, budget_sec) tasks and reports ("change", ...)
+    notifications and a final ("done", name, report, error) on one queue, in order.
+    """
+    db = open_memory_db(**db_settings)
+    db.add_listener(lambda entities, pref_keys, all_entities:
+                    events.put(("change", list(entities), list(pref_keys), all_entities)))
+    runner = _JobRunner(db)
+    try:
+        while True:
+            try:
+                task = tasks.get(timeout=1.0)
+            except queue.Empty:
+                if os.getppid() != parent_pid:
+                    break  # the server died without stopping us
+                continue
+            if task is None:
+                break
+            name, budget_sec = task
+            try:
+                # The server may have set policies or aliases since this process opened its db.
+                db.reload_dimension_policies()
+                db.reload_dimension_aliases()
+                events.put(("done", name, runner.run(name, budget_sec), None))
+            except Exception as e:
+                events.put(("done", name, None, f"{type(e).__name__}: {e}"))
+    finally:
+        db.close()
+
+
+class MaintenanceScheduler:
+    """
+    Runs MaintenanceJobs one at a time on a scheduler thread, so passes never overlap;
+    each next run is interval_sec * uniform(1 - jitter, 1 + jitter) after the previous
+    one finished, which keeps jobs with equal intervals (and replicas) from lining up.
+
+    mode="process": jobs run in one spawned worker process opened with db_settings
+    (open_memory_db keyword arguments), started on the first job and restarted after
+    it is killed. Every job is wrapped in db.maintenance() here, so hot tier writes are
+    checkpointed and held and WAL checkpoints stay passive while it runs. A job that
+    outlives budget_sec + grace_sec, or is still running grace_sec after stop(), is
+    killed: its committed chunks stay, the open transaction rolls back.
+    """
+    def __init__(self, db, jobs=None, mode="process", db_settings=None, jitter=0.1, grace_sec=30.0, poll_sec=0.5):
+        if mode not in MAINTENANCE_MODES:
+            raise ValueError(f"Unknown maintenance mode '{mode}', expected one of {MAINTENANCE_MODES}")
+        if mode == "process" and db_settings is None:
+            raise ValueError("Process mode needs db_settings to open the worker's MemoryDB")
+        self.db = db
+        self.jobs = [job for job in (jobs if jobs is not None else default_jobs()) if job.enabled]
+        self.mode = mode
+        self.db_settings = db_settings
+        self.jitter = jitter
+        self.grace_sec = grace_sec
+        self.poll_sec = poll_sec
+        self.running = False
+        self.current = None
+        self._runner = _JobRunner(db) if mode == "thread" else None
+        self._stop = threading.Event()
+        self._thread = None
+        self._worker = None
+        self._tasks = None
+        self._events = None
+
+    def job(self, name):
+        for job in self.jobs:
+            if job.name == name:
+                return job
+        return None
+
+    def start(self):
+        now = time.time()
+        for job in self.jobs:
+            job.scheduled_at = now
+            job.next_run_at = now if job.run_at_start else self._next_run(job, now)
+        self.running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="memory-maintenance", daemon=True)
+        self._thread.start()
+        print(f"Maintenance scheduler started ({self.mode} mode: "
+              + ", ".join(f"{job.name} every {job.interval_sec}s" if job.interval_sec else f"{job.name} at start"
+                          for job in self.jobs) + ")")
+
+    def stop(self):
+        """ Cancels the running job (after grace_sec) and shuts the worker down. """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.running = False
+        if self._worker is not None:
+            self._tasks.put(None)
+            self._worker.join(self.grace_sec)
+            if self._worker.is_alive():
+                self._kill_worker()
+            self._worker = None
+
+    def _next_run(self, job, now):
+        if not job.interval_sec:
+            return float("inf")
+        return now + job.interval_sec * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            job = min(self.jobs, key=lambda j: j.next_run_at, default=None)
+            if job is None or job.next_run_at == float("inf"):
+                self._stop.wait(self.poll_sec * 10)
+                continue
+            wait = job.next_run_at - time.time()
+            if wait > 0:
+                self._stop.wait(min(wait, self.poll_sec * 10))
+                continue
+            self.run(job)
+            job.next_run_at = self._next_run(job, time.time())
+
+    def run(self, job):
+        """ Runs one job now on the calling thread; returns its report (None if it failed). """
+        self.current = job
+        job.last_started_at = time.time()
+        started = time.perf_counter()
+        report = None
+        try:
+            with self.db.maintenance():
+                report = self._run_in_worker(job) if self.mode == "process" else \
+                    self._runner.run(job.name, job.budget_sec)
+        except Exception as e:
+            reason = "overrun" if isinstance(e, TimeoutError) else \
+                "cancelled" if isinstance(e, MaintenanceCancelled) else "error"
+            job.failures += 1
+            job.last_error = str(e)
+            JOB_FAILURES.labels(job.name, reason).inc()
+            print(f"Maintenance job {job.name} {reason}: {e}")
+        else:
+            job.last_report = report
+            job.last_error = None
+            if not isinstance(report, dict) or report.get("complete", True):
+                job.last_complete_at = time.time()
+        finally:
+            self.current = None
+        job.runs += 1
+        JOB_SECONDS.labels(job.name).observe(time.perf_counter() - started)
+        return report
+
+    def _run_in_worker(self, job):
+        self._ensure_worker()
+        self._tasks.put((job.name, job.budget_sec))
+        overrun_at = time.monotonic() + job.budget_sec + self.grace_sec if job.budget_sec else None
+        cancel_at = None
+        while True:
+            now = time.monotonic()
+            if self._stop.is_set() and cancel_at is None:
+                cancel_at = now + self.grace_sec
+            if cancel_at is not None and now >= cancel_at:
+                self._abandon()
+                raise MaintenanceCancelled(f"still running {self.grace_sec}s after shutdown began")
+            if overrun_at is not None and now >= overrun_at:
+                self._abandon()
+                raise TimeoutError(f"exceeded its {job.budget_sec}s budget by {self.grace_sec}s")
+            try:
+                event = self._events.get(timeout=self.poll_sec)
+            except queue.Empty:
+                if not self._worker.is_alive():
+                    exitcode = self._worker.exitcode
+                    self._worker = None
+                    self.db.reload_dimension_aliases()
+                    self.db.notify_change(all_entities=True)
+                    raise RuntimeError(f"maintenance worker exited with code {exitcode}")
+                continue
+            if event[0] == "change":
+                if job.name == "collapse":
+                    # Sent right after the merge commits: pick up its aliases before the
+                    # listeners run, so rebased hot tier journals and new writes use them.
+                    self.db.reload_dimension_aliases()
+                self.db.notify_change(*event[1:])
+                continue
+            _, _, report, error = event
+            if error:
+                raise RuntimeError(error)
+            if job.name == "decay":
+                record_pass(report)
+            return report
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        # spawn, not fork: a forked child would inherit the server's threads' locks and open connections.
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._events = context.Queue()
+        self._worker = context.Process(target=_worker_main, name="memory-maintenance-worker", daemon=True,
+                                       args=(self.db_settings, self._tasks, self._events, os.getpid()))
+        self._worker.start()
+        print(f"Maintenance worker started (pid {self._worker.pid})")
+
+    def _abandon(self):
+        """ Kills a worker mid-job; its unreported commits may have touched any entity or alias. """
+        self._kill_worker()
+        self._worker = None
+        self.db.reload_dimension_aliases()
+        self.db.notify_change(all_entities=True)
+
+    def _kill_worker(self):
+        self._worker.terminate()
+        self._worker.join(5.0)
+        print(f"Maintenance worker {self._worker.pid} killed")
+
+    def stats(self):
+        return {
+            job.name: {
+                "runs": job.runs,
+                "failures": job.failures,
+                "running": self.current is job,
+                "next_run_in_sec": max(0.0, job.next_run_at - time.time()) if job.next_run_at else None,
+                "lag_sec": job.lag_sec(),
+                "last_error": job.last_error,
+            }
+            for job in self.jobs
+        }
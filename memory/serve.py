@@ -1,5 +1,6 @@
 import grpc
 import os
+import signal
 import sys
 sys.path.append(os.getcwd())
 sys.stdout.reconfigure(line_buffering=True)
@@ -12,48 +13,297 @@ logging.basicConfig(
 )
 logger = logging.getLogger("Memory")
 import datetime
-from memory.db.memory_db import MemoryDB
-from memory.decay_engine import DecayEngine, ReinforcementEngine
-from memory.dimension_manager import DimensionManager
+import time
+from memory.db.memory_db import QUERY_PAGE_SIZE
+from memory.db.sharded_db import open_memory_db
+from memory.db.hot_tier import HotTier
+from memory.decay_engine import ReinforcementEngine
+from memory.maintenance import MaintenanceScheduler, default_jobs
+from memory.write_queue import WriteBehindQueue
+from memory.context_cache import ContextCache, PREFERENCES_KEY, entity_key
 from common.utils.health import HealthServicer
+from common.utils.metrics import REGISTRY, MetricsInterceptor, start_http_server
 from common.proto import kuro_pb2
 from common.proto import kuro_pb2_grpc
 from google.protobuf import struct_pb2
 
+# Proposals per transaction when draining StreamMemoryProposals
+STREAM_BATCH_SIZE = 500
+
+# StreamContext items per chunk when the request leaves chunk_size at 0, and the cap.
+STREAM_CHUNK_SIZE = int(os.environ.get("KURO_MEMORY_STREAM_CHUNK", "256"))
+MAX_STREAM_CHUNK_SIZE = 4096
+
+QUERY_ORDERS = {
+    kuro_pb2.AtomQuery.RECENT: "recent",
+    kuro_pb2.AtomQuery.STRONGEST: "strongest",
+}
+
 class MemoryServicer(kuro_pb2_grpc.MemoryServiceServicer):
     """
     gRPC Service for Persistent Memory (VM 3).
     """
     def __init__(self):
-        self.db = MemoryDB()
-        self.decay_engine = DecayEngine(self.db)
+        # KURO_MEMORY_SHARDS > 1 partitions atoms by entity over that many SQLite files.
+        db_settings = dict(
+            db_path=os.environ.get("KURO_MEMORY_DB", "memory/db/kuro_memory.db"),
+            shards=int(os.environ.get("KURO_MEMORY_SHARDS", "1")),
+            decay_mode=os.environ.get("KURO_MEMORY_DECAY_MODE", "eager"),
+            max_atoms=int(os.environ.get("KURO_MEMORY_MAX_ATOMS", "50")),
+            eviction=os.environ.get("KURO_MEMORY_EVICTION", "confidence"),
+        )
+        self.db = open_memory_db(**db_settings)
+        if os.environ.get("KURO_MEMORY_WAL_CHECKPOINT", "1") == "1":
+            self.db.start_checkpointer(
+                interval_sec=float(os.environ.get("KURO_MEMORY_WAL_CHECKPOINT_SEC", "30")),
+                idle_sec=float(os.environ.get("KURO_MEMORY_WAL_IDLE_SEC", "10")),
+            )
+        # Optional in-memory atom tier; when enabled it serves all atom reads and writes.
+        self.hot_tier = None
+        if os.environ.get("KURO_MEMORY_HOT_TIER", "0") == "1":
+            self.hot_tier = HotTier(
+                self.db,
+                max_bytes=int(float(os.environ.get("KURO_MEMORY_HOT_TIER_MB", "64")) * 1024 * 1024),
+                checkpoint_interval_sec=float(os.environ.get("KURO_MEMORY_CHECKPOINT_SEC", "5")),
+            )
+            self.hot_tier.start()
+        self.atoms = self.hot_tier or self.db
         self.reinforce_engine = ReinforcementEngine(self.db)
-        self.dim_manager = DimensionManager(self.db)
-        # Prune every time server starts (or could be periodic)
-        self.dim_manager.prune_weak_atoms()
-        self.decay_engine.start()
+        self.context_cache = ContextCache(ttl_sec=float(os.environ.get("KURO_MEMORY_CACHE_TTL", "30")))
+        self.db.add_listener(self.context_cache.on_change)
+        # Group-commit single writes unless explicitly disabled ("off" | "commit" | "enqueue")
+        write_mode = os.environ.get("KURO_MEMORY_WRITE_MODE", "commit")
+        self.write_queue = None
+        if write_mode != "off":
+            self.write_queue = WriteBehindQueue(self.db, self.reinforce_engine, ack_mode=write_mode)
+            self.write_queue.start()
+        # Decay, pruning and collapse run on a scheduler, by default in a worker process
+        # ("process" | "thread"); prune and decay also run once at start.
+        self.maintenance = MaintenanceScheduler(
+            self.db,
+            default_jobs(
+                decay_sec=float(os.environ.get("KURO_MEMORY_DECAY_SEC", "3600")),
+                prune_sec=float(os.environ.get("KURO_MEMORY_PRUNE_SEC", "21600")),
+                collapse_sec=float(os.environ.get("KURO_MEMORY_COLLAPSE_SEC", "0")),
+                decay_budget_sec=float(os.environ.get("KURO_MEMORY_DECAY_BUDGET_SEC", "300")),
+            ),
+            mode=os.environ.get("KURO_MEMORY_MAINTENANCE", "process"),
+            db_settings=dict(db_settings, pool_size=2),
+            jitter=float(os.environ.get("KURO_MEMORY_MAINTENANCE_JITTER", "0.1")),
+            grace_sec=float(os.environ.get("KURO_MEMORY_MAINTENANCE_GRACE_SEC", "30")),
+        )
+        self.decay_job = self.maintenance.job("decay")
+        self._register_metrics()
+        self.maintenance.start()
+
+    def stop(self):
+        """ Cancels maintenance, drains queued writes, checkpoints the hot tier and closes the store. """
+        self.maintenance.stop()
+        if self.write_queue:
+            self.write_queue.stop()
+        if self.hot_tier:
+            self.hot_tier.stop()
+        self.db.close()
+
+    def _register_metrics(self):
+        """
+        Scrape-time gauges for state owned by this servicer (the RPC, query and decay
+        metrics are recorded where they happen).
+        """
+        cache = self.context_cache.stats
+        REGISTRY.callback("kuro_context_cache_hits", "GetContext cache hits.", lambda: cache()["hits"], kind="counter")
+        REGISTRY.callback("kuro_context_cache_misses", "GetContext cache misses.", lambda: cache()["misses"], kind="counter")
+        REGISTRY.callback("kuro_context_cache_hit_ratio", "GetContext cache hit ratio since start.", lambda: cache()["hit_rate"])
+        REGISTRY.callback("kuro_context_cache_entries", "Entries held by the GetContext cache.", lambda: cache()["entries"])
+        REGISTRY.callback("kuro_context_cache_bytes", "Approximate bytes held by the GetContext cache.", lambda: cache()["bytes"])
+        REGISTRY.callback("kuro_db_table_rows", "Rows per table.",
+                          lambda: {(table,): rows for table, rows in self.db.table_row_counts().items()},
+                          labels=("table",))
+        REGISTRY.callback("kuro_db_pool_connections", "Pooled SQLite connections by state.",
+                          lambda: {(state,): sum(shard.pool.stats()[key] for shard in self.db.shards)
+                                   for state, key in (("open", "opened"), ("idle", "idle"))},
+                          labels=("state",))
+        REGISTRY.callback("kuro_db_file_bytes", "Size of the database, WAL and shared-memory files.",
+                          lambda: {(name,): size for name, size in self.db_file_sizes().items()},
+                          labels=("file",))
+        REGISTRY.callback("kuro_decay_lag_seconds", "How far the decay engine is behind its interval.",
+                          lambda: self.decay_job.lag_sec() if self.decay_job else 0.0)
+        if self.write_queue:
+            REGISTRY.callback("kuro_write_queue_depth", "Writes waiting in the write-behind queue.",
+                              lambda: self.write_queue.stats()["queue_depth"])
+        if self.hot_tier:
+            tier = self.hot_tier.stats
+            REGISTRY.callback("kuro_hot_tier_hits", "Hot tier entity hits.", lambda: tier()["hits"], kind="counter")
+            REGISTRY.callback("kuro_hot_tier_misses", "Hot tier entity misses.", lambda: tier()["misses"], kind="counter")
+            REGISTRY.callback("kuro_hot_tier_bytes", "Approximate bytes resident in the hot tier.", lambda: tier()["bytes"])
+            REGISTRY.callback("kuro_hot_tier_dirty_atoms", "Hot tier atoms not yet checkpointed.",
+                              lambda: tier()["dirty_atoms"])
+
+    def db_file_sizes(self):
+        """ Bytes per file kind, summed over shards. """
+        sizes = {}
+        for name, suffix in (("db", ""), ("wal", "-wal"), ("shm", "-shm")):
+            sizes[name] = 0
+            for shard in self.db.shards:
+                try:
+                    sizes[name] += os.path.getsize(shard.db_path + suffix)
+                except OSError:
+                    pass
+        return sizes
+
+    def health_gauges(self):
+        """ Service gauges for NodeMetrics.gauges, sampled by the HealthServicer. """
+        gauges = {f"{name}_bytes": size for name, size in self.db_file_sizes().items()}
+        gauges["decay_lag_sec"] = self.decay_job.lag_sec() if self.decay_job else 0.0
+        checkpointers = [shard.checkpointer for shard in self.db.shards if shard.checkpointer.running]
+        if checkpointers:
+            gauges["wal_checkpoint_age_sec"] = max(
+                checkpointer.stats()["seconds_since_checkpoint"] for checkpointer in checkpointers)
+        if self.decay_job and self.decay_job.last_complete_at:
+            gauges["decay_last_pass_age_sec"] = time.time() - self.decay_job.last_complete_at
+        if self.write_queue:
+            gauges["write_queue_depth"] = self.write_queue.stats()["queue_depth"]
+        return gauges
 
     def GetContext(self, request, context):
         """
         Retrieve memory summaries and preferences from the real SQLite substrate.
         """
         entities = list(request.entities) if request.entities else ["user"]
-        summaries = self.db.get_memory_summaries(entities)
-        prefs = self.db.get_preferences()
+        Format = kuro_pb2.ContextRequest
+        filters = (request.top_k, request.min_magnitude)
+        prefs = self._cached(
+            PREFERENCES_KEY,
+            self.db.get_preferences,
+            lambda value: sum(len(k) + 32 for k in value) + 64,
+        )
         
         response = kuro_pb2.ContextResponse()
-        response.memory_summaries.extend(summaries)
+        if request.expand_neighbors:
+            # Pull in the strongest related entities in the same round trip.
+            expanded = self.db.expand_entities(
+                entities, request.expand_neighbors,
+                max_hops=request.expand_hops, min_weight=request.expand_min_weight)
+            for row in expanded:
+                response.expanded.append(self._neighbor(row))
+            entities = entities + [row[0] for row in expanded]
+        if request.format in (Format.SUMMARIES, Format.SUMMARIES_AND_ATOMS):
+            summaries = self._cached_per_entity(
+                entities, ("summary",) + filters,
+                lambda missing: self.atoms.get_memory_summary_map(
+                    missing, top_k=request.top_k, min_magnitude=request.min_magnitude),
+                lambda value: len(value or "") + 64,
+            )
+            response.memory_summaries.extend(v for v in summaries if v)
+        if request.format in (Format.ATOMS, Format.SUMMARIES_AND_ATOMS):
+            atoms = self._cached_per_entity(
+                entities, ("atoms",) + filters,
+                lambda missing: self.atoms.fetch_atoms(
+                    missing, top_k=request.top_k, min_magnitude=request.min_magnitude, detail=True),
+                lambda value: 64 * len(value or ()) + 64,
+            )
+            for ent, rows in zip(dict.fromkeys(entities), atoms):
+                for dimension, magnitude, confidence, last_updated in rows or ():
+                    response.atoms.add(entity_id=ent, dimension=dimension, magnitude=magnitude,
+                                       confidence=confidence, last_updated=last_updated)
         for k, v in prefs.items():
             response.preferences[k] = v
             
         return response
 
+    def StreamContext(self, request, context):
+        """
+        GetContext in chunks of request.chunk_size atoms (then preferences), built from
+        the SQLite cursor as rows arrive: memory per call stays O(chunk) and the brain
+        can start on the first chunk before the last atom is read. Bypasses the context
+        cache, which is sized for small per-entity results.
+        """
+        chunks = self._context_chunks(request)
+        try:
+            for chunk in chunks:
+                if not context.is_active():
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+    def _context_chunks(self, request):
+        size = min(request.chunk_size or STREAM_CHUNK_SIZE, MAX_STREAM_CHUNK_SIZE)
+        entities = list(request.entities) if request.entities else ["user"]
+        chunk = kuro_pb2.ContextChunk()
+        if request.expand_neighbors:
+            expanded = self.db.expand_entities(
+                entities, request.expand_neighbors,
+                max_hops=request.expand_hops, min_weight=request.expand_min_weight)
+            for row in expanded:
+                chunk.expanded.append(self._neighbor(row))
+            entities = entities + [row[0] for row in expanded]
+        for entity_id, dimension, magnitude, confidence, last_updated in self.atoms.iter_atoms(
+                entities, top_k=request.top_k, min_magnitude=request.min_magnitude, batch_size=size):
+            chunk.atoms.add(entity_id=entity_id, dimension=dimension, magnitude=magnitude,
+                            confidence=confidence, last_updated=last_updated)
+            if len(chunk.atoms) >= size:
+                yield chunk
+                chunk = kuro_pb2.ContextChunk()
+        count = len(chunk.atoms)
+        for key, value in self.db.iter_preferences(batch_size=size):
+            chunk.preferences[key] = value
+            count += 1
+            if count >= size:
+                yield chunk
+                chunk = kuro_pb2.ContextChunk()
+                count = 0
+        if count or chunk.expanded:
+            yield chunk
+
+    def _cached_per_entity(self, entities, variant, load_many, sizeof):
+        """
+        Per-entity cache lookups; all misses are loaded together with one load_many()
+        call. Returns one value per distinct entity, in request order (None if absent).
+        """
+        ordered = list(dict.fromkeys(entities))
+        found = {}
+        tokens = {}
+        for ent in ordered:
+            hit, value = self.context_cache.get(entity_key(ent), variant)
+            if hit:
+                found[ent] = value
+            else:
+                tokens[ent] = self.context_cache.token(entity_key(ent))
+
+        if tokens:
+            fetched = load_many(list(tokens))
+            for ent, token in tokens.items():
+                value = fetched.get(ent)
+                self.context_cache.put(entity_key(ent), value, token, sizeof(value), variant)
+                found[ent] = value
+        return [found[ent] for ent in ordered]
+
+    def _cached(self, key, load, sizeof):
+        hit, value = self.context_cache.get(key)
+        if hit:
+            return value
+        token = self.context_cache.token(key)
+        value = load()
+        self.context_cache.put(key, value, token, sizeof(value))
+        return value
+
     def ProposeMemory(self, request, context):
         """
         Store a new memory atom after validation by VM 1.
         """
         try:
-            self.db.update_atom(
+            # The hot tier already applies writes in memory; group commit would only add latency.
+            if self.write_queue and not self.hot_tier:
+                future = self.write_queue.submit_atom(
+                    request.entity_id, request.dimension, request.delta,
+                    request.context_hash, request.confidence
+                )
+                if self.write_queue.ack_mode == "enqueue":
+                    return kuro_pb2.MemoryStatus(success=True, message="Memory atom queued.")
+                future.result()
+                return kuro_pb2.MemoryStatus(success=True, message="Memory atom stored.")
+            self.atoms.update_atom(
                 entity_id=request.entity_id,
                 dimension=request.dimension,
                 delta=request.delta,
@@ -64,6 +314,47 @@ class MemoryServicer(kuro_pb2_grpc.MemoryServiceServicer):
         except Exception as e:
             return kuro_pb2.MemoryStatus(success=False, message=str(e))
 
+    def ProposeMemoryBatch(self, request, context):
+        """
+        Store a batch of memory atoms in a single transaction.
+        """
+        return self._apply_proposals(request.proposals)
+
+    def StreamMemoryProposals(self, request_iterator, context):
+        """
+        Client-streaming ProposeMemory: proposals are committed in groups of
+        STREAM_BATCH_SIZE as they arrive, with one status per proposal at the end.
+        """
+        response = kuro_pb2.MemoryBatchStatus()
+        pending = []
+        for proposal in request_iterator:
+            pending.append(proposal)
+            if len(pending) >= STREAM_BATCH_SIZE:
+                self._merge_batch_status(response, self._apply_proposals(pending))
+                pending = []
+        if pending:
+            self._merge_batch_status(response, self._apply_proposals(pending))
+        return response
+
+    @staticmethod
+    def _merge_batch_status(total, part):
+        total.results.extend(part.results)
+        total.applied += part.applied
+
+    def _apply_proposals(self, proposals):
+        try:
+            results = self.atoms.update_atoms(
+                (p.entity_id, p.dimension, p.delta, p.context_hash, p.confidence) for p in proposals
+            )
+        except Exception as e:
+            return kuro_pb2.MemoryBatchStatus(
+                results=[kuro_pb2.MemoryStatus(success=False, message=str(e)) for _ in proposals]
+            )
+        return kuro_pb2.MemoryBatchStatus(
+            results=[kuro_pb2.MemoryStatus(success=ok, message=msg) for ok, msg in results],
+            applied=sum(1 for ok, _ in results if ok),
+        )
+
     def UpdatePreference(self, request, context):
         """
         Update specific behavioral preferences based on reinforcement signals.
@@ -71,17 +362,143 @@ class MemoryServicer(kuro_pb2_grpc.MemoryServiceServicer):
         # We assume VM 1 sends a reinforcement signal (True/False)
         # This would usually come from the 'Analyst' or 'Reinforcement' layer
         # For now, we mock the magnitude.
+        if self.write_queue:
+            delta = self.reinforce_engine.signal_delta(request.value > 0.5)
+            future = self.write_queue.submit_preference(request.key, delta)
+            if self.write_queue.ack_mode == "enqueue":
+                return kuro_pb2.MemoryStatus(success=True, message=f"Preference '{request.key}' queued.")
+            try:
+                future.result()
+            except Exception as e:
+                return kuro_pb2.MemoryStatus(success=False, message=str(e))
+            return kuro_pb2.MemoryStatus(success=True, message=f"Preference '{request.key}' reinforced.")
         self.reinforce_engine.reinforce(request.key, request.value > 0.5)
         return kuro_pb2.MemoryStatus(success=True, message=f"Preference '{request.key}' reinforced.")
 
+    def UpsertRelation(self, request, context):
+        """
+        Create or update one edge of the entity relation graph.
+        """
+        try:
+            ok, message = self.db.upsert_relation(
+                request.from_entity, request.relation, request.to_entity,
+                request.weight, request.accumulate
+            )
+        except Exception as e:
+            return kuro_pb2.MemoryStatus(success=False, message=str(e))
+        return kuro_pb2.MemoryStatus(success=ok, message=message)
+
+    def UpsertRelations(self, request, context):
+        """
+        Create or update many relation edges in a single transaction.
+        """
+        relations = request.relations
+        try:
+            results = self.db.upsert_relations(
+                (r.from_entity, r.relation, r.to_entity, r.weight, r.accumulate) for r in relations
+            )
+        except Exception as e:
+            return kuro_pb2.MemoryBatchStatus(
+                results=[kuro_pb2.MemoryStatus(success=False, message=str(e)) for _ in relations]
+            )
+        return kuro_pb2.MemoryBatchStatus(
+            results=[kuro_pb2.MemoryStatus(success=ok, message=msg) for ok, msg in results],
+            applied=sum(1 for ok, _ in results if ok),
+        )
+
+    def GetNeighborhood(self, request, context):
+        """
+        k-hop neighborhood of the given entities, filtered by edge weight.
+        """
+        rows = self.db.get_neighborhood(
+            list(request.entities), max_hops=request.max_hops, min_weight=request.min_weight,
+            limit=request.limit, relations=list(request.relations), bidirectional=request.bidirectional
+        )
+        return kuro_pb2.NeighborhoodResponse(neighbors=[self._neighbor(row) for row in rows])
+
+    @staticmethod
+    def _neighbor(row):
+        entity_id, hops, score, via, relation = row
+        return kuro_pb2.Neighbor(entity_id=entity_id, hops=hops, score=score, via=via or "", relation=relation or "")
+
+    def QueryAtoms(self, request, context):
+        """
+        Filtered atom scan, one AtomPage per keyset page until limit or the last match.
+        Each page is its own short read, so a slow consumer never pins a snapshot.
+        """
+        if self.hot_tier:
+            # Queries read SQLite; bring it up to date with writes still held in memory.
+            self.hot_tier.checkpoint()
+        cursor, remaining = request.cursor or None, request.limit or None
+        while context.is_active():
+            try:
+                page, cursor, remaining = self._query_atoms_page(request, cursor, remaining)
+            except ValueError as e:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+            yield page
+            if not page.next_cursor or remaining == 0:
+                return
+
+    def _query_atoms_page(self, request, cursor, remaining):
+        """ Returns (AtomPage, next cursor, atoms still allowed by request.limit or None). """
+        size = request.page_size or QUERY_PAGE_SIZE
+        if remaining is not None:
+            size = min(size, remaining)
+        rows, cursor = self.db.query_atoms(
+            entities=list(request.entities), dimension_prefix=request.dimension_prefix,
+            since=request.updated_after or None, until=request.updated_before or None,
+            min_magnitude=request.min_magnitude, min_confidence=request.min_confidence,
+            order=QUERY_ORDERS.get(request.order, request.order), limit=size, cursor=cursor
+        )
+        page = kuro_pb2.AtomPage(next_cursor=cursor or "")
+        for entity_id, dimension, context_hash, magnitude, confidence, last_updated, written_at in rows:
+            page.atoms.add(entity_id=entity_id, dimension=dimension, context_hash=context_hash, magnitude=magnitude,
+                           confidence=confidence, last_updated=last_updated, written_at=written_at)
+        if remaining is not None:
+            remaining -= len(rows)
+        return page, cursor, remaining
+
+def start_metrics_endpoint():
+    """
+    Serves Prometheus text metrics on KURO_MEMORY_METRICS_PORT (127.0.0.1 only unless
+    KURO_MEMORY_METRICS_HOST says otherwise). Port 0 disables the endpoint.
+    """
+    port = int(os.environ.get("KURO_MEMORY_METRICS_PORT", "9153"))
+    if not port:
+        return None
+    host = os.environ.get("KURO_MEMORY_METRICS_HOST", "127.0.0.1")
+    try:
+        server = start_http_server(port, host=host)
+    except OSError as e:
+        print(f"Metrics endpoint disabled: cannot bind {host}:{port} ({e})")
+        return None
+    print(f"Metrics endpoint on http://{host}:{port}/metrics")
+    return server
+
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    kuro_pb2_grpc.add_MemoryServiceServicer_to_server(MemoryServicer(), server)
-    kuro_pb2_grpc.add_HealthServiceServicer_to_server(HealthServicer("Memory"), server)
-    server.add_insecure_port('0.0.0.0:50053')
-    print("Memory Substrate (VM 3) starting on port 50053...")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[MetricsInterceptor()])
+    servicer = MemoryServicer()
+    kuro_pb2_grpc.add_MemoryServiceServicer_to_server(servicer, server)
+    kuro_pb2_grpc.add_HealthServiceServicer_to_server(
+        HealthServicer("Memory", registry=REGISTRY, gauges=servicer.health_gauges,
+                       interval_sec=float(os.environ.get("KURO_MEMORY_HEALTH_INTERVAL_SEC", "5"))), server)
+    start_metrics_endpoint()
+    port = os.environ.get("KURO_MEMORY_PORT", "50053")
+    server.add_insecure_port(f'0.0.0.0:{port}')
+    print(f"Memory Substrate (VM 3) starting on port {port}...")
     server.start()
-    server.wait_for_termination()
+    # SIGTERM stops the server gracefully so maintenance and queued writes are wound down.
+    signal.signal(signal.SIGTERM, lambda *_: server.stop(5))
+    try:
+        server.wait_for_termination()
+    finally:
+        servicer.stop()
 
 if __name__ == "__main__":
-    serve()
+    # KURO_MEMORY_SERVER_MODE=aio selects the grpc.aio entry point (memory/aio_serve.py)
+    if os.environ.get("KURO_MEMORY_SERVER_MODE", "threaded") == "aio":
+        import asyncio
+        from memory.aio_serve import serve_aio
+        asyncio.run(serve_aio())
+    else:
+        serve()
@@ -0,0 +1,259 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from memory.db.memory_db import MemoryDB, CONFIDENCE_KEEP, INVALID_PROPOSAL
+
+ACK_MODES = ("commit", "enqueue")
+
+
+class _AtomWrite:
+    """
+    One or more ProposeMemory calls for the same atom, folded together.
+    Only same-sign deltas are folded: the [-1, 1] clamp is then applied once at
+    the end with the same result as clamping after each step.
+    """
+    __slots__ = ("entity_id", "dimension", "context_hash", "delta", "confidence", "keep", "blend", "futures")
+
+    def __init__(self, entity_id, dimension, context_hash, delta, confidence, future):
+        self.entity_id = entity_id
+        self.dimension = dimension
+        self.context_hash = context_hash
+        self.delta = delta
+        self.confidence = confidence
+        self.keep = CONFIDENCE_KEEP
+        self.blend = confidence * (1.0 - CONFIDENCE_KEEP)
+        self.futures = [future]
+
+    def can_fold(self, delta):
+        return (self.delta >= 0) == (delta >= 0)
+
+    def fold(self, delta, confidence, future):
+        # Compose the confidence EMA: c -> c*keep + blend, then c -> c*0.7 + x*0.3
+        self.delta += delta
+        self.confidence = self.confidence * CONFIDENCE_KEEP + confidence * (1.0 - CONFIDENCE_KEEP)
+        self.keep *= CONFIDENCE_KEEP
+        self.blend = self.blend * CONFIDENCE_KEEP + confidence * (1.0 - CONFIDENCE_KEEP)
+        self.futures.append(future)
+
+
+class WriteBehindQueue:
+    """
+    Group-commit queue for single ProposeMemory / UpdatePreference calls (VM 3).
+    gRPC workers enqueue; one writer thread drains up to max_batch items (or whatever
+    arrived within max_delay_ms), merges writes to the same atom or preference key,
+    and commits them in a single transaction.
+
+    ack_mode="commit": submit_* futures resolve after the batch commits.
+    ack_mode="enqueue": callers acknowledge as soon as the write is queued.
+    """
+    def __init__(self, db: MemoryDB, reinforce_engine, ack_mode="commit", max_batch=256, max_delay_ms=5):
+        if ack_mode not in ACK_MODES:
+            raise ValueError(f"Unknown ack mode '{ack_mode}', expected one of {ACK_MODES}")
+        self.db = db
+        self.reinforce_engine = reinforce_engine
+        self.ack_mode = ack_mode
+        self.max_batch = max_batch
+        self.max_delay_sec = max_delay_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self.running = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches_committed": 0,
+            "items_committed": 0,
+            "items_merged": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "commit_errors": 0,
+        }
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run_loop, name="memory-writer", daemon=True)
+        self._thread.start()
+        print(f"Write-behind queue started (ack={self.ack_mode}, batch<={self.max_batch}, "
+              f"delay<={self.max_delay_sec * 1000:.0f}ms)")
+
+    def stop(self):
+        self.running = False
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join()
+
+    def submit_atom(self, entity_id, dimension, delta, context_hash, confidence):
+        if not entity_id or not dimension:
+            raise ValueError(INVALID_PROPOSAL)
+        return self._submit(("atom", entity_id, dimension, delta, context_hash, confidence))
+
+    def submit_preference(self, key, delta):
+        return self._submit(("pref", key, delta))
+
+    def flush(self, timeout=None):
+        """ Blocks until everything queued before the call has been committed. """
+        if not self.running:
+            return True
+        future = Future()
+        self._queue.put(("barrier", future))
+        return future.result(timeout)
+
+    def _submit(self, item):
+        if not self.running:
+            raise RuntimeError("Write-behind queue is not running.")
+        future = Future()
+        self._queue.put(item + (future,))
+        return future
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _run_loop(self):
+        while self.running or not self._queue.empty():
+            item = self._queue.get()
+            if item is None:
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay_sec
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _merge(self, batch):
+        atoms = []
+        last_for_atom = {}
+        prefs = {}
+        barriers = []
+        for item in batch:
+            kind, future = item[0], item[-1]
+            if kind == "atom":
+                _, entity_id, dimension, delta, context_hash, confidence, _ = item
+                # Resolved at flush, not submit, so writes queued across a collapse follow its aliases.
+                dimension = self.db.resolve_dimension(dimension)
+                key = (entity_id, dimension, context_hash)
+                write = last_for_atom.get(key)
+                if write is not None and write.can_fold(delta):
+                    write.fold(delta, confidence, future)
+                else:
+                    write = _AtomWrite(entity_id, dimension, context_hash, delta, confidence, future)
+                    last_for_atom[key] = write
+                    atoms.append(write)
+            elif kind == "pref":
+                _, key, delta, _ = item
+                total, count, futures = prefs.get(key, (0.0, 0, []))
+                futures.append(future)
+                prefs[key] = (total + delta, count + 1, futures)
+            else:
+                barriers.append(future)
+        return atoms, prefs, barriers
+
+    def _write(self, atoms, prefs, now):
+        """
+        Applies one merged batch with one transaction per shard, committed concurrently
+        when the store is sharded (preferences go with the home shard's). A shard whose
+        transaction fails fails only its own writes.
+        Returns (per-atom errors, error for the preferences or None, shard errors).
+        """
+        home = self.db.home
+        groups = self.db.group_by_shard(atoms, lambda write: write.entity_id)
+        if prefs:
+            groups.setdefault(home, [])
+        results = self.db.map_shards(
+            lambda shard: self._write_shard(shard, groups[shard], prefs if shard is home else {}, now), groups)
+        failed = {}
+        touched = set()
+        pref_error = None
+        shard_errors = []
+        for shard, (shard_failed, shard_touched, error) in zip(groups, results):
+            failed.update(shard_failed)
+            touched |= shard_touched
+            if error is not None:
+                shard_errors.append(error)
+                if shard is home:
+                    pref_error = error
+        written_prefs = [] if pref_error else list(prefs)
+        if touched or written_prefs:
+            self.db.notify_change(entities={entity_id for entity_id, _ in touched}, pref_keys=written_prefs)
+        return failed, pref_error, shard_errors
+
+    def _write_shard(self, db, atoms, prefs, now):
+        """ One shard's part of a batch in a single transaction; returns (failed, touched, error). """
+        failed = {}
+        touched = set()
+        try:
+            with db.get_conn() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for write in atoms:
+                    conn.execute("SAVEPOINT atom_write")
+                    try:
+                        db._upsert_atom(conn, write.entity_id, write.dimension, write.delta,
+                                        write.context_hash, write.confidence, now,
+                                        keep=write.keep, blend=write.blend)
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO atom_write")
+                        failed[id(write)] = e
+                    else:
+                        touched.add((write.entity_id, write.dimension))
+                    conn.execute("RELEASE atom_write")
+                db._enforce_caps(conn, touched)
+                for key, (delta, count, _) in prefs.items():
+                    self.reinforce_engine._apply(conn, key, delta, count, now)
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["commit_errors"] += 1
+            print(f"Write-behind commit failed on {db.db_path} ({len(atoms)} atoms, {len(prefs)} prefs): {e}")
+            return {id(write): e for write in atoms}, set(), e
+        return failed, touched, None
+
+    def _commit(self, batch):
+        atoms, prefs, barriers = self._merge(batch)
+        failed, pref_error, shard_errors = {}, None, []
+        try:
+            if atoms or prefs:
+                failed, pref_error, shard_errors = self._write(atoms, prefs, time.time())
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["commit_errors"] += 1
+            print(f"Write-behind commit failed ({len(batch)} items): {e}")
+            for item in batch:
+                if not item[-1].done():
+                    item[-1].set_exception(e)
+            return
+
+        for write in atoms:
+            error = failed.get(id(write))
+            if error and not any(error is shard_error for shard_error in shard_errors):
+                print(f"Write-behind: dropped write to {write.entity_id}/{write.dimension}: {error}")
+            for future in write.futures:
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(True)
+        for _, _, futures in prefs.values():
+            for future in futures:
+                if pref_error:
+                    future.set_exception(pref_error)
+                else:
+                    future.set_result(True)
+        for future in barriers:
+            future.set_result(True)
+
+        writes = len(batch) - len(barriers)
+        if not writes:
+            return
+        with self._stats_lock:
+            self._stats["batches_committed"] += 1
+            self._stats["items_committed"] += writes
+            self._stats["items_merged"] += writes - len(atoms) - len(prefs)
+            self._stats["last_batch_size"] = writes
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], writes)
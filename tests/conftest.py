@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory.db.memory_db import MemoryDB  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "kuro_memory.db")
+
+
+@pytest.fixture
+def memory_db(db_path):
+    db = MemoryDB(db_path, pool_size=4)
+    yield db
+    db.close()
@@ -0,0 +1,72 @@
+import pytest
+
+from memory.context_cache import ContextCache, PREFERENCES_KEY, entity_key
+from memory.maintenance import MaintenanceJob, MaintenanceScheduler
+
+
+def _fill(cache, key, value="cached", variant=None):
+    token = cache.token(key)
+    assert cache.put(key, value, token, size=len(value), variant=variant)
+
+
+def test_invalidation_rejects_fills_read_before_it():
+    cache = ContextCache()
+    token = cache.token(entity_key("a"))
+    cache.invalidate([entity_key("a")])
+    assert not cache.put(entity_key("a"), "stale", token, size=5)
+    assert cache.get(entity_key("a")) == (False, None)
+    assert cache.stats()["rejected_fills"] == 1
+
+    _fill(cache, entity_key("a"), variant=1)
+    _fill(cache, entity_key("a"), variant=2)
+    _fill(cache, entity_key("b"))
+    cache.invalidate([entity_key("a")])
+    assert cache.get(entity_key("a"), 1) == (False, None)
+    assert cache.get(entity_key("a"), 2) == (False, None)
+    assert cache.get(entity_key("b")) == (True, "cached")
+
+    token = cache.token(entity_key("b"))
+    cache.invalidate_all()
+    assert cache.get(entity_key("b")) == (False, None)
+    assert not cache.put(entity_key("b"), "stale", token, size=5)
+
+
+def test_writes_invalidate_only_their_entities(memory_db):
+    cache = ContextCache()
+    memory_db.add_listener(cache.on_change)
+    for key in (entity_key("a"), entity_key("b"), PREFERENCES_KEY):
+        _fill(cache, key)
+    memory_db.update_atoms([("a", "mood", 0.2, "h", 0.5)])
+    assert cache.get(entity_key("a")) == (False, None)
+    assert cache.get(entity_key("b")) == (True, "cached")
+    assert cache.get(PREFERENCES_KEY) == (True, "cached")
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_maintenance_jobs_invalidate_the_serving_cache(memory_db, db_path, mode):
+    cache = ContextCache()
+    memory_db.add_listener(cache.on_change)
+    memory_db.update_atoms([("weak", "mood", 0.05, "h", 0.5), ("strong", "mood", 0.9, "h", 0.9)])
+    jobs = [MaintenanceJob("prune", 0, 60, run_at_start=True), MaintenanceJob("decay", 0, 60, run_at_start=True)]
+    scheduler = MaintenanceScheduler(memory_db, jobs=jobs, mode=mode, db_settings={"db_path": db_path, "pool_size": 2},
+                                     grace_sec=5.0)
+
+    _fill(cache, entity_key("weak"))
+    _fill(cache, entity_key("strong"))
+    token = cache.token(entity_key("weak"))
+    try:
+        scheduler.run(scheduler.job("prune"))
+        assert scheduler.job("prune").last_error is None
+        # The prune ran elsewhere (in process mode, another process) but only dropped "weak".
+        assert cache.get(entity_key("weak")) == (False, None)
+        assert not cache.put(entity_key("weak"), "stale", token, size=5)
+        assert cache.get(entity_key("strong")) == (True, "cached")
+
+        token = cache.token(entity_key("strong"))
+        scheduler.run(scheduler.job("decay"))
+        assert scheduler.job("decay").last_error is None
+        # An eager pass rewrites every magnitude.
+        assert cache.get(entity_key("strong")) == (False, None)
+        assert not cache.put(entity_key("strong"), "stale", token, size=5)
+    finally:
+        scheduler.stop()
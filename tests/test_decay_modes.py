@@ -0,0 +1,80 @@
+import pytest
+
+from memory.db.hot_tier import HotTier
+from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import ShardedMemoryDB
+from memory.decay_engine import DecayEngine
+
+ATOMS = [
+    ("a", "mood", 0.9, "h1", 0.8),
+    ("a", "tone", -0.6, "h1", 0.5),
+    ("b", "mood", 0.3, "h2", 0.6),
+    ("b", "mood", -0.02, "h3", 0.4),  # decays below the floor within the backdated hours
+    ("c", "pace", 0.15, "h1", 0.9),
+]
+
+
+def _open(path, mode, shards):
+    if shards > 1:
+        return ShardedMemoryDB(path, shards, pool_size=2, decay_mode=mode)
+    return MemoryDB(path, pool_size=2, decay_mode=mode)
+
+
+def _age(db, hours):
+    """ Moves every atom's anchor (and expiry) back, as if written hours ago. """
+    for shard in db.shards:
+        with shard.get_conn() as conn:
+            conn.execute("UPDATE memory_atoms SET last_updated = last_updated - :s, "
+                         "written_at = written_at - :s, expires_at = expires_at - :s", {"s": hours * 3600.0})
+
+
+def _magnitudes(store):
+    """ {(entity, dimension, confidence): magnitude}; confidence tells an entity's atoms apart. """
+    fetched = store.fetch_atoms(["a", "b", "c"], detail=True)
+    return {(entity, row[0], round(row[2], 9)): row[1] for entity, rows in fetched.items() for row in rows}
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+def test_lazy_reads_match_eager_passes(tmp_path, shards):
+    eager = _open(str(tmp_path / "eager" / "kuro_memory.db"), "eager", shards)
+    lazy = _open(str(tmp_path / "lazy" / "kuro_memory.db"), "lazy", shards)
+    for db in (eager, lazy):
+        db.update_atoms(ATOMS)
+        _age(db, 30)
+
+    DecayEngine(eager).apply_decay()
+    expected = _magnitudes(eager)
+    assert ("b", "mood", 0.4) not in expected and len(expected) == 4
+    actual = _magnitudes(lazy)
+    assert actual.keys() == expected.keys()
+    for key, magnitude in expected.items():
+        assert actual[key] == pytest.approx(magnitude, rel=1e-6), key
+
+    # A lazy pass only sweeps what has expired; reads do not move.
+    report = DecayEngine(lazy).apply_decay()
+    assert report["tables"]["memory_atoms"]["deleted"] == 1
+    assert _magnitudes(lazy) == pytest.approx(actual, rel=1e-6)
+
+    # Writes re-anchor on the decayed value in both modes.
+    for db in (eager, lazy):
+        db.update_atoms([("a", "mood", -0.2, "h1", 0.5), ("c", "pace", 0.3, "h1", 0.5)])
+        _age(db, 10)
+    DecayEngine(eager).apply_decay()
+    expected = _magnitudes(eager)
+    actual = _magnitudes(lazy)
+    for key, magnitude in expected.items():
+        assert actual[key] == pytest.approx(magnitude, rel=1e-6), key
+    eager.close()
+    lazy.close()
+
+
+def test_hot_tier_lazy_reads_match_sqlite(tmp_path):
+    db = MemoryDB(str(tmp_path / "kuro_memory.db"), pool_size=2, decay_mode="lazy")
+    db.update_atoms(ATOMS)
+    _age(db, 30)
+    tier = HotTier(db)
+    for key, magnitude in _magnitudes(db).items():
+        assert _magnitudes(tier)[key] == pytest.approx(magnitude, rel=1e-6), key
+    assert len(_magnitudes(tier)) == 4
+    tier.stop()
+    db.close()
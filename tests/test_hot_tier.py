@@ -0,0 +1,135 @@
+import math
+import threading
+
+import pytest
+
+from memory.db.hot_tier import HotTier
+from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import ShardedMemoryDB
+from memory.decay_engine import DecayEngine
+
+
+def _open(db_path, shards):
+    return ShardedMemoryDB(db_path, shards, pool_size=2) if shards > 1 else MemoryDB(db_path, pool_size=2)
+
+
+def _stored(db, entity_id):
+    """ {(dimension, context_hash): (magnitude, confidence)} as SQLite holds it. """
+    with db.shard_for(entity_id).get_conn() as conn:
+        return {(d, h): (round(m, 9), round(c, 9)) for d, h, m, c in conn.execute(
+            "SELECT dimension, context_hash, magnitude, confidence FROM memory_atoms WHERE entity_id = ?",
+            (entity_id,))}
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_unclean_stop_replays_log(db_path, shards):
+    db = _open(db_path, shards)
+    tier = HotTier(db)
+    tier.update_atoms([(f"e{i}", "mood", 0.2, "h", 0.6) for i in range(10)])
+    tier.update_atoms([(f"e{i}", "mood", 0.1, "h", 0.9) for i in range(10)])
+    expected = {f"e{i}": tier.fetch_atoms([f"e{i}"], detail=True) for i in range(10)}
+    assert _stored(db, "e0") == {}
+    # No stop(): the process dies with every write only in the log.
+    db.close()
+
+    db = _open(db_path, shards)
+    HotTier(db).stop()
+    for entity_id, rows in expected.items():
+        (dimension, magnitude, confidence, _), = rows[entity_id]
+        assert _stored(db, entity_id) == {(dimension, "h"): (round(magnitude, 9), round(confidence, 9))}
+    assert math.isclose(_stored(db, "e0")[("mood", "h")][0], 0.3)
+    db.close()
+
+
+def test_replay_skips_records_already_checkpointed(db_path):
+    db = MemoryDB(db_path, pool_size=2)
+    tier = HotTier(db)
+    # Crash window: the checkpoint committed but the log was never truncated.
+    tier._truncate_log = lambda offset: None
+    tier.update_atoms([("a", "mood", 0.3, "h", 0.5)])
+    tier.checkpoint()
+    # Something rewrote the atom after the checkpoint; replaying the old record would undo it.
+    with db.get_conn() as conn:
+        conn.execute("UPDATE memory_atoms SET magnitude = 0.1 WHERE entity_id = 'a'")
+    tier.update_atoms([("b", "mood", 0.4, "h", 0.5)])
+    log_path = tier.log_path
+    db.close()
+    with open(log_path, "ab") as f:
+        f.write(b'[99,"c","mood","h",0.9')  # torn final append, never acknowledged
+
+    db = MemoryDB(db_path, pool_size=2)
+    HotTier(db).stop()
+    assert _stored(db, "a") == {("mood", "h"): (0.1, 0.5)}
+    assert _stored(db, "b") == {("mood", "h"): (0.4, 0.5)}
+    assert _stored(db, "c") == {}
+    db.close()
+
+
+def test_evicted_entities_keep_unflushed_writes(db_path):
+    db = MemoryDB(db_path, pool_size=2)
+    tier = HotTier(db, max_bytes=4096)
+    for i in range(20):
+        tier.update_atoms([(f"e{i}", "mood", 0.05 * (i + 1), "h", 0.5)])
+    assert tier.evictions > 0
+    assert tier.stats()["resident_entities"] < 20
+    for i in range(20):
+        (dimension, magnitude), = tier.fetch_atoms([f"e{i}"])[f"e{i}"]
+        assert math.isclose(magnitude, 0.05 * (i + 1))
+    tier.stop()
+    db.close()
+
+
+def test_writes_do_not_wait_for_maintenance(db_path):
+    db = MemoryDB(db_path, pool_size=2)
+    tier = HotTier(db)
+    entered, release = threading.Event(), threading.Event()
+
+    def long_pass():
+        with db.maintenance():
+            entered.set()
+            release.wait(10)
+
+    maintenance = threading.Thread(target=long_pass)
+    maintenance.start()
+    assert entered.wait(5)
+    done = threading.Event()
+    writer = threading.Thread(target=lambda: (tier.update_atoms([("a", "mood", 0.2, "h", 0.5)]), done.set()))
+    writer.start()
+    assert done.wait(5), "write blocked behind the maintenance pass"
+    release.set()
+    maintenance.join()
+    writer.join()
+    tier.checkpoint()
+    assert _stored(db, "a") == {("mood", "h"): (0.2, 0.5)}
+    tier.stop()
+    db.close()
+
+
+def test_write_during_decay_keeps_both(db_path):
+    db = MemoryDB(db_path, pool_size=2)
+    tier = HotTier(db)
+    tier.update_atoms([("a", "mood", 0.8, "h", 0.5), ("b", "mood", 0.4, "h", 0.5)])
+    tier.checkpoint()
+    # Anchor both atoms an hour back at a rate that halves them per hour.
+    with db.get_conn() as conn:
+        conn.execute("UPDATE memory_atoms SET decay_rate = ?, last_updated = last_updated - 3600", (math.log(2),))
+    tier.on_change((), (), all_entities=True)
+    tier.fetch_atoms(["a", "b"])
+
+    with db.maintenance():
+        # Written from the pre-decay resident state; the pass then rewrites SQLite under it.
+        tier.update_atoms([("a", "mood", 0.1, "h", 1.0)])
+        DecayEngine(db).apply_decay()
+        # And written after the pass reached the entity.
+        tier.update_atoms([("b", "mood", 0.1, "h", 1.0)])
+        assert tier.checkpoint() == 0
+    tier.checkpoint()
+
+    a_magnitude, a_confidence = _stored(db, "a")[("mood", "h")]
+    b_magnitude, _ = _stored(db, "b")[("mood", "h")]
+    assert a_magnitude == pytest.approx(0.8 * 0.5 + 0.1, abs=1e-4)
+    assert a_confidence == pytest.approx(0.5 * 0.7 + 0.3)
+    assert b_magnitude == pytest.approx(0.4 * 0.5 + 0.1, abs=1e-4)
+    assert tier.fetch_atoms(["a"])["a"][0][1] == pytest.approx(a_magnitude)
+    tier.stop()
+    db.close()
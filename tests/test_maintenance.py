@@ -0,0 +1,44 @@
+import pytest
+
+from memory.maintenance import MaintenanceJob, MaintenanceScheduler
+
+pytest.importorskip("numpy")
+
+
+def _redundant_dimensions(db, entities=6):
+    # "mood" and "tone" carry the same per-entity signal; "mood" has more atoms, so it
+    # is the canonical one and each entity ends up with three atoms there.
+    proposals = []
+    for e in range(entities):
+        value = 0.2 + 0.1 * e
+        proposals += [(f"ent{e}", "mood", value / 2, "h1", 0.9), (f"ent{e}", "mood", value / 2, "h2", 0.9),
+                      (f"ent{e}", "tone", value, "h3", 0.9)]
+    db.update_atoms(proposals)
+
+
+def _scheduler(db, db_path, mode):
+    jobs = [MaintenanceJob("prune", 0, 60, run_at_start=True), MaintenanceJob("collapse", 0, 60, run_at_start=True)]
+    return MaintenanceScheduler(db, jobs=jobs, mode=mode, db_settings={"db_path": db_path, "pool_size": 2},
+                                grace_sec=5.0)
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_collapse_honors_policies_set_after_the_worker_started(memory_db, db_path, mode):
+    _redundant_dimensions(memory_db)
+    scheduler = _scheduler(memory_db, db_path, mode)
+    try:
+        scheduler.run(scheduler.job("prune"))  # spawns the worker in process mode
+        memory_db.set_dimension_policy("mood", max_atoms=2)
+        scheduler.run(scheduler.job("collapse"))
+        assert scheduler.job("collapse").last_report["merged"] == {"tone": "mood"}
+    finally:
+        scheduler.stop()
+
+    rows, _ = memory_db.query_atoms(limit=100)
+    per_entity = {}
+    for row in rows:
+        assert row[1] == "mood"
+        per_entity[row[0]] = per_entity.get(row[0], 0) + 1
+    assert per_entity == {f"ent{e}": 2 for e in range(6)}
+    # The serving process redirects writes to the collapsed dimension.
+    assert memory_db.resolve_dimension("tone") == "mood"
@@ -0,0 +1,55 @@
+import pytest
+
+from memory.db.hot_tier import HotTier
+from memory.db.memory_db import MemoryDB, INVALID_PROPOSAL
+from memory.db.sharded_db import ShardedMemoryDB
+from memory.write_queue import WriteBehindQueue
+
+
+@pytest.fixture(params=["memory_db", "sharded", "hot_tier"])
+def atoms(request, db_path):
+    db = ShardedMemoryDB(db_path, 3, pool_size=2) if request.param == "sharded" else MemoryDB(db_path, pool_size=2)
+    tier = HotTier(db) if request.param == "hot_tier" else None
+    yield (tier or db), db
+    if tier:
+        tier.stop()
+    db.close()
+
+
+def _entities(db):
+    rows, _ = db.query_atoms(limit=5000)
+    return sorted(row[0] for row in rows)
+
+
+def test_batch_rejects_missing_entity_or_dimension(atoms):
+    store, db = atoms
+    results = store.update_atoms([
+        ("a", "mood", 0.2, "h", 0.5),
+        ("", "mood", 0.2, "h", 0.5),
+        ("b", "", 0.2, "h", 0.5),
+        ("c", "mood", 0.2, "h", 0.5),
+    ])
+    assert results == [(True, "Memory atom stored."), (False, INVALID_PROPOSAL), (False, INVALID_PROPOSAL),
+                       (True, "Memory atom stored.")]
+    if isinstance(store, HotTier):
+        store.checkpoint()
+    assert _entities(db) == ["a", "c"]
+
+
+def test_single_write_rejects_missing_entity(atoms):
+    store, db = atoms
+    with pytest.raises(ValueError, match=INVALID_PROPOSAL):
+        store.update_atom("", "mood", 0.2, "h", 0.5)
+    with pytest.raises(ValueError, match=INVALID_PROPOSAL):
+        store.update_atom("a", "", 0.2, "h", 0.5)
+    assert _entities(db) == []
+
+
+def test_write_queue_rejects_missing_entity(memory_db):
+    queue = WriteBehindQueue(memory_db, reinforce_engine=None)
+    queue.start()
+    try:
+        with pytest.raises(ValueError, match=INVALID_PROPOSAL):
+            queue.submit_atom("", "mood", 0.2, "h", 0.5)
+    finally:
+        queue.stop()
@@ -0,0 +1,129 @@
+import sqlite3
+import time
+
+import pytest
+
+from memory.db import migrations, sql_functions
+from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import ShardedMemoryDB
+from memory.decay_engine import DecayEngine
+
+
+@pytest.fixture(params=[1, 4], ids=["unsharded", "4-shards"])
+def db(request, db_path):
+    db = ShardedMemoryDB(db_path, request.param, pool_size=2) if request.param > 1 else MemoryDB(db_path, pool_size=2)
+    yield db
+    db.close()
+
+
+def _backdate(db, seconds, entity_id=None):
+    for shard in db.shards:
+        with shard.get_conn() as conn:
+            conn.execute("UPDATE memory_atoms SET last_updated = last_updated - :s, written_at = written_at - :s "
+                         "WHERE :entity IS NULL OR entity_id = :entity", {"s": seconds, "entity": entity_id})
+
+
+def test_recent_survives_eager_decay(db):
+    db.update_atoms([(f"old{i}", "mood", 0.5, "h", 0.5) for i in range(5)])
+    _backdate(db, 3 * 3600)
+    db.update_atoms([("fresh", "mood", 0.5, "h", 0.5)])
+    DecayEngine(db).apply_decay()
+
+    since = time.time() - 3600
+    rows, cursor = db.query_atoms(since=since)
+    assert [row[0] for row in rows] == ["fresh"]
+    assert cursor is None
+    # Decay re-anchored every atom, but recent order still follows the writes.
+    rows, _ = db.query_atoms(order="recent")
+    assert rows[0][0] == "fresh"
+    assert all(row[5] >= since for row in rows)
+    assert all(row[6] < since for row in rows[1:])
+
+    # Reinforcing an old atom counts as a write.
+    db.update_atoms([("old3", "mood", 0.1, "h", 0.5)])
+    rows, _ = db.query_atoms(since=since)
+    assert sorted(row[0] for row in rows) == ["fresh", "old3"]
+    rows, _ = db.query_atoms(until=since)
+    assert sorted(row[0] for row in rows) == ["old0", "old1", "old2", "old4"]
+
+
+def test_dimension_prefix_is_exact(db):
+    dimensions = ["tone", "tone.warm", "tone\U0010ffff", "tone\U0010ffffx", "tonf", "ton", "Tone", "t*ne", "t?ne.x",
+                  "t[a]ne", "tan"]
+    db.update_atoms([("e", dimension, 0.3, "h", 0.5) for dimension in dimensions])
+
+    def matching(prefix):
+        rows, _ = db.query_atoms(dimension_prefix=prefix)
+        return sorted(row[1] for row in rows)
+
+    assert matching("tone") == sorted(["tone", "tone.warm", "tone\U0010ffff", "tone\U0010ffffx"])
+    assert matching("tone\U0010ffff") == ["tone\U0010ffff", "tone\U0010ffffx"]
+    assert matching("t*") == ["t*ne"]
+    assert matching("t?") == ["t?ne.x"]
+    assert matching("t[a]") == ["t[a]ne"]
+
+
+@pytest.mark.parametrize("order", ["recent", "strongest"])
+def test_keyset_pages_have_no_duplicates_or_gaps(db, order):
+    # Many equal sort keys, so pages must break ties by (shard, id) consistently.
+    db.update_atoms([(f"ent{e}", f"dim{d}", round(0.1 * (1 + (e + d) % 3), 2), f"h{d}", 0.5)
+                     for e in range(60) for d in range(5)])
+    for shard in db.shards:
+        with shard.get_conn() as conn:
+            conn.execute("UPDATE memory_atoms SET written_at = 1000.0 + (id % 4)")
+
+    expected, _ = db.query_atoms(order=order, limit=5000)
+    assert len(expected) == 300
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = db.query_atoms(order=order, limit=7, cursor=cursor)
+        seen.extend(rows)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert len({(row[0], row[1], row[2]) for row in seen}) == 300
+    key = (lambda row: row[6]) if order == "recent" else (lambda row: abs(row[3]))
+    assert all(key(a) >= key(b) for a, b in zip(seen, seen[1:]))
+
+
+def test_keyset_pages_stay_stable_under_writes(db):
+    db.update_atoms([(f"ent{e}", "dim", 0.2, "h", 0.5) for e in range(40)])
+    _backdate(db, 60)
+    rows, cursor = db.query_atoms(limit=15)
+    seen = list(rows)
+    # New writes sort before the cursor; they must not shift or repeat later pages.
+    db.update_atoms([("late", "dim", 0.2, "h", 0.5), ("ent39", "other", 0.2, "h", 0.5)])
+    while cursor:
+        rows, cursor = db.query_atoms(limit=15, cursor=cursor)
+        seen.extend(rows)
+    assert sorted(row[0] for row in seen) == sorted(f"ent{e}" for e in range(40))
+
+
+def test_cursor_order_mismatch_is_rejected(db):
+    db.update_atoms([(f"ent{e}", "dim", 0.2, "h", 0.5) for e in range(4)])
+    _, cursor = db.query_atoms(limit=2)
+    with pytest.raises(ValueError):
+        db.query_atoms(order="strongest", cursor=cursor)
+    with pytest.raises(ValueError):
+        db.query_atoms(cursor="garbage")
+
+
+def test_write_times_backfill_on_upgrade(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    sql_functions.register(conn)
+    migrations.migrate(conn, [m for m in migrations.MIGRATIONS if m[0] <= 10])
+    conn.execute("INSERT INTO memory_atoms (entity_id, dimension, context_hash, magnitude, confidence, "
+                 "decay_rate, last_updated) VALUES ('old', 'mood', 'h', 0.5, 0.5, 0.1, 1000.0)")
+    conn.close()
+
+    db = MemoryDB(db_path, pool_size=2)
+    try:
+        with db.get_conn() as conn:
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(memory_atoms)")}
+        assert "idx_atoms_written_at" in indexes
+        assert "idx_atoms_last_updated" not in indexes
+        rows, _ = db.query_atoms(order="recent")
+        assert [(row[0], row[6]) for row in rows] == [("old", 1000.0)]
+    finally:
+        db.close()
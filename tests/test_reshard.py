@@ -0,0 +1,92 @@
+import os
+import types
+
+import pytest
+
+from memory.db import migrations, reshard as reshard_module
+from memory.db.memory_db import MemoryDB
+from memory.db.reshard import reshard
+from memory.db.sharded_db import ShardedMemoryDB, shard_paths
+
+
+def _seed(db, entities=40, dimensions=3):
+    db.update_atoms([
+        (f"entity-{e}", f"dim-{d}", 0.1 + 0.01 * d, f"ctx-{e}-{d}", 0.6)
+        for e in range(entities) for d in range(dimensions)
+    ])
+    db.set_dimension_policy("dim-0", max_atoms=10)
+    db.home.upsert_relation("entity-0", "knows", "entity-1", 0.5)
+
+
+def _atoms(db):
+    rows, cursor = db.query_atoms(limit=5000)
+    assert cursor is None
+    return sorted((row[0], row[1], row[2], round(row[3], 9)) for row in rows)
+
+
+def _snapshot(db_path, shards):
+    db = ShardedMemoryDB(db_path, shards, pool_size=2) if shards > 1 else MemoryDB(db_path, pool_size=2)
+    try:
+        return _atoms(db), db.home.get_preferences(), db.dimension_policy("dim-0"), \
+            db.table_row_counts()["memory_atoms"]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("from_shards,to_shards", [(1, 3), (3, 2), (2, 4), (4, 1)])
+def test_reshard_round_trips_atoms(tmp_path, from_shards, to_shards):
+    source = str(tmp_path / "src" / "kuro_memory.db")
+    dest = str(tmp_path / "dst" / "kuro_memory.db")
+    os.makedirs(os.path.dirname(source))
+    os.makedirs(os.path.dirname(dest))
+    if from_shards > 1:
+        db = ShardedMemoryDB(source, from_shards, pool_size=2)
+    else:
+        db = MemoryDB(source, pool_size=2)
+    _seed(db)
+    db.close()
+    before = _snapshot(source, from_shards)
+
+    copied = reshard(source, dest, to_shards, from_shards)
+
+    assert sum(copied) == 120
+    assert _snapshot(dest, to_shards) == before
+    # Each destination shard only holds the entities that hash to it.
+    if to_shards > 1:
+        db = ShardedMemoryDB(dest, to_shards, pool_size=2)
+        try:
+            for shard in db.shards:
+                with shard.get_conn() as conn:
+                    entities = [row[0] for row in conn.execute("SELECT DISTINCT entity_id FROM memory_atoms")]
+                assert all(db.shard_for(entity) is shard for entity in entities)
+        finally:
+            db.close()
+
+
+def test_reshard_removes_partial_destination_on_failure(tmp_path, monkeypatch):
+    source = str(tmp_path / "src" / "kuro_memory.db")
+    dest = str(tmp_path / "dst" / "kuro_memory.db")
+    os.makedirs(os.path.dirname(source))
+    os.makedirs(os.path.dirname(dest))
+    db = ShardedMemoryDB(source, 2, pool_size=2)
+    _seed(db)
+    db.close()
+
+    rebuilt = []
+
+    def failing_rebuild(conn):
+        # The first destination shard commits; the second fails mid-copy.
+        rebuilt.append(conn)
+        if len(rebuilt) == 2:
+            raise RuntimeError("disk full")
+        migrations.rebuild_dimension_stats(conn)
+
+    monkeypatch.setattr(reshard_module, "migrations", types.SimpleNamespace(
+        rebuild_dimension_stats=failing_rebuild, rebuild_atom_counts=migrations.rebuild_atom_counts))
+    with pytest.raises(RuntimeError):
+        reshard(source, dest, 3, from_shards=2)
+    assert not any(os.path.exists(path + suffix)
+                   for path in shard_paths(dest, 3) for suffix in ("", "-wal", "-shm"))
+
+    monkeypatch.setattr(reshard_module, "migrations", migrations)
+    assert sum(reshard(source, dest, 3, from_shards=2)) == 120
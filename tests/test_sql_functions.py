@@ -0,0 +1,32 @@
+import datetime
+import math
+import sqlite3
+
+import pytest
+
+from memory.db import sql_functions
+from memory.db.sql_functions import EXPIRY_FLOOR, atom_expiry, iso_to_epoch
+
+
+def test_iso_to_epoch_reads_naive_timestamps_as_local_time():
+    now = datetime.datetime.now().replace(microsecond=0)
+    assert iso_to_epoch(now.isoformat()) == now.timestamp()
+    assert iso_to_epoch("2024-01-01T00:00:00+00:00") == 1704067200.0
+    assert iso_to_epoch(None) is None
+
+
+def test_iso_to_epoch_is_not_usable_in_indexes():
+    conn = sqlite3.connect(":memory:")
+    sql_functions.register(conn)
+    conn.execute("CREATE TABLE t (ts TEXT)")
+    # Depends on the host timezone, so SQLite must refuse to persist it in an index.
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("CREATE INDEX idx_t_epoch ON t (iso_to_epoch(ts))")
+
+
+def test_atom_expiry():
+    assert atom_expiry(None, 0.05, 0.0) is None
+    assert atom_expiry(0.5, 0.0, 100.0) is None
+    assert atom_expiry(EXPIRY_FLOOR / 2, 0.05, 100.0) == 100.0
+    expires = atom_expiry(-0.5, 0.05, 100.0)
+    assert 0.5 * math.exp(-0.05 * (expires - 100.0) / 3600.0) == pytest.approx(EXPIRY_FLOOR)
@@ -0,0 +1,99 @@
+import pytest
+
+from memory.db.memory_db import MemoryDB
+from memory.db.sharded_db import ShardedMemoryDB
+from memory.decay_engine import ReinforcementEngine
+from memory.write_queue import WriteBehindQueue
+
+# Same-atom runs that fold (same sign, including clamping at +/-1), alternate signs
+# that must not, and writes to other atoms interleaved between them.
+WRITES = [
+    ("a", "mood", 0.4, "h", 0.9),
+    ("b", "mood", -0.2, "h", 0.4),
+    ("a", "mood", 0.4, "h", 0.2),
+    ("a", "mood", 0.4, "h", 0.6),
+    ("a", "mood", -0.7, "h", 0.8),
+    ("a", "mood", -0.5, "h", 0.1),
+    ("b", "mood", -0.9, "h", 0.7),
+    ("b", "mood", -0.3, "h", 0.5),
+    ("a", "mood", 0.05, "h", 1.0),
+    ("c", "tone", 0.3, "x", 0.5),
+    ("c", "tone", -0.1, "x", 0.5),
+    ("c", "tone", 0.2, "y", 0.3),
+]
+
+
+def _atoms(db):
+    rows, _ = db.query_atoms(limit=5000)
+    return {(row[0], row[1], row[2]): (row[3], row[4]) for row in rows}
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_folded_batch_matches_sequential_writes(tmp_path, shards):
+    def open_db(name):
+        path = str(tmp_path / name / "kuro_memory.db")
+        return ShardedMemoryDB(path, shards, pool_size=2) if shards > 1 else MemoryDB(path, pool_size=2)
+
+    sequential = open_db("sequential")
+    for write in WRITES:
+        sequential.update_atom(*write)
+
+    queued = open_db("queued")
+    # A long delay so every write lands in one batch.
+    queue = WriteBehindQueue(queued, ReinforcementEngine(queued), max_batch=1000, max_delay_ms=500)
+    queue.start()
+    futures = [queue.submit_atom(*write) for write in WRITES]
+    for future in futures:
+        assert future.result(5) is True
+    queue.stop()
+
+    assert queue.stats()["batches_committed"] == 1
+    assert queue.stats()["items_merged"] > 0
+    expected = _atoms(sequential)
+    actual = _atoms(queued)
+    assert actual.keys() == expected.keys()
+    for key, (magnitude, confidence) in expected.items():
+        assert actual[key][0] == pytest.approx(magnitude, abs=1e-9), key
+        assert actual[key][1] == pytest.approx(confidence, abs=1e-9), key
+    sequential.close()
+    queued.close()
+
+
+def test_folded_preferences_match_sequential(tmp_path):
+    sequential = MemoryDB(str(tmp_path / "sequential" / "kuro_memory.db"), pool_size=2)
+    engine = ReinforcementEngine(sequential)
+    signals = [True, True, False, True, False, False, True]
+    for choice in signals:
+        engine.reinforce("verbosity", choice)
+
+    queued = MemoryDB(str(tmp_path / "queued" / "kuro_memory.db"), pool_size=2)
+    queued_engine = ReinforcementEngine(queued)
+    queue = WriteBehindQueue(queued, queued_engine, max_batch=1000, max_delay_ms=500)
+    queue.start()
+    futures = [queue.submit_preference("verbosity", queued_engine.signal_delta(choice)) for choice in signals]
+    for future in futures:
+        future.result(5)
+    queue.stop()
+
+    assert queue.stats()["batches_committed"] == 1
+    (key, value, confidence), = [tuple(row[:3]) for row in sequential.get_preferences()]
+    (queued_key, queued_value, queued_confidence), = [tuple(row[:3]) for row in queued.get_preferences()]
+    assert queued_key == key
+    assert queued_value == pytest.approx(value, abs=1e-9)
+    assert queued_confidence == pytest.approx(confidence, abs=1e-9)
+    sequential.close()
+    queued.close()
+
+
+def test_queued_writes_follow_aliases_added_before_the_flush(memory_db):
+    queue = WriteBehindQueue(memory_db, ReinforcementEngine(memory_db), max_delay_ms=500)
+    queue.start()
+    future = queue.submit_atom("ent", "tone", 0.4, "h", 0.5)
+    # A collapse lands while the write is still queued.
+    with memory_db.get_conn() as conn:
+        conn.execute("INSERT INTO dimension_aliases (alias, canonical, similarity, collapsed_at) "
+                     "VALUES ('tone', 'mood', 1.0, '2026-01-01T00:00:00')")
+    memory_db.reload_dimension_aliases()
+    assert future.result(5) is True
+    queue.stop()
+    assert list(_atoms(memory_db)) == [("ent", "mood", "h")]